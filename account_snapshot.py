@@ -0,0 +1,94 @@
+# account_snapshot.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from event_log import events
+
+
+class AccountSnapshot:
+    # Positions, open orders and ticker for one symbol, fetched together once per tick
+    # and reused by every check in TradingBot.job_symbol() until ttl expires or an order action invalidates it.
+    def __init__(self, session, symbol, ttl=1.0, executor=None, clock=time):
+        self.session = session
+        self.symbol = symbol
+        self.ttl = ttl
+        self.clock = clock
+        self.executor = executor or ThreadPoolExecutor(max_workers=3, thread_name_prefix=f"snapshot-{symbol}")
+
+        self.positions = None
+        self.orders = None
+        self.ticker = None
+        self.fetched_at = 0.0
+        self._pending = None
+
+    def is_fresh(self):
+        return self.positions is not None and self.clock.monotonic() - self.fetched_at < self.ttl
+
+    def start_refresh(self, force=False, price=None):
+        # Fire the requests without waiting, so the caller can overlap other work (e.g. klines). A price the
+        # caller already has, e.g. from the ws ticker stream, takes the place of the ticker request.
+        if price is not None:
+            self.ticker = {'lastPrice': price}
+        if self._pending is not None or (not force and self.is_fresh()):
+            return
+        self._pending = {
+            'positions': self._submit('fetch_positions'),
+            'orders': self._submit('fetch_open_orders'),
+        }
+        if price is None:
+            self._pending['ticker'] = self._submit('fetch_ticker')
+
+    def _submit(self, name):
+        # The async client's facade schedules the call on its event loop; the sync session uses threads
+        if hasattr(self.session, 'submit'):
+            return self.session.submit(name, self.symbol)
+        return self.executor.submit(getattr(self.session, name), self.symbol)
+
+    def refresh(self, force=False):
+        self.start_refresh(force)
+        if self._pending is None:
+            return True
+        futures, self._pending = self._pending, None
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                events.error("error", where="account_snapshot", symbol=self.symbol, request=name, error=repr(e))
+                results[name] = None
+
+        self.positions = results['positions']
+        self.orders = results['orders']
+        if 'ticker' in results:
+            self.ticker = results['ticker']
+        if self.positions is None or self.orders is None:
+            self.invalidate()
+            return False
+        self.fetched_at = self.clock.monotonic()
+        return True
+
+    def invalidate(self):
+        self.positions = None
+        self.fetched_at = 0.0
+
+    def get_last_closed_position(self):
+        closed_positions = [pos for pos in self.positions if float(pos['size']) == 0]
+        if not closed_positions:
+            events.debug("positions", symbol=self.symbol, closed=0)
+            return None
+        return max(closed_positions, key=lambda x: int(x['updatedTime']))
+
+    def get_open_positions(self):
+        active_positions = [pos for pos in self.positions if float(pos['size']) > 0]
+        # Serialised by the log writer thread, and only when debug logging is on
+        events.debug("positions", symbol=self.symbol, active=active_positions)
+        return active_positions
+
+    def get_open_orders(self):
+        # Read only: stale orders are cancelled by order_sweeper.StaleOrderSweeper
+        return self.orders
+
+    def get_real_time_price(self):
+        if self.ticker is None:
+            return None
+        return float(self.ticker['lastPrice'])
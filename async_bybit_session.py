@@ -0,0 +1,373 @@
+# async_bybit_session.py
+
+import asyncio
+import inspect
+import json
+import random
+import threading
+import time
+import aiohttp
+from bybit_demo_session import JSON_HEADERS, BybitDemoSession, fetch_all_open_orders_steps, send_batch_steps
+from http_transport import HttpTransport
+from event_log import events
+from rate_limiter import RateLimiter
+
+
+class AsyncBybitSession:
+    # asyncio counterpart of BybitDemoSession with the same method names; every call is a coroutine
+    # so independent requests can be awaited together with asyncio.gather.
+
+    # Signing and order construction are shared with the synchronous session
+    _generate_signature = BybitDemoSession._generate_signature
+    _get_timestamp = BybitDemoSession._get_timestamp
+    _sign = BybitDemoSession._sign
+    _prepare_order = BybitDemoSession._prepare_order
+    _position_idx = BybitDemoSession._position_idx
+    _limit_prices = BybitDemoSession._limit_prices
+    BATCH_LIMIT = BybitDemoSession.BATCH_LIMIT
+
+    def __init__(self, api_key, api_secret, base_url="https://api-demo.bybit.com", pool_maxsize=10,
+                 max_retries=3, backoff_base=0.2, backoff_cap=2.0, metrics=None, rate_limiter=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter or RateLimiter(metrics=metrics)
+        self.leverage_cache = {}
+        # Created lazily so it binds to the loop that actually runs the requests
+        self._session = None
+
+        self.requests_sent = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_latency = 0.0
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def send_request(self, method, endpoint, params=None):
+        if params is None:
+            params = {}
+        if method not in ("GET", "POST"):
+            raise ValueError("Unsupported HTTP method")
+
+        session = await self._get_session()
+        connect_timeout, read_timeout = HttpTransport.ENDPOINT_TIMEOUTS.get(endpoint, HttpTransport.DEFAULT_TIMEOUT)
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        attempts = self.max_retries + 1 if method == "GET" else 1
+
+        start = time.perf_counter()
+        try:
+            throttled_retry = True
+            attempt = 0
+            while attempt < attempts:
+                # Signed afresh for every attempt, so a retry after a timeout is still within recv_window
+                self._sign(params)
+                await self.rate_limiter.acquire_async(endpoint)
+                request_start = time.perf_counter()
+                try:
+                    if method == "GET":
+                        request = session.get(f"{self.base_url}{endpoint}", params=params, timeout=timeout)
+                    else:
+                        request = session.post(f"{self.base_url}{endpoint}", json=params, timeout=timeout)
+                    async with request as response:
+                        status = response.status
+                        headers = response.headers
+                        body = await response.text()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    self._record(time.perf_counter() - request_start, error=True)
+                    if attempt + 1 >= attempts:
+                        raise
+                    await self._backoff(attempt)
+                    attempt += 1
+                    continue
+
+                self._record(time.perf_counter() - request_start, error=status >= 400)
+                if status in HttpTransport.RETRY_STATUSES and attempt + 1 < attempts:
+                    await self._backoff(attempt)
+                    attempt += 1
+                    continue
+                response = json.loads(body)
+                self.rate_limiter.update(endpoint, headers, response.get('retCode'))
+                # A request rejected with 10006 was not executed, so it is safe to send once more after the reset
+                if response.get('retCode') == RateLimiter.THROTTLED_RET_CODE and throttled_retry:
+                    throttled_retry = False
+                    continue
+                break
+        except Exception:
+            if self.metrics:
+                self.metrics.inc("request_errors", endpoint=endpoint)
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+        if self.metrics and response.get('retCode') != 0:
+            self.metrics.inc("request_errors", endpoint=endpoint)
+        return response
+
+    async def send_prepared(self, endpoint, build_body):
+        # POST of a pre-built JSON body, see BybitDemoSession.send_prepared
+        session = await self._get_session()
+        connect_timeout, read_timeout = HttpTransport.ENDPOINT_TIMEOUTS.get(endpoint, HttpTransport.DEFAULT_TIMEOUT)
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+
+        start = time.perf_counter()
+        try:
+            for attempt in range(2):
+                await self.rate_limiter.acquire_async(endpoint)
+                request_start = time.perf_counter()
+                try:
+                    async with session.post(f"{self.base_url}{endpoint}", data=build_body(), headers=JSON_HEADERS,
+                                            timeout=timeout) as http_response:
+                        status = http_response.status
+                        headers = http_response.headers
+                        body = await http_response.text()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    self._record(time.perf_counter() - request_start, error=True)
+                    raise
+                self._record(time.perf_counter() - request_start, error=status >= 400)
+                response = json.loads(body)
+                self.rate_limiter.update(endpoint, headers, response.get('retCode'))
+                if response.get('retCode') != RateLimiter.THROTTLED_RET_CODE or attempt:
+                    break
+        except Exception:
+            if self.metrics:
+                self.metrics.inc("request_errors", endpoint=endpoint)
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+        if self.metrics and response.get('retCode') != 0:
+            self.metrics.inc("request_errors", endpoint=endpoint)
+        return response
+
+    async def _backoff(self, attempt):
+        self.retries += 1
+        await asyncio.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+
+    def _record(self, latency, error=False):
+        self.requests_sent += 1
+        self.total_latency += latency
+        if error:
+            self.errors += 1
+
+    def get_rate_limit_stats(self):
+        return self.rate_limiter.get_stats()
+
+    def get_transport_stats(self):
+        return {
+            "requests": self.requests_sent,
+            "retries": self.retries,
+            "errors": self.errors,
+            "avg_latency_ms": (self.total_latency / self.requests_sent * 1000) if self.requests_sent else 0.0,
+        }
+
+    async def get_server_time(self):
+        try:
+            session = await self._get_session()
+            async with session.get(f"{self.base_url}/v5/market/time") as response:
+                data = await response.json(content_type=None)
+            if data['retCode'] != 0:
+                raise Exception(f"API Error: {data['retMsg']}")
+            return int(data['result']['timeNano']) / 1e6
+        except Exception as e:
+            events.error("error", where="server_time", error=repr(e))
+            return None
+
+    async def _get_list(self, endpoint, params):
+        response = await self.send_request("GET", endpoint, params)
+        if response['retCode'] != 0:
+            raise Exception(f"API Error: {response['retMsg']}")
+        return response['result']['list']
+
+    async def get_historical_data(self, symbol, interval, limit, start=None, end=None):
+        try:
+            params = {
+                "category": "linear",
+                "symbol": symbol,
+                "interval": interval,
+                "limit": limit
+            }
+            if start is not None:
+                params["start"] = start
+            if end is not None:
+                params["end"] = end
+            return await self._get_list("/v5/market/kline", params)
+        except Exception as e:
+            events.error("error", where="historical_data", symbol=symbol, error=repr(e))
+            return None
+
+    async def fetch_positions(self, symbol):
+        positions = await self._get_list("/v5/position/list", {"category": "linear", "symbol": symbol})
+        if positions:
+            self.leverage_cache[symbol] = float(positions[0]['leverage'])
+        return positions
+
+    async def fetch_open_orders(self, symbol):
+        return await self._get_list("/v5/order/realtime", {"category": "linear", "symbol": symbol})
+
+    async def _drive(self, steps):
+        # BybitDemoSession._drive, awaiting each request
+        try:
+            request = next(steps)
+            while True:
+                request = steps.send(await self.send_request(*request))
+        except StopIteration as done:
+            return done.value
+
+    async def fetch_all_open_orders(self, settle_coin="USDT"):
+        return await self._drive(fetch_all_open_orders_steps(settle_coin))
+
+    async def _send_batch(self, endpoint, items):
+        return await self._drive(send_batch_steps(endpoint, items))
+
+    async def cancel_orders_batch(self, orders):
+        # Chunks are independent, so they are sent together
+        chunks = [[{"symbol": order['symbol'], "orderId": order['orderId']} for order in orders[i:i + self.BATCH_LIMIT]]
+                  for i in range(0, len(orders), self.BATCH_LIMIT)]
+        pages = await asyncio.gather(*(self._send_batch("/v5/order/cancel-batch", chunk) for chunk in chunks))
+        return [result for page in pages for result in page]
+
+    async def place_orders_batch(self, orders, leverage):
+        await asyncio.gather(*(self.set_leverage(symbol, leverage) for symbol in {order['symbol'] for order in orders}))
+        items = []
+        for order in orders:
+            params = self._prepare_order(order['symbol'], order['side'], order['qty'], order['current_price'],
+                                         order.get('stop_loss'), order.get('take_profit'))
+            del params['category']
+            items.append(params)
+        pages = await asyncio.gather(*(self._send_batch("/v5/order/create-batch", items[i:i + self.BATCH_LIMIT])
+                                       for i in range(0, len(items), self.BATCH_LIMIT)))
+        return [result for page in pages for result in page]
+
+    async def fetch_ticker(self, symbol):
+        return (await self._get_list("/v5/market/tickers", {"category": "linear", "symbol": symbol}))[0]
+
+    async def set_leverage(self, symbol, leverage):
+        try:
+            if self.leverage_cache.get(symbol) == float(leverage):
+                return
+            params = {
+                "category": "linear",
+                "symbol": symbol,
+                "buyLeverage": str(leverage),
+                "sellLeverage": str(leverage)
+            }
+            response = await self.send_request("POST", "/v5/position/set-leverage", params)
+            # 110043: leverage not modified, i.e. it already has this value
+            if response['retCode'] not in (0, 110043):
+                raise Exception(f"API Error: {response['retMsg']}")
+            self.leverage_cache[symbol] = float(leverage)
+            events.info("leverage", symbol=symbol, leverage=leverage)
+        except Exception as e:
+            events.error("error", where="set_leverage", symbol=symbol, error=repr(e))
+
+    async def place_order(self, symbol, side, qty, current_price, leverage, stop_loss=None, take_profit=None):
+        try:
+            await self.set_leverage(symbol, leverage)
+            order_params = self._prepare_order(symbol, side, qty, current_price, stop_loss, take_profit)
+            response = await self.send_request("POST", "/v5/order/create", order_params)
+            if response['retCode'] != 0:
+                raise Exception(f"API Error: {response['retMsg']}")
+            return response['result']
+        except Exception as e:
+            events.error("error", where="place_order", symbol=symbol, error=repr(e))
+            return None
+
+    async def get_open_positions(self, symbol):
+        try:
+            positions = await self.fetch_positions(symbol)
+            active_positions = [pos for pos in positions if float(pos['size']) > 0]
+            events.debug("positions", symbol=symbol, active=active_positions)
+            return active_positions
+        except Exception as e:
+            events.error("error", where="positions", symbol=symbol, error=repr(e))
+            return None
+
+    async def get_open_orders(self, symbol):
+        # Read-only: stale orders are cancelled by StaleOrderSweeper
+        try:
+            return await self.fetch_open_orders(symbol)
+        except Exception as e:
+            events.error("error", where="open_orders", symbol=symbol, error=repr(e))
+            return None
+
+    async def cancel_order(self, order_id, symbol):
+        try:
+            params = {
+                "category": "linear",
+                "symbol": symbol,
+                "orderId": order_id
+            }
+            response = await self.send_request("POST", "/v5/order/cancel", params)
+            if response['retCode'] != 0:
+                raise Exception(f"API Error: {response['retMsg']}")
+            events.info("cancel", symbol=symbol, order_id=order_id, status="cancelled")
+        except Exception as e:
+            events.error("error", where="cancel_order", symbol=symbol, order_id=order_id, error=repr(e))
+
+    async def get_last_closed_position(self, symbol):
+        try:
+            positions = await self.fetch_positions(symbol)
+            closed_positions = [pos for pos in positions if float(pos['size']) == 0]
+            if closed_positions:
+                return max(closed_positions, key=lambda x: int(x['updatedTime']))
+            events.debug("positions", symbol=symbol, closed=0)
+            return None
+        except Exception as e:
+            events.error("error", where="last_closed_position", symbol=symbol, error=repr(e))
+            return None
+
+    async def get_real_time_price(self, symbol):
+        try:
+            return float((await self.fetch_ticker(symbol))['lastPrice'])
+        except Exception as e:
+            events.error("error", where="real_time_price", symbol=symbol, error=repr(e))
+            return None
+
+
+class SyncBybitSession:
+    # Blocking facade over AsyncBybitSession for existing synchronous code. The client runs on its own
+    # event loop thread; submit() returns a concurrent.futures.Future so callers can fan out calls.
+    def __init__(self, client):
+        self.client = client
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="bybit-async-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, name, *args, **kwargs):
+        coroutine = getattr(self.client, name)(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def gather(self, *calls):
+        # calls: (method name, args...) tuples; runs them concurrently and returns results in order
+        futures = [self.submit(name, *args) for name, *args in calls]
+        return [future.result() for future in futures]
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.submit(name, *args, **kwargs).result()
+        return call
+
+    def close(self):
+        self.submit("close").result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,167 @@
+# backtester.py
+
+import argparse
+import numpy as np
+import pandas as pd
+from strategies import Strategies
+from risk_management import RiskManagement
+from kline_store import KlineStore
+
+
+class Backtester:
+    # Mirrors the live bot: limit entry 0.01% through the last price, ATR-based SL/TP,
+    # stale orders cancelled after 180 s and no new entry within 120 s of a close.
+    def __init__(self, risk_management=None, interval_minutes=1, qty=1.0, entry_offset=0.0001,
+                 order_timeout=180, cooldown=120, fee_rate=0.0, strategy=None):
+        self.strategy = strategy or Strategies()
+        self.risk_management = risk_management or RiskManagement()
+        self.qty = qty
+        self.entry_offset = entry_offset
+        self.fee_rate = fee_rate
+        bar_seconds = interval_minutes * 60
+        self.fill_bars = max(1, int(np.ceil(order_timeout / bar_seconds)))
+        self.cooldown_bars = int(np.ceil(cooldown / bar_seconds))
+
+    def prepare(self, df):
+        df = df.copy()
+        for column in ('open', 'high', 'low', 'close'):
+            df[column] = df[column].astype(float)
+        df.sort_values('timestamp', inplace=True, kind='stable')
+        df.reset_index(drop=True, inplace=True)
+        self.strategy.calculate_indicators(df)
+        df['ATR'] = self.risk_management.calculate_atr_series(df)
+        df['signal'] = self.strategy.combine_indicators_signals(df)
+        df.loc[df['ATR'].isna(), 'signal'] = 0
+        return df
+
+    def _candidates(self, df):
+        # For every signal bar: limit price, SL/TP and the bar at which the limit order fills (-1 if never)
+        close = df['close'].to_numpy()
+        high = df['high'].to_numpy()
+        low = df['low'].to_numpy()
+        direction = df['signal'].to_numpy()
+        stop_distance = self.risk_management.atr_multiplier * df['ATR'].to_numpy()
+
+        index = np.flatnonzero(direction)
+        direction = direction[index]
+        price = close[index] * (1 - direction * self.entry_offset)
+        stop_loss = close[index] - direction * stop_distance[index]
+        take_profit = close[index] + direction * stop_distance[index] * self.risk_management.risk_ratio
+        # Same guard as place_order: keep the stop on the losing side of the limit price
+        bad_stop = (stop_loss - price) * direction >= 0
+        stop_loss = np.where(bad_stop, price * (1 - direction * 0.005), stop_loss)
+
+        n = len(close)
+        fill_bar = np.full(len(index), -1)
+        for offset in range(self.fill_bars, 0, -1):
+            bar = index + offset
+            valid = bar < n
+            bar = np.minimum(bar, n - 1)
+            touched = valid & np.where(direction > 0, low[bar] <= price, high[bar] >= price)
+            fill_bar = np.where(touched, bar, fill_bar)
+
+        return index, direction, price, stop_loss, take_profit, fill_bar
+
+    def _exit(self, high, low, fill_bar, direction, stop_loss, take_profit, window=256):
+        # First bar from the fill onward that touches SL or TP; SL wins when both are touched
+        n = len(high)
+        start = fill_bar
+        while start < n:
+            end = min(start + window, n)
+            if direction > 0:
+                stopped = low[start:end] <= stop_loss
+                target = high[start:end] >= take_profit
+            else:
+                stopped = high[start:end] >= stop_loss
+                target = low[start:end] <= take_profit
+            hit = stopped | target
+            if hit.any():
+                offset = int(hit.argmax())
+                if stopped[offset]:
+                    return start + offset, stop_loss
+                return start + offset, take_profit
+            start = end
+            window *= 2
+        return None, None
+
+    def run(self, df):
+        return self.run_prepared(self.prepare(df))
+
+    def run_prepared(self, df):
+        # df from prepare(); SL/TP settings can change between calls as long as atr_period does not
+        high = df['high'].to_numpy()
+        low = df['low'].to_numpy()
+        timestamps = df['timestamp'].to_numpy()
+        index, direction, price, stop_loss, take_profit, fill_bar = self._candidates(df)
+
+        trades = []
+        # Walk only the trades actually taken: the next candidate is the first signal after the
+        # previous position and its cooldown are over (or after an unfilled order expired).
+        position = 0
+        while position < len(index):
+            if fill_bar[position] < 0:
+                position = np.searchsorted(index, index[position] + self.fill_bars + 1)
+                continue
+            exit_bar, exit_price = self._exit(high, low, fill_bar[position], direction[position],
+                                              stop_loss[position], take_profit[position])
+            if exit_bar is None:
+                break
+            pnl = direction[position] * (exit_price - price[position]) * self.qty
+            fees = (price[position] + exit_price) * self.qty * self.fee_rate
+            trades.append((timestamps[index[position]], timestamps[exit_bar], 'long' if direction[position] > 0 else 'short',
+                           price[position], exit_price, stop_loss[position], take_profit[position], pnl - fees))
+            position = np.searchsorted(index, exit_bar + self.cooldown_bars + 1)
+
+        trades = pd.DataFrame(trades, columns=['entry_time', 'exit_time', 'side', 'entry_price', 'exit_price',
+                                               'stop_loss', 'take_profit', 'pnl'])
+        return self.report(trades), trades
+
+    def report(self, trades):
+        if trades.empty:
+            return {'trades': 0, 'total_pnl': 0.0, 'win_rate': 0.0, 'max_drawdown': 0.0, 'profit_factor': 0.0}
+        equity = trades['pnl'].cumsum()
+        drawdown = (equity.cummax().clip(lower=0) - equity).max()
+        gross_profit = trades.loc[trades['pnl'] > 0, 'pnl'].sum()
+        gross_loss = -trades.loc[trades['pnl'] < 0, 'pnl'].sum()
+        return {
+            'trades': len(trades),
+            'total_pnl': float(equity.iloc[-1]),
+            'win_rate': float((trades['pnl'] > 0).mean()),
+            'max_drawdown': float(drawdown),
+            'profit_factor': float(gross_profit / gross_loss) if gross_loss else float('inf'),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the combined indicator strategy")
+    parser.add_argument("csv", nargs="?", help="candles with timestamp, open, high, low, close columns")
+    parser.add_argument("--store", help="read candles from this KlineStore directory instead of a CSV")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--start", type=int, help="first bar timestamp (ms) to load from the store")
+    parser.add_argument("--end", type=int, help="last bar timestamp (ms) to load from the store")
+    parser.add_argument("--interval", type=int, default=1, help="bar interval in minutes")
+    parser.add_argument("--atr-multiplier", type=float, default=1.0)
+    parser.add_argument("--risk-ratio", type=float, default=1.0)
+    parser.add_argument("--qty", type=float, default=1.0)
+    parser.add_argument("--fee-rate", type=float, default=0.0)
+    parser.add_argument("--trades", help="write the trade list to this CSV file")
+    args = parser.parse_args()
+
+    backtester = Backtester(
+        RiskManagement(atr_multiplier=args.atr_multiplier, risk_ratio=args.risk_ratio),
+        interval_minutes=args.interval, qty=args.qty, fee_rate=args.fee_rate
+    )
+    if args.store:
+        arrays = KlineStore(args.store).load(args.symbol, args.interval, args.start, args.end)
+        if arrays is None:
+            parser.error(f"No stored klines for {args.symbol} {args.interval} in {args.store}")
+        candles = backtester.strategy.prepare_dataframe(arrays)
+    elif args.csv:
+        candles = pd.read_csv(args.csv)
+    else:
+        parser.error("Either a CSV file or --store is required")
+    summary, trades = backtester.run(candles)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    if args.trades:
+        trades.to_csv(args.trades, index=False)
@@ -0,0 +1,229 @@
+# benchmarks.py
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from indicators import Indicators
+from risk_management import RiskManagement
+from strategies import Strategies
+from bybit_demo_session import BybitDemoSession
+from indicator_cache import IndicatorCache
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000, 1000000)
+
+
+def make_klines(n, seed=42):
+    # Deterministic random-walk candles in /v5/market/kline format (strings, newest first)
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.0005, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.0005, n))
+    volume = rng.uniform(1, 100, n)
+    start = 1725000000000
+    rows = [
+        [str(start + i * 60000), repr(o), repr(h), repr(l), repr(c), repr(v), repr(v * c)]
+        for i, (o, h, l, c, v) in enumerate(zip(open_.tolist(), high.tolist(), low.tolist(), close.tolist(), volume.tolist()))
+    ]
+    rows.reverse()
+    return rows
+
+
+class MockExchange:
+    # In-memory stand-in for BybitDemoSession: no open positions or orders, fixed ticker
+    _position_idx = BybitDemoSession._position_idx
+    _limit_prices = BybitDemoSession._limit_prices
+
+    def __init__(self, klines):
+        self.klines = klines
+        self.api_key = "benchmark"
+        self.api_secret = "benchmark"
+        self.leverage_cache = {}
+        self.requests = 0
+
+    def get_transport_stats(self):
+        return {"requests": self.requests}
+
+    def get_historical_data(self, symbol, interval, limit, start=None, end=None):
+        self.requests += 1
+        rows = self.klines
+        if start is not None:
+            rows = [row for row in rows[:limit] if int(row[0]) >= start]
+        return rows[:limit]
+
+    def fetch_positions(self, symbol):
+        self.requests += 1
+        return [{"size": "0", "updatedTime": "0", "leverage": "10"}]
+
+    def fetch_open_orders(self, symbol):
+        self.requests += 1
+        return []
+
+    def fetch_ticker(self, symbol):
+        self.requests += 1
+        return {"lastPrice": self.klines[0][4]}
+
+    def place_order(self, **kwargs):
+        self.requests += 1
+        return {"orderId": "benchmark"}
+
+    def set_leverage(self, symbol, leverage):
+        self.requests += 1
+        self.leverage_cache[symbol] = float(leverage)
+
+    def send_prepared(self, endpoint, build_body):
+        # Builds and signs the body like the real session, without sending it
+        self.requests += 1
+        build_body()
+        return {"retCode": 0, "result": {"orderId": "benchmark"}}
+
+    def get_server_time(self):
+        return time.time() * 1000
+
+    def cancel_order(self, order_id, symbol):
+        self.requests += 1
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    # Median seconds per call; calls are batched so each sample lasts at least min_time
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1000:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "calls": number * repeat}
+
+
+def make_bot(klines):
+    os.environ.setdefault("BYBIT_API_KEY", "benchmark")
+    os.environ.setdefault("BYBIT_API_SECRET", "benchmark")
+    # A tick reads one row more than its window, in case the newest bar is still forming
+    os.environ["TRADING_LIMIT"] = str(len(klines) - 1)
+    # Events go to a scratch file only, so the timings include neither console output nor the bot's own log
+    os.environ["CONSOLE_LOG_LEVEL"] = "OFF"
+    os.environ["LOG_FILE"] = os.path.join(tempfile.gettempdir(), "benchmark_trading_bot.log")
+    from trading_bot import TradingBot
+    from kline_cache import KlineCache
+
+    bot = TradingBot()
+    exchange = MockExchange(klines)
+    bot.data_fetcher = exchange
+    bot.order_submitter.session = exchange
+    bot.kline_cache = KlineCache(exchange, max_bars=len(klines))
+    for snapshot in bot.snapshots.values():
+        snapshot.session = exchange
+        # Every tick refetches account state, as it would with a 10 s+ gap between ticks
+        snapshot.ttl = 0
+    return bot
+
+
+def run_benchmarks(sizes, repeat, include_job=True):
+    results = []
+    strategy = Strategies()
+    risk_management = RiskManagement()
+    indicator_cache = IndicatorCache(strategy)
+    for size in sizes:
+        klines = make_klines(size)
+        df = strategy.prepare_dataframe(klines)
+        # Same closed bars every call: the cache-hit path of a repeated tick within one bar
+        candles = strategy.prepare_candles(klines)
+        indicator_cache.calculate_indicators(candles, "BENCH", "1")
+        cases = {
+            "Indicators.calculate_ema": lambda: Indicators.calculate_ema(df, 9),
+            "Indicators.calculate_rsi": lambda: Indicators.calculate_rsi(df, 14),
+            "Indicators.calculate_macd": lambda: Indicators.calculate_macd(df),
+            "Indicators.calculate_stochastic": lambda: Indicators.calculate_stochastic(df),
+            "Indicators.calculate_bollinger_bands": lambda: Indicators.calculate_bollinger_bands(df),
+            "IndicatorCache.calculate_indicators": lambda: indicator_cache.calculate_indicators(candles, "BENCH", "1"),
+            "Strategies.prepare_dataframe": lambda: strategy.prepare_dataframe(klines),
+            "Strategies.prepare_candles": lambda: strategy.prepare_candles(klines),
+            "RiskManagement.calculate_atr": lambda: risk_management.calculate_atr(df),
+        }
+        bot = None
+        if include_job:
+            bot = make_bot(klines)
+            bot.job()
+            cases["TradingBot.job"] = bot.job
+
+        for name, fn in cases.items():
+            result = measure(fn, repeat=repeat)
+            results.append({"name": name, "size": size, **result})
+            print(f"{name:<40} {size:>8} bars  {result['median_s'] * 1000:10.3f} ms")
+        if bot:
+            bot.log_pipeline.close()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["size"]): r["median_s"] for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (regression threshold {threshold:.0%}):")
+    for result in results:
+        before = baseline.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        ratio = result["median_s"] / before
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{result['name']:<40} {result['size']:>8}  {ratio:6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark indicators, dataframe prep and the full job() tick")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="comma-separated window sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-job", action="store_true", help="leave out the TradingBot.job() benchmark")
+    parser.add_argument("--output", help="JSON results file (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = run_benchmarks(sizes, args.repeat, include_job=not args.skip_job)
+
+    output = args.output or os.path.join("bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
@@ -1,15 +1,65 @@
-import requests
 import time
 import hashlib
 import hmac
-import json
-import os
+import requests
+from event_log import events
+from http_transport import HttpTransport
+from rate_limiter import RateLimiter
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+# Request sequences shared by BybitDemoSession and AsyncBybitSession: each yields (method, endpoint, params),
+# gets the response back from the session's _drive() and returns the parsed result
+def fetch_all_open_orders_steps(settle_coin):
+    # Open orders of every symbol settled in settle_coin, following the page cursor
+    orders = []
+    cursor = None
+    while True:
+        params = {
+            "category": "linear",
+            "settleCoin": settle_coin,
+            "limit": 50
+        }
+        if cursor:
+            params["cursor"] = cursor
+        response = yield "GET", "/v5/order/realtime", params
+        if response['retCode'] != 0:
+            raise Exception(f"API Error: {response['retMsg']}")
+        page = response['result']['list']
+        orders.extend(page)
+        cursor = response['result'].get('nextPageCursor')
+        if not page or not cursor:
+            return orders
+
+
+def send_batch_steps(endpoint, items):
+    # One batch request; returns each item's result merged with its own code/msg from retExtInfo
+    response = yield "POST", endpoint, {"category": "linear", "request": items}
+    if response['retCode'] != 0:
+        raise Exception(f"API Error: {response['retMsg']}")
+    results = response['result']['list']
+    infos = (response.get('retExtInfo') or {}).get('list') or [{}] * len(results)
+    return [{**result, "code": info.get('code', 0), "msg": info.get('msg', "")}
+            for result, info in zip(results, infos)]
+
 
 class BybitDemoSession:
-    def __init__(self, api_key, api_secret):
+    # Most items /v5/order/create-batch and cancel-batch accept per request for linear contracts
+    BATCH_LIMIT = 20
+
+    def __init__(self, api_key, api_secret, base_url="https://api-demo.bybit.com", pool_maxsize=10, metrics=None,
+                 rate_limiter=None):
         self.api_key = api_key
         self.api_secret = api_secret
-        self.base_url = "https://api-demo.bybit.com"
+        self.base_url = base_url
+        # Optional metrics.Metrics; records per-endpoint latency and error counts
+        self.metrics = metrics
+        self.transport = HttpTransport(self.base_url, pool_maxsize=pool_maxsize)
+        # Shared by every thread using this session; orders are scheduled ahead of market data reads
+        self.rate_limiter = rate_limiter or RateLimiter(metrics=metrics)
+        # symbol -> leverage known to be set on the exchange, so set_leverage can skip the round trip
+        self.leverage_cache = {}
 
     def _generate_signature(self, params):
         param_str = '&'.join([f'{k}={params[k]}' for k in sorted(params)])
@@ -18,24 +68,106 @@ class BybitDemoSession:
     def _get_timestamp(self):
         return str(int(time.time() * 1000))
 
-    def send_request(self, method, endpoint, params=None):
-        if params is None:
-            params = {}
-
+    def _sign(self, params):
+        # Also re-signs: a retried request needs a fresh timestamp to stay within recv_window
+        params.pop('sign', None)
         params['api_key'] = self.api_key
         params['timestamp'] = self._get_timestamp()
         params['sign'] = self._generate_signature(params)
+        return params
 
-        if method == "GET":
-            response = requests.get(f"{self.base_url}{endpoint}", params=params)
-        elif method == "POST":
-            response = requests.post(f"{self.base_url}{endpoint}", json=params)
-        else:
+    def send_request(self, method, endpoint, params=None):
+        if params is None:
+            params = {}
+
+        if method not in ("GET", "POST"):
             raise ValueError("Unsupported HTTP method")
 
-        return response.json()
+        start = time.perf_counter()
+        try:
+            # GETs are repeated after a lost connection, a timeout or a 429/5xx. A request rejected with 10006
+            # was not executed, so it is safe to send once more after the reset. Every attempt is signed afresh
+            # and goes through the rate limiter again.
+            attempts = self.transport.attempts(method)
+            attempt = 0
+            throttled_retry = True
+            while True:
+                self._sign(params)
+                self.rate_limiter.acquire(endpoint)
+                try:
+                    if method == "GET":
+                        http_response = self.transport.request("GET", endpoint, params=params)
+                    else:
+                        http_response = self.transport.request("POST", endpoint, json=params)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt + 1 >= attempts:
+                        raise
+                    self.transport.backoff(attempt)
+                    attempt += 1
+                    continue
+                if http_response.status_code in HttpTransport.RETRY_STATUSES and attempt + 1 < attempts:
+                    self.transport.backoff(attempt)
+                    attempt += 1
+                    continue
+                response = http_response.json()
+                self.rate_limiter.update(endpoint, http_response.headers, response.get('retCode'))
+                if response.get('retCode') == RateLimiter.THROTTLED_RET_CODE and throttled_retry:
+                    throttled_retry = False
+                    continue
+                break
+        except Exception:
+            if self.metrics:
+                self.metrics.inc("request_errors", endpoint=endpoint)
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+        if self.metrics and response.get('retCode') != 0:
+            self.metrics.inc("request_errors", endpoint=endpoint)
+        return response
 
-    def get_historical_data(self, symbol, interval, limit):
+    def send_prepared(self, endpoint, build_body):
+        # POST of a pre-built JSON body. build_body() returns freshly signed bytes; it runs after the rate
+        # limiter grants the request, and again for the one retry after a 10006.
+        start = time.perf_counter()
+        try:
+            for attempt in range(2):
+                self.rate_limiter.acquire(endpoint)
+                http_response = self.transport.request("POST", endpoint, data=build_body(), headers=JSON_HEADERS)
+                response = http_response.json()
+                self.rate_limiter.update(endpoint, http_response.headers, response.get('retCode'))
+                if response.get('retCode') != RateLimiter.THROTTLED_RET_CODE or attempt:
+                    break
+        except Exception:
+            if self.metrics:
+                self.metrics.inc("request_errors", endpoint=endpoint)
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+        if self.metrics and response.get('retCode') != 0:
+            self.metrics.inc("request_errors", endpoint=endpoint)
+        return response
+
+    def get_transport_stats(self):
+        return self.transport.get_stats()
+
+    def get_rate_limit_stats(self):
+        return self.rate_limiter.get_stats()
+
+    def get_server_time(self):
+        try:
+            response = self.transport.request("GET", "/v5/market/time").json()
+            if response['retCode'] != 0:
+                raise Exception(f"API Error: {response['retMsg']}")
+            return int(response['result']['timeNano']) / 1e6
+        except Exception as e:
+            events.error("error", where="server_time", error=repr(e))
+            return None
+
+    def get_historical_data(self, symbol, interval, limit, start=None, end=None):
         try:
             endpoint = "/v5/market/kline"
             params = {
@@ -44,16 +176,22 @@ class BybitDemoSession:
                 "interval": interval,
                 "limit": limit
             }
+            if start is not None:
+                params["start"] = start
+            if end is not None:
+                params["end"] = end
             response = self.send_request("GET", endpoint, params)
             if response['retCode'] != 0:
                 raise Exception(f"API Error: {response['retMsg']}")
             return response['result']['list']
         except Exception as e:
-            print(f"Ошибка при получении исторических данных: {e}")
+            events.error("error", where="historical_data", symbol=symbol, error=repr(e))
             return None
         
     def set_leverage(self, symbol, leverage):
         try:
+            if self.leverage_cache.get(symbol) == float(leverage):
+                return
             endpoint = "/v5/position/set-leverage"
             params = {
                 "category": "linear",
@@ -62,121 +200,169 @@ class BybitDemoSession:
                 "sellLeverage": str(leverage)
             }
             response = self.send_request("POST", endpoint, params)
-            if response['retCode'] != 0:
+            # 110043: leverage not modified, i.e. it already has this value
+            if response['retCode'] not in (0, 110043):
                 raise Exception(f"API Error: {response['retMsg']}")
-            print(f"Leverage set to {leverage}x for {symbol}.")
+            self.leverage_cache[symbol] = float(leverage)
+            events.info("leverage", symbol=symbol, leverage=leverage)
         except Exception as e:
-            print(f"Ошибка при установке плеча: {e}")
+            events.error("error", where="set_leverage", symbol=symbol, error=repr(e))
 
-    def place_order(self, symbol, side, qty, current_price, leverage, stop_loss=None, take_profit=None):
-        try:
-            # Set leverage before placing an order
-            self.set_leverage(symbol, leverage=leverage)
-            
-            endpoint = "/v5/order/create"
-            # Manually set positionIdx based on known position mode:
-            # For Hedge Mode: 1 for long (buy), 2 for short (sell)
-            # For One-way Mode: 0
-            position_mode = "one_way"  # Set this to "hedge" if you are in hedge mode
-            
-            if position_mode == "hedge":
-                position_idx = 1 if side.lower() == 'buy' else 2
-            else:  # one_way
-                position_idx = 0
-
-            # Adjust price based on the side of the orderare you st
-            if side.lower() == 'buy':
+    def _position_idx(self, side):
+        # Manually set positionIdx based on known position mode:
+        # For Hedge Mode: 1 for long (buy), 2 for short (sell)
+        # For One-way Mode: 0
+        position_mode = "one_way"  # Set this to "hedge" if you are in hedge mode
+
+        if position_mode == "hedge":
+            return 1 if side.lower() == 'buy' else 2
+        return 0  # one_way
+
+    def _limit_prices(self, symbol, side, current_price, stop_loss=None, price=None):
+        # Adjust price based on the side of the order, unless a price was taken from the order book
+        if side.lower() == 'buy':
+            if price is None:
                 price = current_price * 0.9999  # 0.01% below the current market price
-                if stop_loss and stop_loss >= price:
-                    print("Stop-loss is higher than or equal to the limit price for a Buy order. Adjusting stop-loss...")
-                    stop_loss = price * 0.995  # Ensure stop-loss is slightly below the limit price
-            else:
+            if stop_loss and stop_loss >= price:
+                events.warning("stop_loss_adjusted", symbol=symbol, side=side, stop_loss=stop_loss, price=price)
+                stop_loss = price * 0.995  # Ensure stop-loss is slightly below the limit price
+        else:
+            if price is None:
                 price = current_price * 1.0001  # 0.01% above the current market price
-                if stop_loss and stop_loss <= price:
-                    print("Stop-loss is lower than or equal to the limit price for a Sell order. Adjusting stop-loss...")
-                    stop_loss = price * 1.005  # Ensure stop-loss is slightly above the limit price
+            if stop_loss and stop_loss <= price:
+                events.warning("stop_loss_adjusted", symbol=symbol, side=side, stop_loss=stop_loss, price=price)
+                stop_loss = price * 1.005  # Ensure stop-loss is slightly above the limit price
+        return price, stop_loss
 
-            order_params = {
-                "category": "linear",
-                "symbol": symbol,
-                "side": side,
-                "orderType": "Limit",
-                "qty": str(qty),  # Convert quantity to string
-                "price": str(price),  # Ensure price is sent as a string
-                "positionIdx": position_idx,  # Use the positionIdx determined above
-            }
+    def _prepare_order(self, symbol, side, qty, current_price, stop_loss=None, take_profit=None):
+        position_idx = self._position_idx(side)
+        price, stop_loss = self._limit_prices(symbol, side, current_price, stop_loss)
+
+        order_params = {
+            "category": "linear",
+            "symbol": symbol,
+            "side": side,
+            "orderType": "Limit",
+            "qty": str(qty),  # Convert quantity to string
+            "price": str(price),  # Ensure price is sent as a string
+            "positionIdx": position_idx,  # Use the positionIdx determined above
+        }
 
-            if stop_loss:
-                order_params["stopLoss"] = str(stop_loss)
-            if take_profit:
-                order_params["takeProfit"] = str(take_profit)
+        if stop_loss:
+            order_params["stopLoss"] = str(stop_loss)
+        if take_profit:
+            order_params["takeProfit"] = str(take_profit)
+        return order_params
 
+    def place_order(self, symbol, side, qty, current_price, leverage, stop_loss=None, take_profit=None):
+        try:
+            # Set leverage before placing an order
+            self.set_leverage(symbol, leverage=leverage)
+
+            endpoint = "/v5/order/create"
+            order_params = self._prepare_order(symbol, side, qty, current_price, stop_loss, take_profit)
             response = self.send_request("POST", endpoint, order_params)
             if response['retCode'] != 0:
                 raise Exception(f"API Error: {response['retMsg']}")
 
             return response['result']
         except Exception as e:
-            print(f"Ошибка при размещении ордера: {e}")
+            events.error("error", where="place_order", symbol=symbol, error=repr(e))
             return None
 
 
 
-    def get_open_positions(self, symbol):
+    def fetch_positions(self, symbol):
+        endpoint = "/v5/position/list"
+        params = {
+            "category": "linear",
+            "symbol": symbol
+        }
+        response = self.send_request("GET", endpoint, params)
+        if response['retCode'] != 0:
+            raise Exception(f"API Error: {response['retMsg']}")
+        positions = response['result']['list']
+        if positions:
+            self.leverage_cache[symbol] = float(positions[0]['leverage'])
+        return positions
+
+    def fetch_open_orders(self, symbol):
+        endpoint = "/v5/order/realtime"
+        params = {
+            "category": "linear",
+            "symbol": symbol
+        }
+        response = self.send_request("GET", endpoint, params)
+        if response['retCode'] != 0:
+            raise Exception(f"API Error: {response['retMsg']}")
+        return response['result']['list']
+
+    def _drive(self, steps):
+        # Sends the requests of a shared request sequence (see fetch_all_open_orders_steps) one by one
         try:
-            endpoint = "/v5/position/list"
-            params = {
-                "category": "linear",
-                "symbol": symbol
-            }
-            response = self.send_request("GET", endpoint, params)
-            if response['retCode'] != 0:
-                raise Exception(f"API Error: {response['retMsg']}")
+            request = next(steps)
+            while True:
+                request = steps.send(self.send_request(*request))
+        except StopIteration as done:
+            return done.value
 
-            positions = response['result']['list']
-            active_positions = [pos for pos in positions if float(pos['size']) > 0]
+    def fetch_all_open_orders(self, settle_coin="USDT"):
+        return self._drive(fetch_all_open_orders_steps(settle_coin))
 
-            if active_positions:
-                print("Active Open Positions:")
-                print(json.dumps(active_positions, indent=4))
-            else:
-                print("No opened positions.")
+    def _send_batch(self, endpoint, items):
+        return self._drive(send_batch_steps(endpoint, items))
+
+    def cancel_orders_batch(self, orders):
+        # orders: [{"symbol": ..., "orderId": ...}], any mix of symbols; sent BATCH_LIMIT per request
+        results = []
+        for i in range(0, len(orders), self.BATCH_LIMIT):
+            chunk = [{"symbol": order['symbol'], "orderId": order['orderId']} for order in orders[i:i + self.BATCH_LIMIT]]
+            results.extend(self._send_batch("/v5/order/cancel-batch", chunk))
+        return results
+
+    def place_orders_batch(self, orders, leverage):
+        # orders: [{"symbol", "side", "qty", "current_price", "stop_loss", "take_profit"}]; priced like place_order
+        for symbol in {order['symbol'] for order in orders}:
+            self.set_leverage(symbol, leverage)
+        items = []
+        for order in orders:
+            params = self._prepare_order(order['symbol'], order['side'], order['qty'], order['current_price'],
+                                         order.get('stop_loss'), order.get('take_profit'))
+            del params['category']
+            items.append(params)
+        results = []
+        for i in range(0, len(items), self.BATCH_LIMIT):
+            results.extend(self._send_batch("/v5/order/create-batch", items[i:i + self.BATCH_LIMIT]))
+        return results
+
+    def fetch_ticker(self, symbol):
+        endpoint = "/v5/market/tickers"
+        params = {
+            "category": "linear",
+            "symbol": symbol
+        }
+        response = self.send_request("GET", endpoint, params)
+        if response['retCode'] != 0:
+            raise Exception(f"API Error: {response['retMsg']}")
+        return response['result']['list'][0]
 
+    def get_open_positions(self, symbol):
+        try:
+            positions = self.fetch_positions(symbol)
+            active_positions = [pos for pos in positions if float(pos['size']) > 0]
+
+            events.debug("positions", symbol=symbol, active=active_positions)
             return active_positions
         except Exception as e:
-            print(f"Ошибка при получении позиций: {e}")
+            events.error("error", where="positions", symbol=symbol, error=repr(e))
             return None
 
     def get_open_orders(self, symbol):
+        # Read-only: stale orders are cancelled by StaleOrderSweeper
         try:
-            endpoint = "/v5/order/realtime"
-            params = {
-                "category": "linear",
-                "symbol": symbol
-            }
-            response = self.send_request("GET", endpoint, params)
-            if response['retCode'] != 0:
-                raise Exception(f"API Error: {response['retMsg']}")
-
-            open_orders = response['result']['list']
-            current_time = time.time()
-            orders_to_cancel = []
-
-            for order in open_orders:
-                created_time = int(order['createdTime']) / 1000
-                if current_time - created_time > 180:  # 180 seconds = 3 minutes
-                    orders_to_cancel.append(order)
-
-            if orders_to_cancel:
-                for order in orders_to_cancel:
-                    self.cancel_order(order['orderId'], symbol)
-                    print(f"Order {order['orderId']} cancelled as it was older than 3 minutes.")
-            else:
-                print("No orders older than 3 minutes.")
-
-            return open_orders
+            return self.fetch_open_orders(symbol)
         except Exception as e:
-            print(f"Ошибка при получении лимитных ордеров: {e}")
+            events.error("error", where="open_orders", symbol=symbol, error=repr(e))
             return None
 
     def cancel_order(self, order_id, symbol):
@@ -190,45 +376,28 @@ class BybitDemoSession:
             response = self.send_request("POST", endpoint, params)
             if response['retCode'] != 0:
                 raise Exception(f"API Error: {response['retMsg']}")
-            print(f"Order {order_id} successfully cancelled.")
+            events.info("cancel", symbol=symbol, order_id=order_id, status="cancelled")
         except Exception as e:
-            print(f"Ошибка при отмене ордера {order_id}: {e}")
+            events.error("error", where="cancel_order", symbol=symbol, order_id=order_id, error=repr(e))
 
     def get_last_closed_position(self, symbol):
         try:
-            endpoint = "/v5/position/list"
-            params = {
-                "category": "linear",
-                "symbol": symbol
-            }
-            response = self.send_request("GET", endpoint, params)
-            if response['retCode'] != 0:
-                raise Exception(f"API Error: {response['retMsg']}")
-
-            positions = response['result']['list']
+            positions = self.fetch_positions(symbol)
             closed_positions = [pos for pos in positions if float(pos['size']) == 0]
 
             if closed_positions:
                 last_closed_position = max(closed_positions, key=lambda x: int(x['updatedTime']))
                 return last_closed_position
             else:
-                print("No closed positions found.")
+                events.debug("positions", symbol=symbol, closed=0)
                 return None
         except Exception as e:
-            print(f"Error fetching last closed position: {e}")
+            events.error("error", where="last_closed_position", symbol=symbol, error=repr(e))
             return None
         
     def get_real_time_price(self, symbol):
         try:
-            endpoint = "/v5/market/tickers"
-            params = {
-                "category": "linear",
-                "symbol": symbol
-            }
-            response = self.send_request("GET", endpoint, params)
-            if response['retCode'] != 0:
-                raise Exception(f"API Error: {response['retMsg']}")
-            return float(response['result']['list'][0]['lastPrice'])
+            return float(self.fetch_ticker(symbol)['lastPrice'])
         except Exception as e:
-            print(f"Ошибка при получении текущей цены: {e}")
+            events.error("error", where="real_time_price", symbol=symbol, error=repr(e))
             return None
\ No newline at end of file
@@ -0,0 +1,64 @@
+# candles.py
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume", "turnover")
+
+
+class Candles:
+    # Kline payload parsed once into contiguous int64/float64 arrays in chronological order.
+    # Column access returns pandas Series that wrap the arrays without copying, so Indicators and
+    # RiskManagement accept a Candles object wherever they take a DataFrame.
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self._series = {}
+
+    @classmethod
+    def from_klines(cls, rows):
+        if not rows:
+            # e.g. a new symbol or an empty kline response
+            arrays = {column: np.empty(0, dtype=np.float64) for column in COLUMNS}
+            arrays["timestamp"] = np.empty(0, dtype=np.int64)
+            return cls(arrays)
+        table = np.array(rows, dtype=np.float64)
+        if len(table) > 1 and table[0, 0] > table[-1, 0]:
+            # The exchange returns newest bars first
+            table = table[::-1]
+        arrays = {column: np.ascontiguousarray(table[:, i]) for i, column in enumerate(COLUMNS)}
+        arrays["timestamp"] = arrays["timestamp"].astype(np.int64)
+        return cls(arrays)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        # e.g. KlineStore.load(): already typed and sorted
+        return cls(dict(arrays))
+
+    def __len__(self):
+        return len(self.arrays["timestamp"])
+
+    def __contains__(self, column):
+        return column in self.arrays or column in self._series
+
+    def __getitem__(self, column):
+        series = self._series.get(column)
+        if series is None:
+            series = pd.Series(self.arrays[column], copy=False, name=column)
+            self._series[column] = series
+        return series
+
+    def __setitem__(self, column, values):
+        # Indicator columns computed from the candles
+        if not isinstance(values, pd.Series):
+            values = pd.Series(np.asarray(values), copy=False, name=column)
+        self._series[column] = values
+
+    def tail(self, n):
+        return Candles({column: values[-n:] for column, values in self.arrays.items()})
+
+    def to_dataframe(self):
+        df = pd.DataFrame(self.arrays, copy=False)
+        for column, series in self._series.items():
+            if column not in self.arrays:
+                df[column] = series.to_numpy()
+        return df
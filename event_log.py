@@ -0,0 +1,119 @@
+# event_log.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+
+class JsonLinesFormatter(logging.Formatter):
+    # One JSON object per line: time, level, event kind and the event's fields
+    def format(self, record):
+        event = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "event": getattr(record, "event", "message"),
+            "thread": record.threadName,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            event.update(fields)
+        else:
+            event["msg"] = record.getMessage()
+        return json.dumps(event, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        fields = getattr(record, "fields", None)
+        if fields:
+            text = " ".join(f"{key}={_console_value(value)}" for key, value in fields.items())
+            return f"{stamp} {record.levelname:<7} {record.event} {text}"
+        return f"{stamp} {record.levelname:<7} {record.getMessage()}"
+
+
+def _console_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return value
+
+
+class EventLogger:
+    # Structured events on top of a stdlib logger. Fields are only formatted by the background writer,
+    # and nothing at all is built for a level that is switched off.
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def enabled(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, kind, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, kind, extra={"event": kind, "fields": fields})
+
+    def debug(self, kind, **fields):
+        self.log(logging.DEBUG, kind, **fields)
+
+    def info(self, kind, **fields):
+        self.log(logging.INFO, kind, **fields)
+
+    def warning(self, kind, **fields):
+        self.log(logging.WARNING, kind, **fields)
+
+    def error(self, kind, **fields):
+        self.log(logging.ERROR, kind, **fields)
+
+
+# Shared by the bot modules; a no-op for INFO and below until setup_logging() installs the pipeline
+events = EventLogger("trading_bot")
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The queue never leaves the process, so records are passed as they are and all formatting
+    # happens on the listener thread
+    def prepare(self, record):
+        return record
+
+
+class LogPipeline:
+    # Root logger -> QueueHandler; a QueueListener thread does the formatting, file writes (with size-based
+    # rotation) and console output, so a log call on the trading path is only a queue put.
+    def __init__(self, path="trading_bot.log", level=logging.INFO, console_level=logging.INFO,
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.queue = queue.SimpleQueue()
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        file_handler.setLevel(level)
+        handlers = [file_handler]
+        if console_level is not None:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(ConsoleFormatter())
+            console_handler.setLevel(console_level)
+            handlers.append(console_handler)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_DeferredQueueHandler(self.queue))
+        root.setLevel(min(level, console_level if console_level is not None else level))
+        self.listener.start()
+        atexit.register(self.close)
+
+    def close(self):
+        # Drains whatever is still queued
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+def setup_logging(path="trading_bot.log", level="INFO", console_level="INFO", max_bytes=10 * 1024 * 1024,
+                  backup_count=5):
+    level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    if isinstance(console_level, str):
+        console_level = None if console_level.upper() == "OFF" else logging.getLevelName(console_level.upper())
+    return LogPipeline(path, level, console_level, max_bytes, backup_count)
@@ -0,0 +1,157 @@
+# event_scheduler.py
+
+import threading
+import time
+from event_log import events
+
+MINUTE_MS = 60 * 1000
+# Bybit weekly bars open on Monday 00:00 UTC; the Unix epoch was a Thursday
+WEEK_ORIGIN_MS = 4 * 24 * 60 * MINUTE_MS
+
+
+# Bybit kline intervals with a fixed length; the monthly 'M' cannot be aligned to and is not traded on
+BAR_INTERVALS = ('1', '3', '5', '15', '30', '60', '120', '240', '360', '720', 'D', 'W')
+
+
+def interval_to_ms(interval):
+    interval = str(interval)
+    if interval.isdigit():
+        return int(interval) * MINUTE_MS
+    if interval == 'D':
+        return 24 * 60 * MINUTE_MS
+    if interval == 'W':
+        return 7 * 24 * 60 * MINUTE_MS
+    raise ValueError(f"Interval {interval} has no fixed length and cannot be aligned")
+
+
+class ScheduledTask:
+    def __init__(self, name, fn, period_ms, origin_ms=0, delay_ms=0):
+        self.name = name
+        self.fn = fn
+        self.period_ms = period_ms
+        self.origin_ms = origin_ms
+        self.delay_ms = delay_ms
+        self.next_due_ms = None
+        self.thread = None
+        self.runs = 0
+        self.skips = 0
+        self.last_duration = 0.0
+
+    def schedule_after(self, now_ms):
+        # Next boundary strictly after now, plus the settle delay
+        boundaries = (now_ms - self.delay_ms - self.origin_ms) // self.period_ms + 1
+        self.next_due_ms = self.origin_ms + boundaries * self.period_ms + self.delay_ms
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.fn()
+        except Exception as e:
+            events.error("error", where="scheduled_task", task=self.name, error=repr(e))
+        finally:
+            self.last_duration = time.perf_counter() - start
+
+    def start(self):
+        self.runs += 1
+        self.thread = threading.Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        self.thread.start()
+
+
+class BarScheduler:
+    # Runs tasks on exchange-clock boundaries. Each task runs in its own thread; if the previous
+    # run is still going when the task is due again, that run is skipped rather than queued.
+    # `clock` is the time module or anything with the same time()/monotonic(), e.g. a simulator's clock;
+    # a clock with a `speed` runs that many times faster than the waits between tasks.
+    def __init__(self, server_time_fn=None, resync_seconds=600, sync_retry_seconds=1.0, max_sync_retry_seconds=60.0,
+                 clock=time):
+        self.server_time_fn = server_time_fn
+        self.clock = clock
+        self.speed = getattr(clock, "speed", 1.0) or 1.0
+        self.resync_seconds = resync_seconds
+        # Until the first sync succeeds, it is retried after a delay that doubles up to the maximum
+        self.sync_retry_seconds = sync_retry_seconds
+        self.max_sync_retry_seconds = max_sync_retry_seconds
+        self.offset_ms = 0.0
+        self.last_sync = None
+        self.tasks = []
+        self._stopped = threading.Event()
+
+    def sync_clock(self):
+        if self.server_time_fn is None:
+            return
+        before = self.clock.time() * 1000
+        server_ms = self.server_time_fn()
+        after = self.clock.time() * 1000
+        if server_ms is None:
+            return
+        # Assume the server stamped the response halfway through the round trip
+        self.offset_ms = server_ms - (before + after) / 2
+        self.last_sync = time.monotonic()
+        events.info("clock_sync", offset_ms=self.offset_ms)
+
+    def restore_offset(self, offset_ms):
+        # A saved offset lets run() start the first tasks without waiting for a clock sync;
+        # the loop re-syncs right after they have been started
+        self.offset_ms = offset_ms
+        self.last_sync = time.monotonic() - self.resync_seconds - 1
+
+    def now_ms(self):
+        return self.clock.time() * 1000 + self.offset_ms
+
+    def add_bar_task(self, name, fn, interval, delay_seconds=0.5):
+        # Fires shortly after every bar close of the given Bybit interval
+        origin = WEEK_ORIGIN_MS if str(interval) == 'W' else 0
+        task = ScheduledTask(name, fn, interval_to_ms(interval), origin, int(delay_seconds * 1000))
+        self.tasks.append(task)
+        return task
+
+    def add_periodic_task(self, name, fn, seconds):
+        task = ScheduledTask(name, fn, int(seconds * 1000))
+        self.tasks.append(task)
+        return task
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self, run_immediately=True):
+        if self.last_sync is None:
+            self.sync_clock()
+        now = self.now_ms()
+        for task in self.tasks:
+            task.schedule_after(now)
+            if run_immediately:
+                task.start()
+
+        retry_delay = self.sync_retry_seconds
+        next_retry = time.monotonic() + retry_delay
+        if self.last_sync is None and self.server_time_fn is not None:
+            events.warning("clock_sync_failed", retry_in=retry_delay)
+        while not self._stopped.is_set():
+            if self.last_sync is None:
+                if self.server_time_fn is not None and time.monotonic() >= next_retry:
+                    self.sync_clock()
+                    if self.last_sync is None:
+                        retry_delay = min(retry_delay * 2, self.max_sync_retry_seconds)
+                        next_retry = time.monotonic() + retry_delay
+                        events.warning("clock_sync_failed", retry_in=retry_delay)
+            elif time.monotonic() - self.last_sync > self.resync_seconds:
+                self.sync_clock()
+
+            task = min(self.tasks, key=lambda t: t.next_due_ms)
+            wait = (task.next_due_ms - self.now_ms()) / 1000 / self.speed
+            if wait > 0 and self._stopped.wait(min(wait, 1.0)):
+                break
+            if wait > 1.0:
+                continue
+
+            now = self.now_ms()
+            if task.is_running():
+                task.skips += 1
+                events.warning("task_skipped", task=task.name, reason="still_running")
+            else:
+                task.start()
+            # Always move to the next future boundary so missed runs never pile up
+            task.schedule_after(max(now, task.next_due_ms))
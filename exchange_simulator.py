@@ -0,0 +1,602 @@
+# exchange_simulator.py
+
+import argparse
+import json
+import os
+import threading
+import time
+import numpy as np
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from event_scheduler import interval_to_ms
+from kline_store import KlineStore
+from rate_limiter import RateLimiter
+
+
+class SimClock:
+    # Simulated exchange time: starts at start_ms and runs `speed` times faster than the wall clock.
+    # speed=0 freezes it so tests can step it with advance(). time() and monotonic() stand in for the time
+    # module in a TradingBot run against the simulator, in the (shifted) timestamps the bot is served.
+    def __init__(self, start_ms, speed=1.0, shift_ms=0):
+        self.start_ms = start_ms
+        self.speed = speed
+        self.shift_ms = shift_ms
+        self.offset_ms = 0
+        self._t0 = time.monotonic()
+
+    def now_ms(self):
+        return int(self.start_ms + self.offset_ms + (time.monotonic() - self._t0) * 1000 * self.speed)
+
+    def advance(self, ms):
+        self.offset_ms += ms
+
+    def time(self):
+        return (self.now_ms() + self.shift_ms) / 1000
+
+    def monotonic(self):
+        return self.now_ms() / 1000
+
+
+class BarPath:
+    # Intrabar price path assumed from OHLC: open -> low -> high -> close on up bars,
+    # open -> high -> low -> close on down bars, moving linearly through each leg.
+    def __init__(self, o, h, l, c):
+        self.points = (o, l, h, c) if c >= o else (o, h, l, c)
+
+    def price_at(self, f):
+        leg = min(int(f * 3), 2)
+        t = f * 3 - leg
+        return self.points[leg] + (self.points[leg + 1] - self.points[leg]) * t
+
+    def range_between(self, f0, f1):
+        prices = [self.price_at(f0), self.price_at(f1)]
+        prices += [self.points[k] for k in (1, 2) if f0 < k / 3 < f1]
+        return min(prices), max(prices)
+
+
+class Position:
+    def __init__(self, symbol, leverage=10.0):
+        self.symbol = symbol
+        self.side = ""
+        self.size = 0.0
+        self.avg_price = 0.0
+        self.leverage = leverage
+        self.stop_loss = 0.0
+        self.take_profit = 0.0
+        self.realised_pnl = 0.0
+        self.created_ms = 0
+        self.updated_ms = 0
+
+    def to_dict(self, mark_price, wall):
+        sign = 1 if self.side == "Buy" else -1
+        unrealised = sign * (mark_price - self.avg_price) * self.size if self.size else 0.0
+        return {
+            "symbol": self.symbol,
+            "side": self.side,
+            "size": str(self.size),
+            "avgPrice": str(self.avg_price),
+            "positionValue": str(self.avg_price * self.size),
+            "leverage": str(self.leverage),
+            "markPrice": str(mark_price),
+            "unrealisedPnl": str(unrealised),
+            "cumRealisedPnl": str(self.realised_pnl),
+            "stopLoss": str(self.stop_loss or ""),
+            "takeProfit": str(self.take_profit or ""),
+            "positionIdx": 0,
+            "createdTime": str(wall(self.created_ms)),
+            "updatedTime": str(wall(self.updated_ms)),
+        }
+
+
+class SymbolBook:
+    # Replayed candles, resting orders and the one-way position of a single symbol
+    def __init__(self, symbol, arrays, bar_ms):
+        self.symbol = symbol
+        self.timestamps = arrays["timestamp"]
+        self.open = arrays["open"]
+        self.high = arrays["high"]
+        self.low = arrays["low"]
+        self.close = arrays["close"]
+        self.volume = arrays["volume"]
+        self.turnover = arrays["turnover"]
+        self.bar_ms = bar_ms
+        self.orders = {}
+        self.position = Position(symbol)
+
+    def bar_index(self, now_ms):
+        # Index of the bar containing now_ms (-1 before the first bar)
+        return int(np.searchsorted(self.timestamps, now_ms, side="right")) - 1
+
+    def path(self, i):
+        return BarPath(self.open[i], self.high[i], self.low[i], self.close[i])
+
+    def fraction(self, i, now_ms):
+        return min(max((now_ms - self.timestamps[i]) / self.bar_ms, 0.0), 1.0)
+
+    def last_price(self, now_ms):
+        i = self.bar_index(now_ms)
+        if i < 0:
+            return float(self.open[0])
+        return float(self.path(i).price_at(self.fraction(i, now_ms)))
+
+    def kline_row(self, i, now_ms, shift_ms=0):
+        # Closed bars are returned as stored; the forming bar only shows the path travelled so far
+        f = self.fraction(i, now_ms)
+        if f >= 1.0:
+            o, h, l, c = self.open[i], self.high[i], self.low[i], self.close[i]
+            volume, turnover = self.volume[i], self.turnover[i]
+        else:
+            path = self.path(i)
+            o = self.open[i]
+            l, h = path.range_between(0.0, f)
+            c = path.price_at(f)
+            volume, turnover = self.volume[i] * f, self.turnover[i] * f
+        return [str(int(self.timestamps[i]) + shift_ms), str(float(o)), str(float(h)), str(float(l)), str(float(c)),
+                str(float(volume)), str(float(turnover))]
+
+
+class ExchangeSimulator:
+    # Bybit v5 linear endpoints used by the bot, served from stored candles on a simulated clock.
+    # Limit orders rest until the intrabar path crosses their price; position SL/TP trigger the same way
+    # (stop-loss is checked first when both are reached in one step).
+    def __init__(self, candles, interval="1", speed=1.0, start_ms=None, warmup_bars=200, fee_rate=0.0, wall_clock=None):
+        self.interval = str(interval)
+        self.bar_ms = interval_to_ms(self.interval)
+        self.books = {symbol: SymbolBook(symbol, arrays, self.bar_ms) for symbol, arrays in candles.items()}
+        if not self.books:
+            raise ValueError("No candles to replay")
+        if start_ms is None:
+            # Leave enough history before the clock for the bot's first kline request
+            start_ms = max(int(book.timestamps[min(warmup_bars, len(book.timestamps) - 1)]) for book in self.books.values())
+        # With wall_clock (the default at 1x), every timestamp the bot sees is shifted by whole bars so the
+        # replay starts "now", for a bot in another process judging order and position ages by time.time().
+        # At other speeds the replay timestamps are kept; run the bot with run_bot(), on the simulator's clock.
+        self.shift_ms = 0
+        if wall_clock is None:
+            wall_clock = speed == 1
+        if wall_clock:
+            wall_ms = int(time.time() * 1000)
+            start_ms += (wall_ms - start_ms) % self.bar_ms
+            self.shift_ms = wall_ms - start_ms
+        self.clock = SimClock(start_ms, speed, self.shift_ms)
+        self.end_ms = min(int(book.timestamps[-1]) + self.bar_ms for book in self.books.values())
+        self.fee_rate = fee_rate
+        self.processed_ms = start_ms
+        self._lock = threading.Lock()
+        self._next_order_id = 1
+        self.requests = {}
+        self.fills = 0
+        self.triggers = 0
+        # Per-endpoint request times within the last second (wall clock), for Bybit's per-UID limits
+        self.limit_windows = {}
+        self.throttled = 0
+
+    @classmethod
+    def from_store(cls, store, symbols, interval="1", start=None, end=None, **kwargs):
+        candles = {}
+        for symbol in symbols:
+            arrays = store.load(symbol, interval, start, end)
+            if arrays is None or len(arrays["timestamp"]) == 0:
+                raise ValueError(f"No stored klines for {symbol} {interval}")
+            candles[symbol] = arrays
+        return cls(candles, interval=interval, **kwargs)
+
+    def now_ms(self):
+        return min(self.clock.now_ms(), self.end_ms)
+
+    def finished(self):
+        return self.clock.now_ms() >= self.end_ms
+
+    # --- matching -----------------------------------------------------------------------------------
+
+    def _advance(self):
+        # Match everything the price path touched between the previous request and now
+        now = self.now_ms()
+        if now <= self.processed_ms:
+            return now
+        for book in self.books.values():
+            if book.orders or book.position.size:
+                self._match_book(book, self.processed_ms, now)
+        self.processed_ms = now
+        return now
+
+    def _match_book(self, book, from_ms, to_ms):
+        first = max(book.bar_index(from_ms), 0)
+        last = book.bar_index(to_ms)
+        for i in range(first, last + 1):
+            f0 = book.fraction(i, from_ms)
+            f1 = book.fraction(i, to_ms)
+            if f1 <= f0:
+                continue
+            path = book.path(i)
+            low, high = path.range_between(f0, f1)
+            start_price = path.price_at(f0)
+            event_ms = min(to_ms, int(book.timestamps[i]) + self.bar_ms)
+            self._fill_orders(book, low, high, start_price, event_ms)
+            self._trigger_position(book, low, high, start_price, event_ms)
+            if not book.orders and not book.position.size:
+                return
+
+    def _fill_orders(self, book, low, high, start_price, event_ms):
+        for order_id, order in list(book.orders.items()):
+            price = order["price"]
+            if order["side"] == "Buy" and low <= price:
+                # A limit already through the market when the step starts fills at the better price
+                fill_price = min(price, start_price)
+            elif order["side"] == "Sell" and high >= price:
+                fill_price = max(price, start_price)
+            else:
+                continue
+            del book.orders[order_id]
+            self._execute(book, order["side"], order["qty"], fill_price, event_ms, order["stopLoss"], order["takeProfit"])
+
+    def _trigger_position(self, book, low, high, start_price, event_ms):
+        position = book.position
+        if not position.size:
+            return
+        if position.side == "Buy":
+            if position.stop_loss and low <= position.stop_loss:
+                exit_price = min(position.stop_loss, start_price)
+            elif position.take_profit and high >= position.take_profit:
+                exit_price = max(position.take_profit, start_price)
+            else:
+                return
+            side = "Sell"
+        else:
+            if position.stop_loss and high >= position.stop_loss:
+                exit_price = max(position.stop_loss, start_price)
+            elif position.take_profit and low <= position.take_profit:
+                exit_price = min(position.take_profit, start_price)
+            else:
+                return
+            side = "Buy"
+        self.triggers += 1
+        self._execute(book, side, position.size, exit_price, event_ms)
+
+    def _execute(self, book, side, qty, price, event_ms, stop_loss=0.0, take_profit=0.0):
+        position = book.position
+        self.fills += 1
+        position.realised_pnl -= qty * price * self.fee_rate
+        if not position.size or position.side == side:
+            if not position.size:
+                position.created_ms = event_ms
+            position.avg_price = (position.avg_price * position.size + price * qty) / (position.size + qty)
+            position.size += qty
+            position.side = side
+            if stop_loss:
+                position.stop_loss = stop_loss
+            if take_profit:
+                position.take_profit = take_profit
+        else:
+            closed = min(qty, position.size)
+            sign = 1 if position.side == "Buy" else -1
+            position.realised_pnl += sign * (price - position.avg_price) * closed
+            position.size = round(position.size - closed, 12)
+            if not position.size:
+                position.side = ""
+                position.avg_price = 0.0
+                position.stop_loss = position.take_profit = 0.0
+            if qty > closed:
+                # Flip to the other side with the remainder
+                self._execute(book, side, qty - closed, price, event_ms, stop_loss, take_profit)
+                return
+        position.updated_ms = event_ms
+
+    # --- endpoints ----------------------------------------------------------------------------------
+
+    def handle(self, method, path, params):
+        return self.handle_http(method, path, params)[0]
+
+    def handle_http(self, method, path, params):
+        # Returns (response body, response headers)
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            handler = self.ROUTES.get((method, path))
+            if handler is None:
+                return _error(10404, f"Unknown endpoint {method} {path}"), {}
+            headers, allowed = self._rate_limit(path)
+            if not allowed:
+                self.throttled += 1
+                return _error(RateLimiter.THROTTLED_RET_CODE, "Too many visits!"), headers
+            now = self._advance()
+            try:
+                return handler(self, params, now), headers
+            except (KeyError, ValueError) as e:
+                return _error(10001, f"params error: {e}"), headers
+
+    def _rate_limit(self, path):
+        limit = RateLimiter.DEFAULT_LIMITS.get(path)
+        if limit is None:
+            return {}, True
+        wall_ms = int(time.time() * 1000)
+        window = self.limit_windows.setdefault(path, deque())
+        while window and window[0] <= wall_ms - 1000:
+            window.popleft()
+        allowed = len(window) < limit
+        if allowed:
+            window.append(wall_ms)
+        headers = {
+            "X-Bapi-Limit": str(limit),
+            "X-Bapi-Limit-Status": str(limit - len(window)),
+            "X-Bapi-Limit-Reset-Timestamp": str(window[0] + 1000),
+        }
+        return headers, allowed
+
+    def _book(self, params):
+        symbol = params.get("symbol")
+        if symbol not in self.books:
+            raise ValueError(f"symbol invalid: {symbol}")
+        return self.books[symbol]
+
+    def _wall(self, ms):
+        return ms + self.shift_ms if ms else 0
+
+    def _time(self, params, now):
+        wall = self._wall(now)
+        return _ok({"timeSecond": str(wall // 1000), "timeNano": str(wall * 1000000)}, wall)
+
+    def _kline(self, params, now):
+        book = self._book(params)
+        if str(params.get("interval")) != self.interval:
+            raise ValueError(f"only interval {self.interval} is replayed")
+        limit = min(int(params.get("limit", 200)), 1000)
+        end = min(int(params.get("end", self._wall(now))) - self.shift_ms, now)
+        last = book.bar_index(end)
+        first = max(last - limit + 1, 0)
+        if "start" in params:
+            first = max(first, int(np.searchsorted(book.timestamps, int(params["start"]) - self.shift_ms, side="left")))
+        rows = [book.kline_row(i, now, self.shift_ms) for i in range(last, first - 1, -1)]
+        return _ok({"category": "linear", "symbol": book.symbol, "list": rows}, self._wall(now))
+
+    def _tickers(self, params, now):
+        book = self._book(params)
+        price = book.last_price(now)
+        i = max(book.bar_index(now), 0)
+        ticker = {
+            "symbol": book.symbol,
+            "lastPrice": str(price),
+            "markPrice": str(price),
+            "indexPrice": str(price),
+            "bid1Price": str(price),
+            "ask1Price": str(price),
+            "prevPrice24h": str(float(book.open[max(i - 86400000 // self.bar_ms, 0)])),
+        }
+        return _ok({"category": "linear", "list": [ticker]}, self._wall(now))
+
+    def _position_list(self, params, now):
+        book = self._book(params)
+        return _ok({"category": "linear", "list": [book.position.to_dict(book.last_price(now), self._wall)]}, self._wall(now))
+
+    def _set_leverage(self, params, now):
+        book = self._book(params)
+        leverage = float(params["buyLeverage"])
+        if leverage == book.position.leverage:
+            return _error(110043, "leverage not modified", self._wall(now))
+        book.position.leverage = leverage
+        return _ok({}, self._wall(now))
+
+    def _order_create(self, params, now):
+        book = self._book(params)
+        side = params["side"]
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"side invalid: {side}")
+        qty = float(params["qty"])
+        if qty <= 0:
+            raise ValueError("qty must be positive")
+        stop_loss = float(params.get("stopLoss") or 0)
+        take_profit = float(params.get("takeProfit") or 0)
+        order_id = f"sim-{self._next_order_id}"
+        self._next_order_id += 1
+
+        if params.get("orderType", "Limit") == "Market":
+            self._execute(book, side, qty, book.last_price(now), now, stop_loss, take_profit)
+            return _ok({"orderId": order_id, "orderLinkId": params.get("orderLinkId", "")}, self._wall(now))
+
+        price = float(params["price"])
+        if stop_loss and side == "Buy" and stop_loss >= price:
+            return _error(10001, "StopLoss set for Buy position should lower than base_price", self._wall(now))
+        if stop_loss and side == "Sell" and stop_loss <= price:
+            return _error(10001, "StopLoss set for Sell position should greater than base_price", self._wall(now))
+        book.orders[order_id] = {
+            "orderId": order_id,
+            "orderLinkId": params.get("orderLinkId", ""),
+            "side": side,
+            "qty": qty,
+            "price": price,
+            "stopLoss": stop_loss,
+            "takeProfit": take_profit,
+            "createdTime": now,
+        }
+        return _ok({"orderId": order_id, "orderLinkId": params.get("orderLinkId", "")}, self._wall(now))
+
+    def _order_realtime(self, params, now):
+        # One symbol, or every symbol settled in settleCoin; paged with an offset cursor
+        if "symbol" in params:
+            books = [self._book(params)]
+        else:
+            books = [book for symbol, book in self.books.items() if symbol.endswith(params.get("settleCoin", "USDT"))]
+        orders = [_order_dict(book.symbol, order, self._wall(order["createdTime"]))
+                  for book in books for order in book.orders.values()]
+        orders.sort(key=lambda order: int(order["createdTime"]), reverse=True)
+        offset = int(params.get("cursor") or 0)
+        limit = min(int(params.get("limit", 20)), 50)
+        page = orders[offset:offset + limit]
+        cursor = str(offset + limit) if offset + limit < len(orders) else ""
+        return _ok({"category": "linear", "list": page, "nextPageCursor": cursor}, self._wall(now))
+
+    def _order_cancel(self, params, now):
+        book = self._book(params)
+        order = book.orders.pop(params.get("orderId"), None)
+        if order is None:
+            return _error(110001, "order not exists or too late to cancel", self._wall(now))
+        return _ok({"orderId": order["orderId"], "orderLinkId": order["orderLinkId"]}, self._wall(now))
+
+    def _batch(self, params, now, handler):
+        # Per-item results in result.list and per-item codes in retExtInfo.list, like the batch endpoints
+        items = params["request"]
+        if len(items) > 20:
+            raise ValueError("too many requests in batch")
+        results, infos = [], []
+        for item in items:
+            try:
+                response = handler(self, item, now)
+            except (KeyError, ValueError) as e:
+                response = _error(10001, f"params error: {e}")
+            results.append(response["result"] or {"orderId": item.get("orderId", ""), "orderLinkId": ""})
+            infos.append({"code": response["retCode"], "msg": response["retMsg"]})
+        response = _ok({"list": results}, self._wall(now))
+        response["retExtInfo"] = {"list": infos}
+        return response
+
+    def _order_cancel_batch(self, params, now):
+        return self._batch(params, now, ExchangeSimulator._order_cancel)
+
+    def _order_create_batch(self, params, now):
+        return self._batch(params, now, ExchangeSimulator._order_create)
+
+    def _sim_stats(self, params, now):
+        return _ok({
+            "now": self._wall(now),
+            "replayTime": now,
+            "finished": self.finished(),
+            "requests": dict(self.requests),
+            "fills": self.fills,
+            "triggers": self.triggers,
+            "throttled": self.throttled,
+            "realisedPnl": {symbol: book.position.realised_pnl for symbol, book in self.books.items()},
+        }, self._wall(now))
+
+    ROUTES = {
+        ("GET", "/v5/market/time"): _time,
+        ("GET", "/v5/market/kline"): _kline,
+        ("GET", "/v5/market/tickers"): _tickers,
+        ("GET", "/v5/position/list"): _position_list,
+        ("POST", "/v5/position/set-leverage"): _set_leverage,
+        ("POST", "/v5/order/create"): _order_create,
+        ("GET", "/v5/order/realtime"): _order_realtime,
+        ("POST", "/v5/order/cancel"): _order_cancel,
+        ("POST", "/v5/order/cancel-batch"): _order_cancel_batch,
+        ("POST", "/v5/order/create-batch"): _order_create_batch,
+        ("GET", "/sim/stats"): _sim_stats,
+    }
+
+    def start_http_server(self, port, host="127.0.0.1"):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, reply):
+                response, headers = reply
+                body = json.dumps(response).encode("utf-8")
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                self._reply(simulator.handle_http("GET", url.path, params))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+                self._reply(simulator.handle_http("POST", urlparse(self.path).path, params))
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="exchange-simulator", daemon=True).start()
+        return server
+
+
+def run_bot(simulator, port, host="127.0.0.1"):
+    # A TradingBot on the rest feed, in this process and on the simulator's clock: bar ticks, housekeeping,
+    # cooldowns and stale-order ages all follow simulated time, at any speed. Stops when the replay ends.
+    os.environ.update(BYBIT_BASE_URL=f"http://{host}:{port}", MARKET_DATA_FEED="rest", EXCHANGE_CLIENT="sync",
+                      TRADING_SYMBOLS=",".join(simulator.books), TRADING_INTERVAL=simulator.interval)
+    os.environ.setdefault("BYBIT_API_KEY", "simulator")
+    os.environ.setdefault("BYBIT_API_SECRET", "simulator")
+    from trading_bot import TradingBot
+    bot = TradingBot(feed="rest", clock=simulator.clock)
+
+    def stop_at_end():
+        while not simulator.finished():
+            time.sleep(0.1)
+        if bot.scheduler:
+            bot.scheduler.stop()
+    threading.Thread(target=stop_at_end, name="simulator-end", daemon=True).start()
+    bot.run()
+    return bot
+
+
+def _ok(result, now=None):
+    return {"retCode": 0, "retMsg": "OK", "result": result, "retExtInfo": {}, "time": now or int(time.time() * 1000)}
+
+
+def _error(code, message, now=None):
+    return {"retCode": code, "retMsg": message, "result": {}, "retExtInfo": {}, "time": now or int(time.time() * 1000)}
+
+
+def _order_dict(symbol, order, created_ms):
+    return {
+        "orderId": order["orderId"],
+        "orderLinkId": order["orderLinkId"],
+        "symbol": symbol,
+        "side": order["side"],
+        "orderType": "Limit",
+        "price": str(order["price"]),
+        "qty": str(order["qty"]),
+        "leavesQty": str(order["qty"]),
+        "cumExecQty": "0",
+        "orderStatus": "New",
+        "timeInForce": "GTC",
+        "positionIdx": 0,
+        "stopLoss": str(order["stopLoss"] or ""),
+        "takeProfit": str(order["takeProfit"] or ""),
+        "createdTime": str(created_ms),
+        "updatedTime": str(created_ms),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local Bybit v5 simulator replaying stored candles")
+    parser.add_argument("--store", default="data/klines", help="KlineStore directory with the candles to replay")
+    parser.add_argument("--symbols", default="BTCUSDT", help="comma-separated symbols")
+    parser.add_argument("--interval", default="1")
+    parser.add_argument("--start", type=int, help="simulated start time (ms); default: 200 bars into the data")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall-clock second")
+    parser.add_argument("--fee-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--bot", action="store_true",
+                        help="also run the trading bot in this process, on the simulated clock (any --speed)")
+    args = parser.parse_args()
+
+    simulator = ExchangeSimulator.from_store(
+        KlineStore(args.store), [s.strip() for s in args.symbols.split(",") if s.strip()], args.interval,
+        speed=args.speed, start_ms=args.start, fee_rate=args.fee_rate
+    )
+    simulator.start_http_server(args.port, args.host)
+    if args.bot:
+        from dotenv import load_dotenv
+        load_dotenv()
+        bot = run_bot(simulator, args.port, args.host)
+        bot.log_pipeline.close()
+        print(json.dumps(simulator.handle("GET", "/sim/stats", {})["result"], indent=2))
+        raise SystemExit(0)
+    print(f"Simulating {', '.join(simulator.books)} at {args.speed:g}x on http://{args.host}:{args.port} "
+          f"(set BYBIT_BASE_URL to point the bot at it)")
+    try:
+        while not simulator.finished():
+            time.sleep(1)
+        print("Replay reached the end of the stored candles.")
+    except KeyboardInterrupt:
+        pass
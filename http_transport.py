@@ -0,0 +1,93 @@
+# http_transport.py
+
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport:
+    # (connect, read) timeouts in seconds
+    DEFAULT_TIMEOUT = (3.05, 10)
+    ENDPOINT_TIMEOUTS = {
+        "/v5/order/create": (3.05, 5),
+        "/v5/order/cancel": (3.05, 5),
+        "/v5/position/set-leverage": (3.05, 5),
+        "/v5/market/tickers": (3.05, 5),
+    }
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url, pool_maxsize=10, max_retries=3, backoff_base=0.2, backoff_cap=2.0, timeouts=None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeouts = dict(self.ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        # One keep-alive pool per host. Retries are left to the caller (not urllib3), since a signed request has
+        # to be signed again and take a new rate-limit token for every attempt.
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def attempts(self, method):
+        # Only idempotent GETs are ever repeated
+        return self.max_retries + 1 if method == "GET" else 1
+
+    def backoff(self, attempt):
+        # Full jitter: sleep somewhere in [0, min(cap, base * 2^attempt)]
+        self._record_retry()
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+
+    def request(self, method, endpoint, params=None, json=None, data=None, headers=None):
+        # One attempt. data/headers: an already-encoded body, e.g. a pre-built order from order_submitter.py
+        url = f"{self.base_url}{endpoint}"
+        timeout = self.timeouts.get(endpoint, self.DEFAULT_TIMEOUT)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, params=params, json=json, data=data, headers=headers,
+                                            timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            self._record(time.perf_counter() - start, error=True)
+            raise
+        self._record(time.perf_counter() - start, error=response.status_code >= 400)
+        return response
+
+    def _record(self, latency, error=False):
+        with self._lock:
+            self.requests_sent += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if error:
+                self.errors += 1
+
+    def _record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def get_stats(self):
+        pools = self.adapter.poolmanager.pools
+        connections = sum(pools[key].num_connections for key in pools.keys())
+        return {
+            "requests": self.requests_sent,
+            "connections_opened": connections,
+            "connections_reused": max(self.requests_sent - connections, 0),
+            "retries": self.retries,
+            "errors": self.errors,
+            "avg_latency_ms": (self.total_latency / self.requests_sent * 1000) if self.requests_sent else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+    def close(self):
+        self.session.close()
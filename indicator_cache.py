@@ -0,0 +1,152 @@
+# indicator_cache.py
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("EMA_9", "EMA_21", "RSI", "MACD", "MACD_signal", "Stochastic", "Stochastic_signal",
+           "Bollinger_upper", "Bollinger_middle", "Bollinger_lower")
+
+
+class IndicatorCache:
+    # Indicator columns of the closed bars, keyed by (symbol, interval, window start, last closed bar, window
+    # length, parameters). Between two bar closes only the forming (newest) bar changes, so a hit computes that
+    # one bar from the cached state instead of re-running every indicator over the whole window.
+    # Bounded LRU; the closed bars of a window never change, so entries need no other invalidation.
+    STOCHASTIC_PERIOD = 14
+    STOCHASTIC_SMOOTH = 3
+    BOLLINGER_WINDOW = 20
+
+    def __init__(self, strategy, max_entries=256, metrics=None):
+        self.strategy = strategy
+        self.max_entries = max_entries
+        self.metrics = metrics
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def params(self):
+        strategy = self.strategy
+        return (strategy.ema_fast, strategy.ema_slow, strategy.rsi_period, strategy.macd_fast, strategy.macd_slow,
+                strategy.macd_signal, self.STOCHASTIC_PERIOD, self.BOLLINGER_WINDOW)
+
+    def calculate_indicators(self, df, symbol, interval):
+        # Same columns as Strategies.calculate_indicators(df); the newest row is treated as the forming bar
+        timestamps = df['timestamp']
+        n = len(timestamps)
+        if n < 2:
+            return self.strategy.calculate_indicators(df)
+        key = (symbol, str(interval), int(timestamps.iloc[0]), int(timestamps.iloc[-2]), n, self.params())
+
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.metrics:
+            self.metrics.inc("indicator_cache", result="hit" if entry is not None else "miss")
+
+        if entry is None:
+            self.strategy.calculate_indicators(df)
+            entry = self._closed_state(df)
+            with self._lock:
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return df
+
+        forming = self._forming_bar(df, entry)
+        for column in COLUMNS:
+            df[column] = pd.Series(np.append(entry["columns"][column], forming[column]), copy=False, name=column)
+        return df
+
+    def _closed_state(self, df):
+        # Everything the forming bar's values depend on: the closed-bar columns plus the MACD's two EMAs
+        strategy = self.strategy
+        return {
+            "columns": {column: df[column].to_numpy(dtype=np.float64)[:-1].copy() for column in COLUMNS},
+            "macd_fast": float(strategy.indicators.calculate_ema(df, strategy.macd_fast).iloc[-2]),
+            "macd_slow": float(strategy.indicators.calculate_ema(df, strategy.macd_slow).iloc[-2]),
+        }
+
+    def _forming_bar(self, df, entry):
+        # Recurrences and windows of Indicators.*, evaluated for the newest bar only
+        strategy = self.strategy
+        columns = entry["columns"]
+        closes = df['close'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        close = closes[-1]
+        n = len(closes)
+
+        def ema(previous, span):
+            alpha = 2.0 / (span + 1)
+            return (1 - alpha) * previous + alpha * close
+
+        values = {
+            "EMA_9": ema(columns["EMA_9"][-1], strategy.ema_fast),
+            "EMA_21": ema(columns["EMA_21"][-1], strategy.ema_slow),
+        }
+        macd = ema(entry["macd_fast"], strategy.macd_fast) - ema(entry["macd_slow"], strategy.macd_slow)
+        alpha = 2.0 / (strategy.macd_signal + 1)
+        values["MACD"] = macd
+        values["MACD_signal"] = (1 - alpha) * columns["MACD_signal"][-1] + alpha * macd
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            period = strategy.rsi_period
+            if n >= period:
+                # The first bar's delta is NaN and counts as a zero gain/loss, like delta.where() does
+                deltas = np.diff(closes[-period - 1:]) if n > period else np.r_[0.0, np.diff(closes)]
+                gain = np.where(deltas > 0, deltas, 0.0).mean()
+                loss = np.where(deltas < 0, -deltas, 0.0).mean()
+                values["RSI"] = 100 - (100 / (1 + np.float64(gain) / np.float64(loss)))
+            else:
+                values["RSI"] = np.nan
+
+            period = self.STOCHASTIC_PERIOD
+            if n >= period:
+                highest = highs[-period:].max()
+                lowest = lows[-period:].min()
+                k_percent = 100 * ((close - lowest) / (highest - lowest))
+            else:
+                k_percent = np.nan
+            recent_k = np.r_[columns["Stochastic"][-(self.STOCHASTIC_SMOOTH - 1):], k_percent]
+            values["Stochastic"] = k_percent
+            values["Stochastic_signal"] = recent_k.mean() if len(recent_k) == self.STOCHASTIC_SMOOTH else np.nan
+
+            window = self.BOLLINGER_WINDOW
+            if n >= window:
+                middle = closes[-window:].mean()
+                std_dev = closes[-window:].std(ddof=1)
+                values["Bollinger_upper"] = middle + std_dev * 2
+                values["Bollinger_middle"] = middle
+                values["Bollinger_lower"] = middle - std_dev * 2
+            else:
+                values["Bollinger_upper"] = values["Bollinger_middle"] = values["Bollinger_lower"] = np.nan
+        return values
+
+    def export(self):
+        with self._lock:
+            return list(self.entries.items())
+
+    def restore(self, items):
+        with self._lock:
+            for key, entry in items:
+                self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -14,11 +14,11 @@ class Indicators:
         return 100 - (100 / (1 + rs))
 
     @staticmethod
-    def calculate_macd(df):
-        short_ema = df['close'].ewm(span=12, adjust=False).mean()
-        long_ema = df['close'].ewm(span=26, adjust=False).mean()
+    def calculate_macd(df, fast=12, slow=26, signal=9):
+        short_ema = df['close'].ewm(span=fast, adjust=False).mean()
+        long_ema = df['close'].ewm(span=slow, adjust=False).mean()
         macd = short_ema - long_ema
-        macd_signal = macd.ewm(span=9, adjust=False).mean()
+        macd_signal = macd.ewm(span=signal, adjust=False).mean()
         return macd, macd_signal
 
     @staticmethod
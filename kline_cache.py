@@ -0,0 +1,133 @@
+# kline_cache.py
+
+import time
+from collections import deque
+from event_scheduler import interval_to_ms
+
+
+def closed_rows(rows, interval_ms, now_ms):
+    # Rows newest first, as the exchange returns them. The newest row is the still-forming bar until its
+    # interval has passed; a strategy tick evaluates the bar that just closed, so that row is dropped.
+    if rows and int(rows[0][0]) + interval_ms > now_ms:
+        return rows[1:]
+    return rows
+
+
+class KlineCache:
+    # Maximum number of bars /v5/market/kline returns per request
+    MAX_PAGE = 1000
+
+    def __init__(self, session, max_bars=1000, store=None, clock=time):
+        self.session = session
+        self.max_bars = max_bars
+        # Bars kept per buffer: max_bars, or the longest window asked for if that is more. Every buffer is created
+        # with this length, whether it was fetched, seeded from the store, restored or built from pushed bars.
+        self.capacity = max_bars
+        # Optional KlineStore used to seed empty buffers instead of downloading the full window
+        self.store = store
+        self.clock = clock
+        # (symbol, interval) -> deque of kline rows in chronological order
+        self.buffers = {}
+
+    def _fetch(self, symbol, interval, start=None, total=None):
+        # Pages backwards from the newest bar until `start` is covered or `total` bars are fetched, whichever
+        # comes first. Returns rows newest first, like the exchange does.
+        rows = []
+        end = None
+        while True:
+            page_limit = self.MAX_PAGE if total is None else min(self.MAX_PAGE, total - len(rows))
+            page = self.session.get_historical_data(symbol, interval, page_limit, start=start, end=end)
+            if page is None:
+                return None
+            rows.extend(page)
+            if len(page) < page_limit or (total is not None and len(rows) >= total):
+                return rows
+            oldest = int(page[-1][0])
+            if start is not None and oldest <= start:
+                return rows
+            end = oldest - 1
+
+    def _new_buffer(self, key, rows):
+        # rows: chronological
+        buffer = self.buffers[key] = deque(rows, maxlen=self.capacity)
+        return buffer
+
+    def get_historical_data(self, symbol, interval, limit):
+        key = (symbol, interval)
+        buffer = self.buffers.get(key)
+        if limit > self.capacity:
+            self.capacity = limit
+        if buffer and buffer.maxlen < self.capacity:
+            # Filled before the longer window was asked for; the fetch below completes it once
+            buffer = self._new_buffer(key, buffer)
+
+        if not buffer and self.store is not None:
+            rows = self.store.get_historical_data(symbol, interval, self.capacity)
+            # Seeding only pays off while the gap up to now is shorter than the buffer; an older store would
+            # be paged forward bar by bar only to be pushed out again, so that case fetches `limit` bars instead
+            if rows and len(rows) >= limit and self._is_recent(int(rows[0][0]), interval):
+                buffer = self._new_buffer(key, reversed(rows))
+
+        if not buffer or len(buffer) < limit:
+            rows = self._fetch(symbol, interval, total=limit)
+            if rows is None:
+                return None
+            buffer = self._new_buffer(key, reversed(rows))
+        else:
+            # Only ask for the still-forming bar and anything newer. After a long outage, paging stops once a
+            # full buffer is covered: older bars in the gap would only be pushed out again.
+            rows = self._fetch(symbol, interval, start=int(buffer[-1][0]), total=buffer.maxlen)
+            if rows is None:
+                return None
+            for row in reversed(rows):
+                timestamp = int(row[0])
+                last_timestamp = int(buffer[-1][0])
+                if timestamp == last_timestamp:
+                    buffer[-1] = row
+                elif timestamp > last_timestamp:
+                    buffer.append(row)
+
+        return self.get_cached(symbol, interval, limit)
+
+    def _is_recent(self, timestamp, interval):
+        return self.clock.time() * 1000 - timestamp <= self.capacity * interval_to_ms(interval)
+
+    def get_cached(self, symbol, interval, limit):
+        buffer = self.buffers.get((symbol, interval))
+        if not buffer:
+            return None
+        # Same shape and order as the exchange response: newest bar first
+        return [buffer[-i] for i in range(1, min(limit, len(buffer)) + 1)]
+
+    def apply_bar(self, symbol, interval, row):
+        # Merge a single pushed bar (e.g. from the websocket feed) into the buffer
+        buffer = self.buffers.get((symbol, interval))
+        if buffer is None:
+            buffer = self._new_buffer((symbol, interval), ())
+        timestamp = int(row[0])
+        if buffer and timestamp == int(buffer[-1][0]):
+            buffer[-1] = row
+        elif not buffer or timestamp > int(buffer[-1][0]):
+            buffer.append(row)
+
+    def restore(self, symbol, interval, rows):
+        # rows: chronological, e.g. saved by a previous run; check them with verify() before use
+        self._new_buffer((symbol, interval), rows)
+
+    def verify(self, symbol, interval):
+        # A restored buffer is kept only if the exchange returns its newest closed bar unchanged
+        buffer = self.buffers.get((symbol, interval))
+        if buffer and len(buffer) >= 2:
+            row = buffer[-2]
+            timestamp = int(row[0])
+            page = self.session.get_historical_data(symbol, interval, 1, start=timestamp, end=timestamp)
+            if page and [float(value) for value in page[0]] == [float(value) for value in row]:
+                return True
+        self.buffers.pop((symbol, interval), None)
+        return False
+
+    def invalidate(self, symbol=None, interval=None):
+        if symbol is None:
+            self.buffers.clear()
+        else:
+            self.buffers.pop((symbol, interval), None)
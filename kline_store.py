@@ -0,0 +1,186 @@
+# kline_store.py
+
+import argparse
+import os
+import shutil
+import time
+import numpy as np
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume", "turnover")
+
+
+def _dtype(column):
+    return np.int64 if column == "timestamp" else np.float64
+
+
+def rows_to_arrays(rows):
+    # Kline rows as returned by /v5/market/kline (lists of strings) -> sorted, de-duplicated column arrays
+    if not rows:
+        return {column: np.empty(0, dtype=_dtype(column)) for column in COLUMNS}
+    table = np.array(rows, dtype=object)
+    arrays = {column: table[:, i].astype(np.float64) for i, column in enumerate(COLUMNS)}
+    arrays["timestamp"] = arrays["timestamp"].astype(np.int64)
+    return _sorted_unique(arrays)
+
+
+def _sorted_unique(arrays):
+    # Later rows win when the same timestamp appears twice (e.g. a bar that was still forming)
+    timestamps = arrays["timestamp"]
+    order = np.argsort(timestamps, kind="stable")[::-1]
+    _, first = np.unique(timestamps[order], return_index=True)
+    keep = order[first]
+    return {column: values[keep] for column, values in arrays.items()}
+
+
+class KlineStore:
+    # One directory per symbol/interval holding a raw little-endian file per column,
+    # so ranges can be memory-mapped without copying.
+    def __init__(self, root="data/klines"):
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol, str(interval))
+
+    def _recover(self, path):
+        # Finish a rewrite that was interrupted between the two renames
+        if not os.path.isdir(path) and os.path.isdir(path + ".tmp"):
+            os.replace(path + ".tmp", path)
+        if os.path.isdir(path + ".old"):
+            shutil.rmtree(path + ".old")
+
+    def load(self, symbol, interval, start=None, end=None):
+        path = self.path(symbol, interval)
+        self._recover(path)
+        if not os.path.isdir(path):
+            return None
+
+        sizes = [os.path.getsize(os.path.join(path, f"{column}.bin")) // 8 for column in COLUMNS]
+        # An interrupted append can leave columns of different length; only whole rows count
+        length = min(sizes)
+        if length == 0:
+            return {column: np.empty(0, dtype=_dtype(column)) for column in COLUMNS}
+        arrays = {
+            column: np.memmap(os.path.join(path, f"{column}.bin"), dtype=_dtype(column), mode="r", shape=(length,))
+            for column in COLUMNS
+        }
+
+        timestamps = arrays["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = length if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        return {column: values[lo:hi] for column, values in arrays.items()}
+
+    def bounds(self, symbol, interval):
+        arrays = self.load(symbol, interval)
+        if arrays is None or len(arrays["timestamp"]) == 0:
+            return None
+        return int(arrays["timestamp"][0]), int(arrays["timestamp"][-1])
+
+    def write(self, symbol, interval, rows):
+        new = rows_to_arrays(rows)
+        if len(new["timestamp"]) == 0:
+            return
+        path = self.path(symbol, interval)
+        existing = self.load(symbol, interval)
+
+        if existing is not None and len(existing["timestamp"]) and new["timestamp"][0] > existing["timestamp"][-1]:
+            # Fast path: strictly newer bars are appended in place
+            length = len(existing["timestamp"])
+            for column in COLUMNS:
+                with open(os.path.join(path, f"{column}.bin"), "r+b") as f:
+                    f.truncate(length * 8)
+                    f.seek(0, os.SEEK_END)
+                    f.write(new[column].astype(_dtype(column)).tobytes())
+            return
+
+        if existing is not None and len(existing["timestamp"]):
+            merged = {column: np.concatenate([existing[column], new[column]]) for column in COLUMNS}
+            new = _sorted_unique(merged)
+
+        tmp = path + ".tmp"
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for column in COLUMNS:
+            new[column].astype(_dtype(column)).tofile(os.path.join(tmp, f"{column}.bin"))
+        # Drop memory maps on the old files before swapping directories
+        existing = None
+        if os.path.isdir(path):
+            os.replace(path, path + ".old")
+        os.replace(tmp, path)
+        shutil.rmtree(path + ".old", ignore_errors=True)
+
+    def get_historical_data(self, symbol, interval, limit):
+        # Newest `limit` bars as kline rows, newest first, like /v5/market/kline
+        arrays = self.load(symbol, interval)
+        if arrays is None or len(arrays["timestamp"]) == 0:
+            return None
+        tail = {column: values[-limit:][::-1] for column, values in arrays.items()}
+        return [
+            [str(ts), str(o), str(h), str(l), str(c), str(v), str(t)]
+            for ts, o, h, l, c, v, t in zip(*(tail[column].tolist() for column in COLUMNS))
+        ]
+
+
+class KlineDownloader:
+    # Maximum number of bars /v5/market/kline returns per request
+    MAX_PAGE = 1000
+
+    def __init__(self, session, store, flush_pages=50, pause=0.05):
+        self.session = session
+        self.store = store
+        self.flush_pages = flush_pages
+        self.pause = pause
+
+    def _page_backwards(self, symbol, interval, start, end, flush):
+        # Pages from `end` back to `start`; when flush is set, pages are written every flush_pages
+        # so an interrupted download resumes from the oldest stored bar
+        pending = []
+        pages = 0
+        while True:
+            page = self.session.get_historical_data(symbol, interval, self.MAX_PAGE, start=start, end=end)
+            if page is None:
+                raise Exception(f"Kline download failed for {symbol} {interval} before {end}")
+            pending.extend(page)
+            pages += 1
+            if flush and pages % self.flush_pages == 0:
+                self.store.write(symbol, interval, pending)
+                pending = []
+            if len(page) < self.MAX_PAGE or int(page[-1][0]) <= start:
+                break
+            end = int(page[-1][0]) - 1
+            time.sleep(self.pause)
+        self.store.write(symbol, interval, pending)
+
+    def download(self, symbol, interval, start, end=None):
+        # Fetch [start, end] (ms), skipping whatever the store already covers
+        end = end if end is not None else int(time.time() * 1000)
+        bounds = self.store.bounds(symbol, interval)
+        if bounds is None:
+            self._page_backwards(symbol, interval, start, end, flush=True)
+            return
+
+        first, last = bounds
+        if end > last:
+            # Newer bars are merged in one write so no hole is left behind if interrupted
+            self._page_backwards(symbol, interval, last, end, flush=False)
+        if start < first:
+            self._page_backwards(symbol, interval, start, first - 1, flush=True)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from bybit_demo_session import BybitDemoSession
+
+    parser = argparse.ArgumentParser(description="Download historical klines into the local store")
+    parser.add_argument("symbol")
+    parser.add_argument("--interval", default="1")
+    parser.add_argument("--days", type=float, default=30, help="how far back to download")
+    parser.add_argument("--root", default=os.getenv("KLINE_STORE_DIR", "data/klines"))
+    args = parser.parse_args()
+
+    load_dotenv()
+    session = BybitDemoSession(os.getenv("BYBIT_API_KEY", ""), os.getenv("BYBIT_API_SECRET", ""))
+    store = KlineStore(args.root)
+    start = int((time.time() - args.days * 86400) * 1000)
+    KlineDownloader(session, store).download(args.symbol, args.interval, start)
+    print(f"{args.symbol} {args.interval}: {store.bounds(args.symbol, args.interval)}")
@@ -0,0 +1,199 @@
+# market_data_ws.py
+
+import json
+import queue
+import threading
+import time
+import websocket
+from event_log import events
+from event_scheduler import interval_to_ms
+from kline_cache import closed_rows
+from order_book import OrderBook
+
+
+class MarketDataStream:
+    def __init__(self, kline_cache, symbol, interval, limit, url="wss://stream.bybit.com/v5/public/linear",
+                 ping_interval=20, reconnect_delay=1.0, max_reconnect_delay=30.0, closed_bars=None,
+                 order_book_depth=None, record_path=None):
+        self.kline_cache = kline_cache
+        self.symbol = symbol
+        self.interval = interval
+        self.limit = limit
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.ticker = {}
+        self.last_price = None
+        # time.monotonic() of the last ticker message; the exchange pushes one whenever any ticker field changes
+        self.ticker_at = 0.0
+        # (symbol, start timestamp) of confirmed bars, consumed by the bot's main loop.
+        # Several streams may share one queue.
+        self.closed_bars = closed_bars if closed_bars is not None else queue.Queue()
+        self.last_confirmed = None
+        self.connected = threading.Event()
+        self.reconnects = 0
+        # Local L2 book from the orderbook.{depth} stream (depth 1, 50, 200 or 500 on linear); None when off
+        self.order_book = OrderBook(symbol, order_book_depth) if order_book_depth else None
+        # Raw orderbook messages appended as JSON lines, for replaying them through order_book.py
+        self.record_path = record_path
+        self._record_file = None
+
+        self._ws = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def topics(self):
+        topics = [f"kline.{self.interval}.{self.symbol}", f"tickers.{self.symbol}"]
+        if self.order_book:
+            topics.append(self.order_book.topic)
+        return topics
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="market-data-ws", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._ws:
+            self._ws.close()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.time()
+            # ping_timeout bounds each wait for data (no websocket-level pings are sent), so a stop() that closes
+            # the socket from another thread is noticed within a second instead of blocking the read forever
+            self._ws.run_forever(ping_timeout=1)
+            self.connected.clear()
+            if self._stopped.is_set():
+                break
+            # Reset the backoff after a connection that stayed up for a while
+            if time.time() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            events.warning("feed_disconnected", symbol=self.symbol, reconnect_in=delay)
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    def _on_open(self, ws):
+        # Backfill whatever was missed while disconnected, then resubscribe
+        rows = self.kline_cache.get_historical_data(self.symbol, self.interval, self.limit)
+        if rows is None:
+            events.error("error", where="feed_backfill", symbol=self.symbol)
+        else:
+            self._queue_missed_close(rows)
+        if self.order_book:
+            # Deltas missed while disconnected cannot be recovered; the subscription starts with a snapshot
+            self.order_book.reset()
+        ws.send(json.dumps({"op": "subscribe", "args": self.topics}))
+        self.connected.set()
+        threading.Thread(target=self._heartbeat, args=(ws,), name="market-data-ping", daemon=True).start()
+
+    def _queue_missed_close(self, rows):
+        # A bar that closed while disconnected never got its confirm message; evaluate the newest such bar now
+        closed = closed_rows(rows, interval_to_ms(self.interval), time.time() * 1000)
+        if closed and self.last_confirmed is not None and int(closed[0][0]) > self.last_confirmed:
+            self.last_confirmed = int(closed[0][0])
+            events.info("feed_backfill", symbol=self.symbol, bar=self.last_confirmed)
+            self.closed_bars.put((self.symbol, self.last_confirmed))
+
+    def _heartbeat(self, ws):
+        # Bybit drops connections that do not send an application-level ping every ~20s
+        while self.connected.is_set() and ws is self._ws:
+            if self._stopped.wait(self.ping_interval) or not self.connected.is_set():
+                return
+            try:
+                ws.send(json.dumps({"op": "ping"}))
+            except websocket.WebSocketException:
+                return
+
+    def _on_message(self, ws, message):
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+
+        topic = msg.get("topic", "")
+        if topic.startswith("kline."):
+            for bar in msg.get("data", []):
+                self._apply_kline(bar)
+        elif topic.startswith("orderbook."):
+            self._apply_order_book(ws, msg, message)
+        elif topic.startswith("tickers."):
+            self._apply_ticker(msg.get("type"), msg.get("data", {}))
+        elif msg.get("op") == "subscribe" and not msg.get("success", True):
+            events.error("error", where="feed_subscribe", symbol=self.symbol, message=msg.get('ret_msg'))
+
+    def _apply_kline(self, bar):
+        row = [str(bar["start"]), bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"], bar["turnover"]]
+        self.kline_cache.apply_bar(self.symbol, self.interval, row)
+        if bar.get("confirm"):
+            self.last_confirmed = int(bar["start"])
+            self.closed_bars.put((self.symbol, self.last_confirmed))
+
+    def _apply_order_book(self, ws, msg, message):
+        if self.record_path:
+            if self._record_file is None:
+                self._record_file = open(self.record_path, "a")
+            self._record_file.write(message + "\n")
+        gaps = self.order_book.gaps
+        if not self.order_book.apply(msg) and self.order_book.gaps != gaps:
+            # A missed delta: resubscribing makes the exchange send a fresh snapshot
+            events.warning("order_book_gap", symbol=self.symbol, update_id=msg.get("data", {}).get("u"),
+                           last_update_id=self.order_book.update_id)
+            topic = self.order_book.topic
+            ws.send(json.dumps({"op": "unsubscribe", "args": [topic]}))
+            ws.send(json.dumps({"op": "subscribe", "args": [topic]}))
+
+    def _apply_ticker(self, msg_type, data):
+        # Snapshots replace the ticker; deltas only carry the fields that changed
+        if msg_type == "snapshot":
+            self.ticker = dict(data)
+        else:
+            self.ticker.update(data)
+        if "lastPrice" in data:
+            self.last_price = float(data["lastPrice"])
+        self.ticker_at = time.monotonic()
+
+    def fresh_price(self, max_age):
+        # Last traded price while the stream is up and its ticker was updated within max_age seconds, else None
+        if self.last_price is None or not self.connected.is_set() or time.monotonic() - self.ticker_at > max_age:
+            return None
+        return self.last_price
+
+    def _on_error(self, ws, error):
+        events.error("error", where="feed", symbol=self.symbol, error=repr(error))
+
+    def _on_close(self, ws, status_code, message):
+        self.connected.clear()
+
+    def get_historical_data(self, limit):
+        return self.kline_cache.get_cached(self.symbol, self.interval, limit)
+
+    def closed_rows(self, rows):
+        # Rows (newest first) up to the last bar the exchange confirmed on this stream; none before the first one
+        if self.last_confirmed is None:
+            return []
+        return [row for row in rows if int(row[0]) <= self.last_confirmed]
+
+    def wait_for_bar_close(self, timeout=None):
+        try:
+            return self.closed_bars.get(timeout=timeout)
+        except queue.Empty:
+            return None
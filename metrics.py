@@ -0,0 +1,138 @@
+# metrics.py
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Histogram:
+    # Keeps the most recent samples for quantiles, plus lifetime count and sum
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        if not self.samples:
+            return float('nan')
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    QUANTILES = (0.5, 0.99)
+
+    def __init__(self, prefix="trading_bot"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        # (name, labels tuple) -> Histogram / float
+        self.histograms = {}
+        self.counters = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        declared = set()
+        for (name, labels), histogram in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} summary")
+                declared.add(metric)
+            for q in self.QUANTILES:
+                lines.append(f"{metric}{_labels(labels, quantile=q)} {histogram.quantile(q)}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.total}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self):
+        # Compact one-line p50/p99 per stage for the log file; *_seconds metrics are shown in ms
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+        parts = []
+        for (name, labels), histogram in histograms:
+            label = ",".join(str(value) for _, value in labels)
+            title = f"{name}[{label}]" if label else name
+            if name.endswith("_seconds"):
+                p50, p99 = f"{histogram.quantile(0.5) * 1000:.1f}ms", f"{histogram.quantile(0.99) * 1000:.1f}ms"
+            else:
+                p50, p99 = f"{histogram.quantile(0.5):g}", f"{histogram.quantile(0.99):g}"
+            parts.append(f"{title} p50={p50} p99={p99} n={histogram.count}")
+        return "; ".join(parts)
+
+    def write_file(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render_prometheus())
+        # Replace atomically so a scraper never reads a half-written file
+        os.replace(tmp, path)
+
+    def start_http_server(self, port, host="0.0.0.0"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
@@ -0,0 +1,236 @@
+# order_book.py
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from bisect import bisect_left
+
+
+class BookSide:
+    # Price levels of one side as two parallel lists sorted by key, best level last: bids are keyed by price,
+    # asks by -price. Finding a level is a binary search, and since most updates hit levels near the top of the
+    # book, inserting or deleting there barely moves any elements.
+    def __init__(self, sign):
+        self.sign = sign
+        self.keys = []
+        self.sizes = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = []
+        self.sizes = []
+
+    def update(self, price, size):
+        # A size of 0 removes the level
+        key = self.sign * price
+        keys = self.keys
+        i = bisect_left(keys, key)
+        found = i < len(keys) and keys[i] == key
+        if size == 0:
+            if found:
+                del keys[i]
+                del self.sizes[i]
+        elif found:
+            self.sizes[i] = size
+        else:
+            keys.insert(i, key)
+            self.sizes.insert(i, size)
+
+    def best(self):
+        if not self.keys:
+            return None
+        return self.sign * self.keys[-1], self.sizes[-1]
+
+    def levels(self, count=None):
+        # (price, size) from the best level outwards
+        stop = len(self.keys) - (count if count is not None else len(self.keys))
+        return [(self.sign * self.keys[i], self.sizes[i]) for i in range(len(self.keys) - 1, max(stop, 0) - 1, -1)]
+
+    def volume_to(self, price):
+        # Total size from the best level up to and including `price`
+        i = bisect_left(self.keys, self.sign * price)
+        return sum(self.sizes[i:])
+
+
+class OrderBook:
+    # Local L2 book of one symbol, maintained from Bybit's orderbook.{depth}.{symbol} stream: a snapshot replaces
+    # the book, deltas set or remove single levels. Deltas carry a consecutive update id (u); a gap (missed
+    # message) leaves the book unusable until the next snapshot, which the stream requests by resubscribing.
+    # u == 1 marks a snapshot sent after a restart on the exchange side.
+    def __init__(self, symbol, depth=50):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids = BookSide(1)
+        self.asks = BookSide(-1)
+        self.update_id = None
+        self.seq = None
+        # Exchange timestamp (ms) of the last applied message and local monotonic time it was applied
+        self.timestamp = None
+        self.updated = None
+        self.synced = False
+        self.gaps = 0
+        self._lock = threading.Lock()
+
+    @property
+    def topic(self):
+        return f"orderbook.{self.depth}.{self.symbol}"
+
+    def reset(self):
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self.update_id = None
+            self.synced = False
+
+    def apply(self, message):
+        # One stream message (parsed JSON). Returns False when the book needs a fresh snapshot.
+        data = message.get("data", {})
+        update_id = int(data.get("u", 0))
+        with self._lock:
+            if message.get("type") == "snapshot" or update_id == 1:
+                self.bids.clear()
+                self.asks.clear()
+                self.synced = True
+            elif not self.synced:
+                return False
+            elif update_id <= self.update_id:
+                # Already applied (repeated after a resubscribe)
+                return True
+            elif update_id != self.update_id + 1:
+                self.synced = False
+                self.gaps += 1
+                return False
+            for price, size in data.get("b", ()):
+                self.bids.update(float(price), float(size))
+            for price, size in data.get("a", ()):
+                self.asks.update(float(price), float(size))
+            self.update_id = update_id
+            self.seq = data.get("seq")
+            self.timestamp = message.get("ts")
+            self.updated = time.monotonic()
+            return True
+
+    def is_ready(self, max_age=None):
+        # Synced, both sides present and, with max_age, updated within that many seconds
+        if not self.synced or not self.bids or not self.asks:
+            return False
+        return max_age is None or time.monotonic() - self.updated <= max_age
+
+    def best_bid(self):
+        with self._lock:
+            return self.bids.best()
+
+    def best_ask(self):
+        with self._lock:
+            return self.asks.best()
+
+    def top(self):
+        # (best bid price, best ask price), read together
+        with self._lock:
+            bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return bid[0], ask[0]
+
+    def spread(self):
+        top = self.top()
+        return top[1] - top[0] if top else None
+
+    def mid(self):
+        top = self.top()
+        return (top[0] + top[1]) / 2 if top else None
+
+    def spread_bps(self):
+        top = self.top()
+        return (top[1] - top[0]) / ((top[0] + top[1]) / 2) * 10000 if top else None
+
+    def depth_levels(self, side, count=None):
+        # side 'Buy' -> bids, 'Sell' -> asks; (price, size) best first
+        with self._lock:
+            return (self.bids if side.lower() == 'buy' else self.asks).levels(count)
+
+    def volume_within(self, side, bps):
+        # Size resting on one side within `bps` basis points of its best price
+        with self._lock:
+            book_side = self.bids if side.lower() == 'buy' else self.asks
+            best = book_side.best()
+            if best is None:
+                return 0.0
+            limit = best[0] * (1 - bps / 10000) if book_side is self.bids else best[0] * (1 + bps / 10000)
+            return book_side.volume_to(limit)
+
+    def fill_price(self, side, qty):
+        # Average price a market order of `qty` would get by walking the opposite side; None if the book
+        # (as deep as it is subscribed) cannot fill it
+        with self._lock:
+            levels = (self.asks if side.lower() == 'buy' else self.bids).levels()
+        remaining, cost = qty, 0.0
+        for price, size in levels:
+            take = min(size, remaining)
+            cost += take * price
+            remaining -= take
+            if remaining <= 0:
+                return cost / qty
+        return None
+
+    def entry_price(self, side, mode="join"):
+        # Limit price for a new order: 'join' rests at the best price on the order's own side (bid for a buy),
+        # 'cross' takes the best price on the other side and fills immediately
+        top = self.top()
+        if top is None:
+            return None
+        bid, ask = top
+        if mode == "cross":
+            return ask if side.lower() == 'buy' else bid
+        return bid if side.lower() == 'buy' else ask
+
+
+def read_messages(path):
+    # Recorded stream messages: one JSON message per line, gzip-compressed if the name ends in .gz
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def replay(messages, depth=None):
+    # symbol -> OrderBook after applying every orderbook message, in order
+    books = {}
+    for message in messages:
+        topic = message.get("topic", "")
+        if not topic.startswith("orderbook."):
+            continue
+        _, topic_depth, symbol = topic.split(".", 2)
+        if depth is not None and int(topic_depth) != depth:
+            continue
+        book = books.get(symbol)
+        if book is None:
+            book = books[symbol] = OrderBook(symbol, int(topic_depth))
+        book.apply(message)
+    return books
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild order books from recorded orderbook stream messages")
+    parser.add_argument("files", nargs="+", help="JSON-lines recordings (.jsonl or .jsonl.gz), replayed in order")
+    parser.add_argument("--depth", type=int, default=None, help="only replay this orderbook depth")
+    parser.add_argument("--levels", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = [message for path in args.files for message in read_messages(path)]
+    start = time.perf_counter()
+    books = replay(messages, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"{len(messages)} messages in {elapsed * 1000:.1f} ms ({elapsed / max(len(messages), 1) * 1e6:.2f} us each)")
+    for symbol, book in books.items():
+        print(f"{symbol}: update {book.update_id}, synced={book.synced}, gaps={book.gaps}, "
+              f"spread={book.spread()}, mid={book.mid()}")
+        for (bid, bid_size), (ask, ask_size) in zip(book.depth_levels("Buy", args.levels),
+                                                    book.depth_levels("Sell", args.levels)):
+            print(f"  {bid_size:>14} {bid:>14}  |  {ask:<14} {ask_size:<14}")
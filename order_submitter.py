@@ -0,0 +1,122 @@
+# order_submitter.py
+
+import hashlib
+import hmac
+import json
+import time
+from event_log import events
+
+
+class OrderTemplate:
+    # One (symbol, side, qty) limit order as far as it is known before a signal: the JSON body without the
+    # price fields, and an HMAC already fed with the sorted parameters that precede "price" in the signature.
+    # The body has the keys in the order BybitDemoSession._prepare_order and _sign put them in, so both ways of
+    # placing an order send the same bytes.
+    DYNAMIC = ("price", "stopLoss", "takeProfit", "timestamp")
+
+    def __init__(self, api_key, api_secret, symbol, side, qty, position_idx):
+        static = {
+            "category": "linear",
+            "symbol": symbol,
+            "side": side,
+            "orderType": "Limit",
+            "qty": str(qty),
+            "positionIdx": position_idx,
+            "api_key": api_key,
+        }
+        # Same parameter string as BybitDemoSession._generate_signature: key=value pairs sorted by key
+        names = sorted([*static, *self.DYNAMIC])
+        first = names.index("price")
+        prefix = "".join(f"{name}={static[name]}&" for name in names[:first])
+        self.mac = hmac.new(api_secret.encode('utf-8'), prefix.encode('utf-8'), hashlib.sha256)
+        # (dynamic name or None, pre-rendered static pair) for the rest of the string
+        self.tail = [(name, None) if name in self.DYNAMIC else (None, f"{name}={static[name]}") for name in names[first:]]
+        # JSON pieces around the dynamic fields: {category, symbol, side, orderType, qty, | price | positionIdx |
+        # stopLoss, takeProfit | api_key, timestamp | sign}, rendered by json.dumps as requests does
+        head = json.dumps({name: static[name] for name in ("category", "symbol", "side", "orderType", "qty")})
+        self.body_head = head[:-1]
+        self.body_position = ", " + json.dumps({"positionIdx": position_idx})[1:-1]
+        self.body_api_key = ", " + json.dumps({"api_key": api_key})[1:-1]
+
+    def build(self, price, stop_loss=None, take_profit=None):
+        # Signed JSON body; the timestamp is taken here so a retried request is signed afresh
+        values = {"price": str(price), "timestamp": str(int(time.time() * 1000))}
+        if stop_loss:
+            values["stopLoss"] = str(stop_loss)
+        if take_profit:
+            values["takeProfit"] = str(take_profit)
+        tail = "&".join(pair if name is None else f"{name}={values[name]}"
+                        for name, pair in self.tail if name is None or name in values)
+        mac = self.mac.copy()
+        mac.update(tail.encode('utf-8'))
+        risk = "".join(f', "{name}": "{values[name]}"' for name in ("stopLoss", "takeProfit") if name in values)
+        return (f'{self.body_head}, "price": "{values["price"]}"{self.body_position}{risk}{self.body_api_key}, '
+                f'"timestamp": "{values["timestamp"]}", "sign": "{mac.hexdigest()}"}}').encode('utf-8')
+
+
+class FastOrderSubmitter:
+    # Tick-to-trade path. Leverage is set and both sides' templates are built before any signal, so placing an
+    # order is filling in price/SL/TP, one HMAC update over the tail and a POST on an already-open connection.
+    # Leverage is only sent again when the cached value (refreshed by every position fetch) disagrees.
+    ENDPOINT = "/v5/order/create"
+
+    def __init__(self, session, qty, leverage, metrics=None, warm_seconds=15.0):
+        self.session = session
+        self.api_key = session.api_key
+        self.api_secret = session.api_secret
+        self.qty = qty
+        self.leverage = leverage
+        self.metrics = metrics
+        self.warm_seconds = warm_seconds
+        # (symbol, side) -> OrderTemplate
+        self.templates = {}
+        self._seen_requests = None
+        self._last_traffic = time.monotonic()
+
+    def _template(self, symbol, side):
+        template = self.templates.get((symbol, side))
+        if template is None:
+            template = self.templates[(symbol, side)] = OrderTemplate(
+                self.api_key, self.api_secret, symbol, side, self.qty, self.session._position_idx(side))
+        return template
+
+    def _ensure_leverage(self, symbol):
+        if self.session.leverage_cache.get(symbol) != float(self.leverage):
+            self.session.set_leverage(symbol, self.leverage)
+
+    def prepare(self, symbols):
+        # Off the trading path: startup, or whenever symbols are added
+        for symbol in symbols:
+            self._ensure_leverage(symbol)
+            for side in ("Buy", "Sell"):
+                self._template(symbol, side)
+
+    def submit(self, symbol, side, current_price, stop_loss=None, take_profit=None, price=None):
+        # price: limit price from the order book; without it the price is offset from current_price
+        start = time.perf_counter()
+        try:
+            self._ensure_leverage(symbol)
+            template = self._template(symbol, side)
+            price, stop_loss = self.session._limit_prices(symbol, side, current_price, stop_loss, price)
+            response = self.session.send_prepared(self.ENDPOINT, lambda: template.build(price, stop_loss, take_profit))
+            if response['retCode'] != 0:
+                raise Exception(f"API Error: {response['retMsg']}")
+            return response['result']
+        except Exception as e:
+            events.error("error", where="place_order", symbol=symbol, error=repr(e))
+            return None
+        finally:
+            if self.metrics:
+                self.metrics.observe("order_submit_seconds", time.perf_counter() - start)
+
+    def keep_warm(self):
+        # Keeps a pooled connection open for the next order: a cheap unsigned request after warm_seconds
+        # without any other traffic, so the order does not pay for a TCP/TLS handshake
+        requests = self.session.get_transport_stats()['requests']
+        now = time.monotonic()
+        if requests != self._seen_requests:
+            self._seen_requests = requests
+            self._last_traffic = now
+        elif now - self._last_traffic >= self.warm_seconds:
+            self.session.get_server_time()
+            self._last_traffic = now
@@ -0,0 +1,53 @@
+# order_sweeper.py
+
+import time
+from event_log import events
+
+
+class StaleOrderSweeper:
+    # Cancels limit orders that have rested longer than max_age. Stale orders of every symbol go out together
+    # through /v5/order/cancel-batch, so the cost is one request per BATCH_LIMIT orders instead of one each.
+    # Codes that mean the order is already gone count as done; anything else is retried on the next sweep.
+    GONE_CODES = (110001,)
+
+    def __init__(self, session, max_age=180, metrics=None, clock=time):
+        self.session = session
+        self.max_age = max_age
+        self.metrics = metrics
+        self.clock = clock
+
+    def stale(self, orders, now=None):
+        now = self.clock.time() if now is None else now
+        return [order for order in orders if now - int(order['createdTime']) / 1000 > self.max_age]
+
+    def sweep(self, orders, now=None):
+        # Returns the orders that are no longer open
+        stale = self.stale(orders, now)
+        if not stale:
+            return []
+        by_id = {order['orderId']: order for order in stale}
+        try:
+            results = self.session.cancel_orders_batch(stale)
+        except Exception as e:
+            events.error("error", where="cancel_batch", orders=len(stale), error=repr(e))
+            if self.metrics:
+                self.metrics.inc("stale_cancel_failed", len(stale))
+            return []
+
+        done = []
+        for order, result in zip(stale, results):
+            # Match by id when the exchange echoes it, otherwise by position in the batch
+            order = by_id.get(result.get('orderId'), order)
+            code = result.get('code', 0)
+            if code == 0 or code in self.GONE_CODES:
+                done.append(order)
+                events.info("cancel", symbol=order['symbol'], order_id=order['orderId'], reason="stale",
+                            status="cancelled" if code == 0 else "already_closed")
+            else:
+                events.warning("cancel_failed", symbol=order['symbol'], order_id=order['orderId'],
+                               code=code, msg=result.get('msg'))
+        if self.metrics:
+            self.metrics.inc("stale_cancelled", len(done))
+            if len(done) < len(stale):
+                self.metrics.inc("stale_cancel_failed", len(stale) - len(done))
+        return done
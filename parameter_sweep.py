@@ -0,0 +1,183 @@
+# parameter_sweep.py
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool, shared_memory
+from backtester import Backtester
+from kline_store import KlineStore
+from risk_management import RiskManagement
+from strategies import Strategies
+
+INDICATOR_PARAMS = ("ema_fast", "ema_slow", "rsi_period", "macd_fast", "macd_slow", "macd_signal")
+RISK_PARAMS = ("atr_multiplier", "risk_ratio")
+
+DEFAULT_GRID = {
+    "ema_fast": [5, 9, 12],
+    "ema_slow": [21, 26, 50],
+    "rsi_period": [7, 14, 21],
+    "macd_fast": [8, 12],
+    "macd_slow": [21, 26],
+    "macd_signal": [9],
+    "atr_multiplier": [0.75, 1.0, 1.5, 2.0],
+    "risk_ratio": [1.0, 1.5, 2.0],
+}
+
+REPORT_COLUMNS = INDICATOR_PARAMS + RISK_PARAMS + ("trades", "total_pnl", "win_rate", "max_drawdown", "profit_factor")
+
+# Set in each worker by _attach(): candles backed by the parent's shared memory
+_worker = {}
+
+
+class SharedCandles:
+    # Candle columns copied once into a shared memory block; workers map the same pages instead of
+    # receiving a pickled copy each.
+    COLUMNS = ("timestamp", "open", "high", "low", "close")
+
+    def __init__(self, df):
+        self.length = len(df)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.length * 8 * len(self.COLUMNS)))
+        block = np.ndarray((len(self.COLUMNS), self.length), dtype=np.float64, buffer=self.shm.buf)
+        for i, column in enumerate(self.COLUMNS):
+            block[i] = df[column].to_numpy(dtype=np.float64)
+
+    def handle(self):
+        return self.shm.name, self.length
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(name, length, backtester_kwargs):
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(SharedCandles.COLUMNS), length), dtype=np.float64, buffer=shm.buf)
+    _worker["shm"] = shm
+    _worker["candles"] = pd.DataFrame({column: block[i] for i, column in enumerate(SharedCandles.COLUMNS)}, copy=False)
+    _worker["backtester_kwargs"] = backtester_kwargs
+
+
+def _evaluate(task):
+    # One task = one indicator setting evaluated against every SL/TP setting, so signals are computed once
+    indicator_params, risk_grid = task
+    strategy = Strategies(**indicator_params)
+    backtester = Backtester(strategy=strategy, **_worker["backtester_kwargs"])
+    prepared = backtester.prepare(_worker["candles"])
+
+    rows = []
+    for risk_params in risk_grid:
+        backtester.risk_management = RiskManagement(**risk_params)
+        summary, _ = backtester.run_prepared(prepared)
+        rows.append({**indicator_params, **risk_params, **summary})
+    return rows
+
+
+def _is_valid(params):
+    return params["ema_fast"] < params["ema_slow"] and params["macd_fast"] < params["macd_slow"]
+
+
+def build_tasks(grid, samples=None, seed=0):
+    indicator_sets = [dict(zip(INDICATOR_PARAMS, values)) for values in itertools.product(*(grid[p] for p in INDICATOR_PARAMS))]
+    indicator_sets = [params for params in indicator_sets if _is_valid(params)]
+    risk_sets = [dict(zip(RISK_PARAMS, values)) for values in itertools.product(*(grid[p] for p in RISK_PARAMS))]
+
+    if samples is not None:
+        # Random search: sample combinations, then group them by indicator setting
+        combos = list(itertools.product(range(len(indicator_sets)), range(len(risk_sets))))
+        random.Random(seed).shuffle(combos)
+        grouped = {}
+        for indicator_index, risk_index in combos[:samples]:
+            grouped.setdefault(indicator_index, []).append(risk_sets[risk_index])
+        return [(indicator_sets[i], risks) for i, risks in grouped.items()]
+    return [(params, risk_sets) for params in indicator_sets]
+
+
+def _key(row):
+    return tuple(float(row[p]) for p in INDICATOR_PARAMS + RISK_PARAMS)
+
+
+def _completed(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="") as f:
+        return {_key(row) for row in csv.DictReader(f)}
+
+
+def run_sweep(candles, tasks, output, workers=None, rank_by="total_pnl", backtester_kwargs=None):
+    # Results are appended to `output` as they arrive, so an interrupted sweep resumes where it stopped
+    done = _completed(output)
+    pending = []
+    for indicator_params, risk_grid in tasks:
+        remaining = [risk for risk in risk_grid if _key({**indicator_params, **risk}) not in done]
+        if remaining:
+            pending.append((indicator_params, remaining))
+    total = sum(len(risks) for _, risks in pending)
+    print(f"{total} combinations to evaluate ({len(done)} already done) on {workers or os.cpu_count()} processes")
+
+    shared = SharedCandles(candles)
+    try:
+        write_header = not os.path.exists(output)
+        with open(output, "a", newline="") as f, \
+                Pool(workers, initializer=_attach, initargs=(*shared.handle(), backtester_kwargs or {})) as pool:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            if write_header:
+                writer.writeheader()
+            finished = 0
+            for rows in pool.imap_unordered(_evaluate, pending):
+                writer.writerows(rows)
+                f.flush()
+                finished += len(rows)
+                print(f"{finished}/{total} combinations evaluated")
+    finally:
+        shared.close()
+
+    report = pd.read_csv(output).sort_values(rank_by, ascending=(rank_by == "max_drawdown"))
+    ranked = os.path.splitext(output)[0] + "_ranked.csv"
+    report.to_csv(ranked, index=False)
+    return report, ranked
+
+
+def _parse_grid(values):
+    grid = dict(DEFAULT_GRID)
+    for item in values or []:
+        name, _, options = item.partition("=")
+        if name not in grid:
+            raise ValueError(f"Unknown parameter {name}")
+        grid[name] = [float(v) if name in RISK_PARAMS else int(v) for v in options.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep indicator and risk parameters over historical candles")
+    parser.add_argument("csv", nargs="?", help="candles with timestamp, open, high, low, close columns")
+    parser.add_argument("--store", help="read candles from this KlineStore directory instead of a CSV")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--interval", type=int, default=1, help="bar interval in minutes")
+    parser.add_argument("--param", action="append", help="override a grid axis, e.g. --param rsi_period=7,14,21")
+    parser.add_argument("--samples", type=int, help="random search over this many combinations instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="total_pnl", choices=REPORT_COLUMNS[len(INDICATOR_PARAMS) + len(RISK_PARAMS):])
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    if args.store:
+        arrays = KlineStore(args.store).load(args.symbol, args.interval)
+        if arrays is None:
+            parser.error(f"No stored klines for {args.symbol} {args.interval} in {args.store}")
+        candles = pd.DataFrame(arrays, copy=False)
+    elif args.csv:
+        candles = pd.read_csv(args.csv)
+    else:
+        parser.error("Either a CSV file or --store is required")
+    candles = candles.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    tasks = build_tasks(_parse_grid(args.param), args.samples, args.seed)
+    report, ranked = run_sweep(candles, tasks, args.output, args.workers, args.rank_by,
+                               {"interval_minutes": args.interval})
+    print(f"Ranked report written to {ranked}")
+    print(report.head(10).to_string(index=False))
@@ -0,0 +1,239 @@
+# rate_limiter.py
+
+import threading
+import time
+from event_log import events
+
+
+class TokenBucket:
+    # Share of a window's limit allowed as an instant burst; the rest refills over the window.
+    # burst + refill never exceeds the limit, so no sliding window on the exchange side can overflow.
+    BURST = 0.2
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        # Set after the exchange reports the window as used up (or answers 10006)
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, reserve=0.0):
+        # Seconds until one token is available while leaving `reserve` tokens untouched
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        missing = 1 + reserve - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    @classmethod
+    def for_limit(cls, limit, window=1.0):
+        return cls((1 - cls.BURST) * limit / window, max(1.0, cls.BURST * limit))
+
+    def take(self):
+        self.tokens -= 1
+
+    def learn(self, limit, remaining, reset_in, now):
+        # X-Bapi-Limit is per second; the exchange's remaining count wins over our own estimate
+        if limit:
+            self.rate = (1 - self.BURST) * limit
+            self.capacity = max(1.0, self.BURST * limit)
+        if remaining is not None:
+            self._refill(now)
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset_in is not None:
+                self.blocked_until = max(self.blocked_until, now + reset_in)
+
+    def block(self, seconds, now):
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimiter:
+    # Central request scheduler shared by every thread of one session. Each request takes a token from the
+    # IP-wide bucket and from its endpoint's bucket; endpoint limits are learned from the X-Bapi-Limit*
+    # response headers. Order traffic has its own lane: reads cannot use the reserved share of the IP
+    # budget and wait while an order is queued for it, so polling never delays order placement.
+    ORDER_ENDPOINTS = frozenset((
+        "/v5/order/create",
+        "/v5/order/amend",
+        "/v5/order/cancel",
+        "/v5/order/cancel-all",
+        "/v5/order/create-batch",
+        "/v5/order/cancel-batch",
+        "/v5/position/set-leverage",
+    ))
+    # Per-UID limits (requests per second) until the headers tell otherwise
+    DEFAULT_LIMITS = {
+        "/v5/order/create": 10,
+        "/v5/order/amend": 10,
+        "/v5/order/cancel": 10,
+        "/v5/order/cancel-all": 10,
+        "/v5/order/create-batch": 10,
+        "/v5/order/cancel-batch": 10,
+        "/v5/position/set-leverage": 10,
+        "/v5/order/realtime": 50,
+        "/v5/position/list": 50,
+    }
+    THROTTLED_RET_CODE = 10006
+
+    def __init__(self, ip_limit=600, ip_window=5.0, order_reserve=0.2, metrics=None):
+        self.ip_bucket = TokenBucket.for_limit(ip_limit, ip_window)
+        self.order_reserve = order_reserve * self.ip_bucket.capacity
+        self.metrics = metrics
+        self.buckets = {}
+        self._cond = threading.Condition()
+        self.queued = {"order": 0, "data": 0}
+        self._orders_waiting_for_ip = 0
+
+        self.granted = {"order": 0, "data": 0}
+        self.throttled = 0
+        self.total_wait = {"order": 0.0, "data": 0.0}
+        self.max_queue_depth = 0
+
+    def lane(self, endpoint):
+        return "order" if endpoint in self.ORDER_ENDPOINTS else "data"
+
+    def _bucket(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        if bucket is None and endpoint in self.DEFAULT_LIMITS:
+            limit = self.DEFAULT_LIMITS[endpoint]
+            bucket = self.buckets[endpoint] = TokenBucket.for_limit(limit)
+        return bucket
+
+    def _try_take(self, endpoint, lane, now):
+        # Returns 0 after taking the tokens, otherwise (seconds to wait, whether the IP bucket is the blocker)
+        bucket = self._bucket(endpoint)
+        wait = bucket.wait_time(now) if bucket else 0.0
+        if wait > 0:
+            return wait, False
+        if lane == "order":
+            ip_wait = self.ip_bucket.wait_time(now)
+        elif self._orders_waiting_for_ip:
+            return 0.05, True
+        else:
+            ip_wait = self.ip_bucket.wait_time(now, reserve=self.order_reserve)
+        if ip_wait > 0:
+            return ip_wait, True
+        self.ip_bucket.take()
+        if bucket:
+            bucket.take()
+        return 0.0, False
+
+    def _enqueue(self, lane):
+        # Called with the condition held; returns the queue depth including this request
+        self.queued[lane] += 1
+        depth = self.queued["order"] + self.queued["data"]
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return depth
+
+    def _poll(self, endpoint, lane, waiting_for_ip):
+        # Called with the condition held; returns (seconds to wait, whether this order now waits for the IP bucket)
+        wait, ip_blocked = self._try_take(endpoint, lane, time.monotonic())
+        if lane == "order" and ip_blocked != waiting_for_ip:
+            self._orders_waiting_for_ip += 1 if ip_blocked else -1
+            waiting_for_ip = ip_blocked
+        return wait, waiting_for_ip
+
+    def _dequeue(self, lane, waiting_for_ip):
+        if waiting_for_ip:
+            self._orders_waiting_for_ip -= 1
+        self.queued[lane] -= 1
+
+    def _grant(self, lane, start, depth):
+        waited = time.monotonic() - start
+        with self._cond:
+            self.granted[lane] += 1
+            self.total_wait[lane] += waited
+        if self.metrics:
+            self.metrics.observe("rate_limit_wait_seconds", waited, lane=lane)
+            self.metrics.observe("rate_limit_queue_depth", depth, lane=lane)
+        return waited
+
+    def acquire(self, endpoint):
+        lane = self.lane(endpoint)
+        start = time.monotonic()
+        with self._cond:
+            depth = self._enqueue(lane)
+            waiting_for_ip = False
+            try:
+                while True:
+                    wait, waiting_for_ip = self._poll(endpoint, lane, waiting_for_ip)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                self._dequeue(lane, waiting_for_ip)
+        return self._grant(lane, start, depth)
+
+    async def acquire_async(self, endpoint):
+        # acquire() for the asyncio client: same lanes and queue accounting, but the wait is a sleep on the
+        # event loop. asyncio is only imported by that client.
+        import asyncio
+        lane = self.lane(endpoint)
+        start = time.monotonic()
+        with self._cond:
+            depth = self._enqueue(lane)
+        waiting_for_ip = False
+        try:
+            while True:
+                with self._cond:
+                    wait, waiting_for_ip = self._poll(endpoint, lane, waiting_for_ip)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._cond:
+                self._dequeue(lane, waiting_for_ip)
+        return self._grant(lane, start, depth)
+
+    def update(self, endpoint, headers, ret_code=None):
+        # Feed back what the exchange reported for this endpoint
+        limit = _header_float(headers, "X-Bapi-Limit")
+        remaining = _header_float(headers, "X-Bapi-Limit-Status")
+        reset_ms = _header_float(headers, "X-Bapi-Limit-Reset-Timestamp")
+        reset_in = max(0.0, min(reset_ms / 1000 - time.time(), 5.0)) if reset_ms else None
+
+        with self._cond:
+            now = time.monotonic()
+            if limit or remaining is not None:
+                bucket = self._bucket(endpoint)
+                if bucket is None:
+                    bucket = self.buckets[endpoint] = TokenBucket.for_limit(limit or 10)
+                bucket.learn(limit, remaining, reset_in, now)
+            if ret_code == self.THROTTLED_RET_CODE:
+                self.throttled += 1
+                bucket = self._bucket(endpoint) or self.ip_bucket
+                bucket.block(reset_in if reset_in else 1.0, now)
+            self._cond.notify_all()
+
+        if ret_code == self.THROTTLED_RET_CODE:
+            events.warning("throttled", endpoint=endpoint, reset_in=reset_in)
+            if self.metrics:
+                self.metrics.inc("rate_limit_throttled", endpoint=endpoint)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "queued_orders": self.queued["order"],
+                "queued_data": self.queued["data"],
+                "max_queue_depth": self.max_queue_depth,
+                "granted_orders": self.granted["order"],
+                "granted_data": self.granted["data"],
+                "throttled": self.throttled,
+                "avg_wait_ms_orders": self.total_wait["order"] / self.granted["order"] * 1000 if self.granted["order"] else 0.0,
+                "avg_wait_ms_data": self.total_wait["data"] / self.granted["data"] * 1000 if self.granted["data"] else 0.0,
+                "limits": {endpoint: bucket.rate + bucket.capacity for endpoint, bucket in sorted(self.buckets.items())},
+            }
+
+
+def _header_float(headers, name):
+    value = headers.get(name) if headers else None
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
@@ -1,7 +1,7 @@
 
 # risk_management.py
 
-import pandas as pd  # Add this import
+import numpy as np
 
 class RiskManagement:
     def __init__(self, atr_period=14, atr_multiplier=1.5, risk_ratio=1.5):
@@ -10,13 +10,15 @@ class RiskManagement:
         self.risk_ratio = risk_ratio
 
     def calculate_atr(self, df):
-        high = df['high'].astype(float)
-        low = df['low'].astype(float)
-        close = df['close'].astype(float)
-        df['previous_close'] = close.shift(1)
-        df['tr'] = pd.concat([high - low, (high - df['previous_close']).abs(), (low - df['previous_close']).abs()], axis=1).max(axis=1)
-        atr = df['tr'].rolling(window=self.atr_period).mean().iloc[-1]
-        return atr
+        return self.calculate_atr_series(df).iloc[-1]
+
+    def calculate_atr_series(self, df):
+        # Works on a DataFrame or a Candles object; float64 columns are used as-is, without a cast
+        high = _as_float(df['high'])
+        low = _as_float(df['low'])
+        previous_close = _as_float(df['close']).shift(1)
+        tr = np.fmax(high - low, np.fmax((high - previous_close).abs(), (low - previous_close).abs()))
+        return tr.rolling(window=self.atr_period).mean()
 
     def calculate_dynamic_risk_management(self, df, current_price, trend):
         atr = self.calculate_atr(df)
@@ -33,3 +35,6 @@ class RiskManagement:
 
         return stop_loss, take_profit
 
+
+def _as_float(series):
+    return series if series.dtype == np.float64 else series.astype(float)
@@ -0,0 +1,156 @@
+# shared_market_data.py
+
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from candles import COLUMNS, Candles
+from indicator_cache import COLUMNS as INDICATOR_COLUMNS
+
+MAGIC = 0x42594D44  # "BYMD"
+VERSION = 1
+SYMBOL_BYTES = 16
+# Segment header: magic, version, symbols, capacity, interval (ms)
+SEGMENT_HEADER = 5
+# Per-symbol header: sequence, bars, newest bar timestamp, bars covered by the indicator columns
+SYMBOL_HEADER = 4
+FIELDS = COLUMNS + INDICATOR_COLUMNS
+
+
+def _attach(name):
+    # Readers must not unlink the segment when they exit. Before 3.13 (no track=False) that needs a fix-up in a
+    # process with its own resource tracker; processes spawned by the supervisor share the owner's tracker.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        own_tracker = resource_tracker._resource_tracker._fd is None
+        segment = shared_memory.SharedMemory(name=name)
+        if own_tracker:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+class SharedMarketData:
+    # Candles and indicator columns per symbol in one shared-memory segment: written by a single market-data
+    # process, read by any number of worker processes without locks. Each symbol block is guarded by a
+    # sequence counter (seqlock): the writer makes it odd while writing and even when done, and a reader
+    # retries whenever the counter was odd or changed during its copy. The layout is described in the segment
+    # header, so attaching only needs the name.
+    def __init__(self, segment, owner=False):
+        self.segment = segment
+        self.owner = owner
+        header = np.ndarray((SEGMENT_HEADER,), dtype=np.int64, buffer=segment.buf)
+        if header[0] != MAGIC or header[1] != VERSION:
+            raise ValueError(f"Shared memory segment {segment.name} does not hold market data")
+        count, self.capacity, self.interval_ms = int(header[2]), int(header[3]), int(header[4])
+        offset = SEGMENT_HEADER * 8
+        names = bytes(segment.buf[offset:offset + count * SYMBOL_BYTES])
+        self.symbols = [names[i:i + SYMBOL_BYTES].rstrip(b"\0").decode() for i in range(0, len(names), SYMBOL_BYTES)]
+        offset += count * SYMBOL_BYTES
+        offset += -offset % 8
+
+        # symbol -> (header view, field -> column view)
+        self.blocks = {}
+        for symbol in self.symbols:
+            symbol_header = np.ndarray((SYMBOL_HEADER,), dtype=np.int64, buffer=segment.buf, offset=offset)
+            offset += SYMBOL_HEADER * 8
+            columns = {}
+            for field in FIELDS:
+                dtype = np.int64 if field == "timestamp" else np.float64
+                columns[field] = np.ndarray((self.capacity,), dtype=dtype, buffer=segment.buf, offset=offset)
+                offset += self.capacity * 8
+            self.blocks[symbol] = (symbol_header, columns)
+
+    @staticmethod
+    def size(symbols, capacity):
+        header = SEGMENT_HEADER * 8 + len(symbols) * SYMBOL_BYTES
+        return header + -header % 8 + len(symbols) * (SYMBOL_HEADER + len(FIELDS) * capacity) * 8
+
+    @classmethod
+    def create(cls, symbols, capacity, interval_ms, name=None):
+        segment = shared_memory.SharedMemory(name=name, create=True, size=cls.size(symbols, capacity))
+        header = np.ndarray((SEGMENT_HEADER,), dtype=np.int64, buffer=segment.buf)
+        header[:] = (MAGIC, VERSION, len(symbols), capacity, interval_ms)
+        offset = SEGMENT_HEADER * 8
+        for symbol in symbols:
+            encoded = symbol.encode()
+            if len(encoded) > SYMBOL_BYTES:
+                raise ValueError(f"Symbol {symbol} is longer than {SYMBOL_BYTES} bytes")
+            segment.buf[offset:offset + len(encoded)] = encoded
+            offset += SYMBOL_BYTES
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name))
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    def publish(self, symbol, candles, indicators=None):
+        # candles: Candles (or DataFrame) of up to capacity bars; indicators: the indicator columns over the
+        # newest len(indicators) of them, i.e. over the window the workers evaluate
+        header, columns = self.blocks[symbol]
+        n = min(len(candles), self.capacity)
+        covered = min(len(indicators), n) if indicators is not None else 0
+        header[0] += 1
+        try:
+            for field in COLUMNS:
+                columns[field][:n] = candles[field].to_numpy()[-n:]
+            for field in INDICATOR_COLUMNS:
+                column = columns[field]
+                column[:n - covered] = np.nan
+                if covered:
+                    column[n - covered:n] = indicators[field].to_numpy()[-covered:]
+            header[1] = n
+            header[2] = columns["timestamp"][n - 1] if n else 0
+            header[3] = covered
+        finally:
+            header[0] += 1
+
+    def newest_timestamp(self, symbol):
+        return int(self.blocks[symbol][0][2])
+
+    def wait_for(self, symbol, timestamp, timeout=2.0, poll=0.005):
+        # Until the block holds a bar at or after `timestamp` (the writer publishes shortly after each close)
+        deadline = time.monotonic() + timeout
+        while self.newest_timestamp(symbol) < timestamp:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def read(self, symbol, limit=None, indicators=True):
+        # Copy of the newest `limit` bars as Candles. Indicator columns are attached only when they cover
+        # exactly those bars, i.e. they were computed over the same window the caller would use.
+        header, columns = self.blocks[symbol]
+        for _ in range(1000):
+            sequence = int(header[0])
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            n = int(header[1])
+            take = n if limit is None else min(limit, n)
+            covered = int(header[3])
+            arrays = {field: columns[field][n - take:n].copy() for field in COLUMNS}
+            values = None
+            if indicators and covered == take and take:
+                values = {field: columns[field][n - take:n].copy() for field in INDICATOR_COLUMNS}
+            if int(header[0]) == sequence:
+                break
+        else:
+            raise TimeoutError(f"Shared market data for {symbol} kept changing while being read")
+        if not take:
+            return None
+        candles = Candles(arrays)
+        if values:
+            for field, column in values.items():
+                candles[field] = column
+        return candles
+
+    def close(self):
+        self.blocks = {}
+        self.segment.close()
+        if self.owner:
+            self.segment.unlink()
@@ -1,20 +1,69 @@
 # strategy.py
 
+import numpy as np
 import pandas as pd
 from indicators import Indicators
+from candles import Candles
 
 class Strategies:
-    def __init__(self):
+    def __init__(self, ema_fast=9, ema_slow=21, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9):
         self.indicators = Indicators()
+        # Column names keep the default periods (EMA_9 is "the fast EMA") so the rest of the bot is unchanged
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+
+    def prepare_candles(self, historical_data):
+        if isinstance(historical_data, Candles):
+            # e.g. read from SharedMarketData, possibly with indicator columns
+            return historical_data
+        if isinstance(historical_data, dict):
+            return Candles.from_arrays(historical_data)
+        return Candles.from_klines(historical_data)
 
     def prepare_dataframe(self, historical_data):
-        df = pd.DataFrame(historical_data)
-        df.columns = ["timestamp", "open", "high", "low", "close", "volume", "turnover"]
-        df['close'] = df['close'].astype(float)
-        df.sort_values('timestamp', inplace=True)
+        if isinstance(historical_data, dict):
+            # Column arrays from KlineStore.load(): already typed and sorted, wrap without copying
+            return pd.DataFrame(historical_data, copy=False)
+        return self.prepare_candles(historical_data).to_dataframe()
+
+    def calculate_indicators(self, df):
+        df['EMA_9'] = self.indicators.calculate_ema(df, self.ema_fast)
+        df['EMA_21'] = self.indicators.calculate_ema(df, self.ema_slow)
+        df['RSI'] = self.indicators.calculate_rsi(df, self.rsi_period)
+        df['MACD'], df['MACD_signal'] = self.indicators.calculate_macd(df, self.macd_fast, self.macd_slow, self.macd_signal)
+        df['Stochastic'], df['Stochastic_signal'] = self.indicators.calculate_stochastic(df)
+        df['Bollinger_upper'], df['Bollinger_middle'], df['Bollinger_lower'] = self.indicators.calculate_bollinger_bands(df)
         return df
 
-    def combine_indicators_strategy(self, df):
+    def combine_indicators_signals(self, df):
+        # Vectorized combine_indicators_strategy over every row: 1 = long, -1 = short, 0 = no signal
+        long_signal = ((df['EMA_9'] > df['EMA_21']) & (df['RSI'] > 50) &
+                       (df['MACD'] > df['MACD_signal']) & (df['Stochastic'] > df['Stochastic_signal']))
+        short_signal = ((df['EMA_9'] < df['EMA_21']) & (df['RSI'] < 50) &
+                        (df['MACD'] < df['MACD_signal']) & (df['Stochastic'] < df['Stochastic_signal']))
+        return np.where(long_signal, 1, np.where(short_signal, -1, 0))
+
+    def trend_direction(self, df):
+        # Higher-timeframe filter: fast EMA above/below slow EMA on the latest bar
+        if len(df['close']) < self.ema_slow:
+            return None
+        if 'EMA_9' in df:
+            # Columns already computed, e.g. by IndicatorCache
+            ema_fast, ema_slow = df['EMA_9'].iloc[-1], df['EMA_21'].iloc[-1]
+        else:
+            ema_fast = self.indicators.calculate_ema(df, self.ema_fast).iloc[-1]
+            ema_slow = self.indicators.calculate_ema(df, self.ema_slow).iloc[-1]
+        if ema_fast > ema_slow:
+            return 'long'
+        if ema_fast < ema_slow:
+            return 'short'
+        return None
+
+    def combine_indicators_strategy(self, df, trend_filters=None):
         ema_9 = df['EMA_9'].iloc[-1]
         ema_21 = df['EMA_21'].iloc[-1]
         rsi = df['RSI'].iloc[-1]
@@ -24,7 +73,12 @@ class Strategies:
         stochastic_signal = df['Stochastic_signal'].iloc[-1]
 
         if ema_9 > ema_21 and rsi > 50 and macd > macd_signal and stochastic > stochastic_signal:
-            return 'long'
+            signal = 'long'
         elif ema_9 < ema_21 and rsi < 50 and macd < macd_signal and stochastic < stochastic_signal:
-            return 'short'
-        return None
+            signal = 'short'
+        else:
+            return None
+        # trend_filters: timeframe -> trend_direction(); every higher timeframe has to agree
+        if trend_filters and any(trend != signal for trend in trend_filters.values()):
+            return None
+        return signal
@@ -0,0 +1,210 @@
+# streaming_indicators.py
+
+import math
+from collections import deque
+
+
+class StreamingEMA:
+    # Matches Series.ewm(span=span, adjust=False).mean()
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class StreamingSMA:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        if len(self.values) < self.window:
+            return math.nan
+        return self.total / self.window
+
+
+class StreamingRSI:
+    # mode='sma' matches Indicators.calculate_rsi, mode='wilder' uses Wilder smoothing
+    def __init__(self, period=14, mode='sma'):
+        if mode not in ('sma', 'wilder'):
+            raise ValueError("RSI mode must be either 'sma' or 'wilder'")
+        self.period = period
+        self.mode = mode
+        self.prev_close = None
+        self.count = 0
+        self.gains = StreamingSMA(period)
+        self.losses = StreamingSMA(period)
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close):
+        # The first bar has no delta; pandas' where() turns it into a 0 gain/loss
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.count += 1
+
+        if self.mode == 'sma':
+            avg_gain = self.gains.update(gain)
+            avg_loss = self.losses.update(loss)
+            if math.isnan(avg_gain):
+                return math.nan
+        else:
+            if self.count <= self.period:
+                self.avg_gain += gain / self.period
+                self.avg_loss += loss / self.period
+                if self.count < self.period:
+                    return math.nan
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            avg_gain, avg_loss = self.avg_gain, self.avg_loss
+
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class StreamingMACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        return macd, self.signal.update(macd)
+
+
+class RollingExtreme:
+    # Monotonic deque: amortised O(1) rolling max (or min) over a fixed window
+    def __init__(self, window, mode='max'):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.items = deque()
+        self.index = 0
+
+    def update(self, x):
+        if self.is_max:
+            while self.items and self.items[-1][1] <= x:
+                self.items.pop()
+        else:
+            while self.items and self.items[-1][1] >= x:
+                self.items.pop()
+        self.items.append((self.index, x))
+        if self.items[0][0] <= self.index - self.window:
+            self.items.popleft()
+        self.index += 1
+        if self.index < self.window:
+            return math.nan
+        return self.items[0][1]
+
+
+class StreamingStochastic:
+    def __init__(self, period=14, smooth=3):
+        self.highest = RollingExtreme(period, 'max')
+        self.lowest = RollingExtreme(period, 'min')
+        self.smooth = smooth
+        self.recent_k = deque(maxlen=smooth)
+
+    def update(self, high, low, close):
+        highest = self.highest.update(high)
+        lowest = self.lowest.update(low)
+        if math.isnan(highest) or highest == lowest:
+            k_percent = math.nan
+        else:
+            k_percent = 100 * ((close - lowest) / (highest - lowest))
+        self.recent_k.append(k_percent)
+        if len(self.recent_k) < self.smooth or any(math.isnan(k) for k in self.recent_k):
+            return k_percent, math.nan
+        return k_percent, sum(self.recent_k) / self.smooth
+
+
+class StreamingBollinger:
+    # Sliding-window Welford update of mean and sample variance (ddof=1)
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+
+        if len(self.values) < self.window:
+            return math.nan, math.nan, math.nan
+        std_dev = math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+        return self.mean + std_dev * self.num_std, self.mean, self.mean - std_dev * self.num_std
+
+
+class StreamingATR:
+    # Matches RiskManagement.calculate_atr_series: SMA of the true range, where the first bar's is high - low
+    def __init__(self, period=14):
+        self.sma = StreamingSMA(period)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        return self.sma.update(true_range)
+
+
+class StreamingIndicators:
+    # Same columns as TradingBot.job(), plus the ATR the stops are sized with, updated one candle at a time
+    def __init__(self, ema_fast=9, ema_slow=21, rsi_period=14, rsi_mode='sma', atr_period=14):
+        self.ema_fast = StreamingEMA(ema_fast)
+        self.ema_slow = StreamingEMA(ema_slow)
+        self.rsi = StreamingRSI(rsi_period, rsi_mode)
+        self.macd = StreamingMACD()
+        self.stochastic = StreamingStochastic()
+        self.bollinger = StreamingBollinger()
+        self.atr = StreamingATR(atr_period)
+        self.last = None
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        macd, macd_signal = self.macd.update(close)
+        stochastic, stochastic_signal = self.stochastic.update(high, low, close)
+        bollinger_upper, bollinger_middle, bollinger_lower = self.bollinger.update(close)
+        self.last = {
+            'EMA_9': self.ema_fast.update(close),
+            'EMA_21': self.ema_slow.update(close),
+            'RSI': self.rsi.update(close),
+            'MACD': macd,
+            'MACD_signal': macd_signal,
+            'Stochastic': stochastic,
+            'Stochastic_signal': stochastic_signal,
+            'Bollinger_upper': bollinger_upper,
+            'Bollinger_middle': bollinger_middle,
+            'Bollinger_lower': bollinger_lower,
+            'ATR': self.atr.update(high, low, close),
+        }
+        return self.last
+
+    def update_from_kline(self, kline):
+        # kline: [timestamp, open, high, low, close, volume, turnover] as returned by /v5/market/kline
+        return self.update(kline[2], kline[3], kline[4])
@@ -0,0 +1,209 @@
+# supervisor.py
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import dotenv_values, load_dotenv
+from event_log import events, setup_logging
+from event_scheduler import BAR_INTERVALS, BarScheduler, interval_to_ms
+from kline_cache import closed_rows
+from shared_market_data import SharedMarketData
+
+
+def _symbols_from_env():
+    symbols = [s.strip() for s in os.getenv("TRADING_SYMBOLS", "").split(",") if s.strip()]
+    return symbols or [os.getenv("TRADING_SYMBOL", 'BTCUSDT')]
+
+
+def _history_bars():
+    # Same rule as TradingBot: the evaluation window, or the base bars the higher-timeframe filters start from
+    limit = int(os.getenv("TRADING_LIMIT", 100))
+    higher_timeframes = [tf.strip() for tf in os.getenv("HIGHER_TIMEFRAMES", "").split(",") if tf.strip()]
+    if not higher_timeframes:
+        return limit
+    base_ms = interval_to_ms(os.getenv("TRADING_INTERVAL", '1'))
+    longest = max(interval_to_ms(tf) for tf in higher_timeframes) // base_ms
+    return max(limit, int(os.getenv("HIGHER_TIMEFRAME_BARS", 100)) * longest)
+
+
+def _stop_on_sigterm():
+    # Unwind like Ctrl+C on the first SIGTERM; a second one (group kill plus supervisor) must not interrupt cleanup
+    def stop(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, stop)
+
+
+class MarketDataPublisher:
+    # The only process that reads market data from the exchange. After every bar close it refreshes each symbol's
+    # kline cache, computes the indicator columns over the workers' TRADING_LIMIT window and publishes both.
+    def __init__(self, segment_name):
+        from bybit_demo_session import BybitDemoSession
+        from kline_cache import KlineCache
+        from kline_store import KlineStore
+        from metrics import Metrics
+        from strategies import Strategies
+
+        self.shared = SharedMarketData.attach(segment_name)
+        self.symbols = self.shared.symbols
+        self.interval = os.getenv("TRADING_INTERVAL", '1')
+        self.limit = int(os.getenv("TRADING_LIMIT", 100))
+        self.bar_close_delay = float(os.getenv("BAR_CLOSE_DELAY", 0.5))
+        self.metrics = Metrics()
+        self.session = BybitDemoSession(os.getenv("BYBIT_API_KEY"), os.getenv("BYBIT_API_SECRET"),
+                                        base_url=os.getenv("BYBIT_BASE_URL", "https://api-demo.bybit.com"),
+                                        pool_maxsize=max(10, len(self.symbols)), metrics=self.metrics)
+        kline_store_dir = os.getenv("KLINE_STORE_DIR")
+        self.kline_cache = KlineCache(self.session, max_bars=self.shared.capacity,
+                                      store=KlineStore(kline_store_dir) if kline_store_dir else None)
+        self.strategy = Strategies()
+        self.executor = ThreadPoolExecutor(max_workers=min(8, len(self.symbols)), thread_name_prefix="publish")
+        self.scheduler = None
+
+    def publish(self, symbol):
+        # Closed bars only: the forming bar the exchange returns as the newest row is left out
+        rows = self.kline_cache.get_historical_data(symbol, self.interval, self.shared.capacity + 1)
+        if rows is None:
+            events.error("error", where="market_data_publish", symbol=symbol)
+            return
+        now_ms = self.scheduler.now_ms() if self.scheduler else time.time() * 1000
+        rows = closed_rows(rows, interval_to_ms(self.interval), now_ms)[:self.shared.capacity]
+        candles = self.strategy.prepare_candles(rows)
+        window = candles.tail(self.limit)
+        self.strategy.calculate_indicators(window)
+        self.shared.publish(symbol, candles, window)
+
+    def publish_all(self):
+        start = time.perf_counter()
+        list(self.executor.map(self.publish, self.symbols))
+        events.info("market_data_published", symbols=len(self.symbols), ms=(time.perf_counter() - start) * 1000)
+
+    def run(self):
+        scheduler = self.scheduler = BarScheduler(server_time_fn=self.session.get_server_time)
+        scheduler.add_bar_task("publish", self.publish_all, self.interval, delay_seconds=self.bar_close_delay)
+        events.info("startup", role="market_data", symbols=self.symbols, capacity=self.shared.capacity)
+        scheduler.run()
+
+
+def run_market_data(env, segment_name):
+    os.environ.clear()
+    os.environ.update(env)
+    _stop_on_sigterm()
+    setup_logging(path=os.getenv("LOG_FILE", "market_data.log"), level=os.getenv("LOG_LEVEL", "INFO"),
+                  console_level=os.getenv("CONSOLE_LOG_LEVEL", "INFO"))
+    MarketDataPublisher(segment_name).run()
+
+
+def run_worker(env):
+    os.environ.clear()
+    os.environ.update(env)
+    from trading_bot import TradingBot, _exit_on_sigterm
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    TradingBot(feed="shared").run()
+
+
+class Supervisor:
+    # One market-data process and one TradingBot worker per env file (account or strategy variant), each a
+    # separate process. The supervisor owns the shared-memory segment; a child that exits is restarted after
+    # a delay that doubles while it keeps failing.
+    MIN_HEALTHY_SECONDS = 60
+
+    def __init__(self, worker_env_files, restart_delay=1.0, max_restart_delay=60.0):
+        load_dotenv()
+        self.symbols = _symbols_from_env()
+        self.interval = os.getenv("TRADING_INTERVAL", '1')
+        if self.interval not in BAR_INTERVALS:
+            raise ValueError(f"Trading interval must be one of {', '.join(BAR_INTERVALS)} (got {self.interval!r})")
+        self.capacity = _history_bars()
+        self.worker_env_files = worker_env_files
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.context = multiprocessing.get_context("spawn")
+        self.shared = None
+        # name -> {"target", "args", "process", "started", "delay", "restart_at"}
+        self.children = {}
+
+    def _worker_env(self, path):
+        # Supervisor environment, overridden by the worker's file. Per-worker files (log, warm start) default
+        # to the file's name; a metrics port is never inherited, since two workers cannot share it.
+        name = os.path.splitext(os.path.basename(path))[0]
+        own = {key: value for key, value in dotenv_values(path).items() if value is not None}
+        env = {key: value for key, value in os.environ.items() if key not in ("METRICS_PORT", "METRICS_FILE")}
+        env.update({"LOG_FILE": f"{name}.log", "WARM_START_FILE": f"data/warm_start_{name}.pkl"})
+        env.update(own)
+        env.update({"MARKET_DATA_FEED": "shared", "SHARED_MARKET_DATA": self.shared.name})
+        return name, env
+
+    def _start(self, name):
+        child = self.children[name]
+        process = self.context.Process(target=child["target"], args=child["args"], name=name, daemon=False)
+        process.start()
+        child.update(process=process, started=time.monotonic(), restart_at=None)
+        events.info("child_started", name=name, pid=process.pid)
+
+    def _check(self, name):
+        child = self.children[name]
+        process = child["process"]
+        now = time.monotonic()
+        if child["restart_at"] is not None:
+            if now >= child["restart_at"]:
+                self._start(name)
+            return
+        if process.is_alive():
+            return
+        healthy = now - child["started"] >= self.MIN_HEALTHY_SECONDS
+        child["delay"] = self.restart_delay if healthy else min(self.max_restart_delay, child["delay"] * 2)
+        child["restart_at"] = now + child["delay"]
+        events.warning("child_exited", name=name, exitcode=process.exitcode, restart_in=child["delay"])
+
+    def run(self):
+        self.shared = SharedMarketData.create(self.symbols, self.capacity, interval_to_ms(self.interval))
+        events.info("startup", role="supervisor", segment=self.shared.name, symbols=self.symbols,
+                    capacity=self.capacity, workers=len(self.worker_env_files))
+        market_data_env = dict(os.environ, LOG_FILE=os.getenv("MARKET_DATA_LOG_FILE", "market_data.log"))
+        self.children["market_data"] = {"target": run_market_data, "args": (market_data_env, self.shared.name),
+                                        "delay": self.restart_delay / 2}
+        for path in self.worker_env_files:
+            name, env = self._worker_env(path)
+            self.children[name] = {"target": run_worker, "args": (env,), "delay": self.restart_delay / 2}
+        try:
+            for name in self.children:
+                self._start(name)
+            while True:
+                time.sleep(1)
+                for name in self.children:
+                    self._check(name)
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10):
+        # SIGTERM first so workers save their warm-start state, then whatever is left is killed
+        processes = [child["process"] for child in self.children.values() if child.get("process")]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one market-data process and a TradingBot per account")
+    parser.add_argument("workers", nargs="+", help="env file per worker, overriding the supervisor's environment")
+    args = parser.parse_args()
+
+    _stop_on_sigterm()
+    load_dotenv()
+    setup_logging(path=os.getenv("SUPERVISOR_LOG_FILE", "supervisor.log"), level=os.getenv("LOG_LEVEL", "INFO"),
+                  console_level=os.getenv("CONSOLE_LOG_LEVEL", "INFO"))
+    Supervisor(args.workers).run()
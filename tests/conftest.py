@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# The modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
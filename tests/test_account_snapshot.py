@@ -0,0 +1,55 @@
+# test_account_snapshot.py
+
+from account_snapshot import AccountSnapshot
+from market_data_ws import MarketDataStream
+
+SYMBOL = "BTCUSDT"
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def fetch_positions(self, symbol):
+        self.calls.append("fetch_positions")
+        return [{"size": "0", "updatedTime": "0"}]
+
+    def fetch_open_orders(self, symbol):
+        self.calls.append("fetch_open_orders")
+        return []
+
+    def fetch_ticker(self, symbol):
+        self.calls.append("fetch_ticker")
+        return {"lastPrice": "100.5"}
+
+
+def test_refresh_without_a_price_fetches_the_ticker():
+    session = FakeSession()
+    snapshot = AccountSnapshot(session, SYMBOL, ttl=0)
+    assert snapshot.refresh()
+    assert sorted(session.calls) == ["fetch_open_orders", "fetch_positions", "fetch_ticker"]
+    assert snapshot.get_real_time_price() == 100.5
+
+
+def test_stream_price_replaces_the_ticker_request():
+    session = FakeSession()
+    snapshot = AccountSnapshot(session, SYMBOL, ttl=0)
+    snapshot.start_refresh(price=101.25)
+    assert snapshot.refresh()
+    assert sorted(session.calls) == ["fetch_open_orders", "fetch_positions"]
+    assert snapshot.get_real_time_price() == 101.25
+
+
+def test_stream_price_is_only_fresh_while_connected_and_updating():
+    stream = MarketDataStream(None, SYMBOL, "1", 3)
+    stream._apply_ticker("snapshot", {"symbol": SYMBOL, "lastPrice": "99.5"})
+    # Not connected
+    assert stream.fresh_price(2) is None
+    stream.connected.set()
+    assert stream.fresh_price(2) == 99.5
+    # A delta without lastPrice still shows the stream is live
+    stream.ticker_at -= 10
+    stream._apply_ticker("delta", {"symbol": SYMBOL, "markPrice": "99.6"})
+    assert stream.fresh_price(2) == 99.5
+    stream.ticker_at -= 10
+    assert stream.fresh_price(2) is None
@@ -0,0 +1,22 @@
+# test_candles.py
+
+import numpy as np
+from candles import COLUMNS, Candles
+from strategies import Strategies
+
+
+def test_empty_klines_give_empty_columns():
+    candles = Strategies().prepare_candles([])
+    assert len(candles) == 0
+    assert candles.arrays["timestamp"].dtype == np.int64
+    assert candles.arrays["close"].dtype == np.float64
+    assert candles["close"].empty
+    df = candles.to_dataframe()
+    assert df.empty and list(df.columns) == list(COLUMNS)
+
+
+def test_klines_are_parsed_oldest_first():
+    rows = [["120000", "2", "3", "1", "2.5", "10", "25"], ["60000", "1", "2", "0.5", "1.5", "5", "7.5"]]
+    candles = Candles.from_klines(rows)
+    assert candles.arrays["timestamp"].tolist() == [60000, 120000]
+    assert candles["close"].tolist() == [1.5, 2.5]
@@ -0,0 +1,52 @@
+# test_indicator_cache.py
+
+import numpy as np
+import pytest
+from benchmarks import make_klines
+from indicator_cache import COLUMNS, IndicatorCache
+from strategies import Strategies
+
+
+def forming(row, close):
+    # The newest bar a little later: new close, range widened to include it
+    return [row[0], row[1], str(max(float(row[2]), close)), str(min(float(row[3]), close)), str(close),
+            row[5], row[6]]
+
+
+def assert_same(df, expected):
+    for column in COLUMNS:
+        np.testing.assert_allclose(df[column].to_numpy(), expected[column].to_numpy(), rtol=1e-10, atol=1e-10,
+                                   equal_nan=True, err_msg=column)
+
+
+@pytest.mark.parametrize("window", [10, 25, 200])
+def test_cache_equals_full_recompute(window):
+    # Windows shorter than the indicator periods check the NaN warm-up as well
+    strategy = Strategies()
+    cache = IndicatorCache(strategy)
+    klines = list(reversed(make_klines(window + 5)))
+    for end in range(window, window + 5):
+        bars = klines[end - window:end]
+        last = bars[-1]
+        for step, close in enumerate([float(last[1]), float(last[4]) * 0.999, float(last[4]) * 1.002, float(last[4])]):
+            bars[-1] = forming(last, close)
+            df = strategy.prepare_candles(list(reversed(bars)))
+            cache.calculate_indicators(df, "BTCUSDT", "15")
+            assert_same(df, strategy.calculate_indicators(strategy.prepare_dataframe(list(reversed(bars)))))
+    # One miss per new bar, then hits while it forms
+    assert cache.get_stats()["misses"] == 5
+    assert cache.get_stats()["hits"] == 15
+
+
+def test_restored_entries_give_the_same_values():
+    strategy = Strategies()
+    klines = list(reversed(make_klines(120)))
+    cache = IndicatorCache(strategy)
+    cache.calculate_indicators(strategy.prepare_candles(list(reversed(klines))), "BTCUSDT", "60")
+
+    restored = IndicatorCache(strategy)
+    restored.restore(cache.export())
+    klines[-1] = forming(klines[-1], float(klines[-1][4]) * 1.001)
+    df = restored.calculate_indicators(strategy.prepare_candles(list(reversed(klines))), "BTCUSDT", "60")
+    assert restored.get_stats()["hits"] == 1
+    assert_same(df, strategy.calculate_indicators(strategy.prepare_dataframe(list(reversed(klines)))))
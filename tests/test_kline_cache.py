@@ -0,0 +1,66 @@
+# test_kline_cache.py
+
+from kline_cache import KlineCache
+
+SYMBOL = "BTCUSDT"
+BAR_MS = 60 * 1000
+
+
+class FakeSession:
+    # Serves `rows` (chronological) like /v5/market/kline
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_historical_data(self, symbol, interval, limit, start=None, end=None):
+        self.calls.append((limit, start, end))
+        rows = [row for row in self.rows
+                if (start is None or int(row[0]) >= start) and (end is None or int(row[0]) <= end)]
+        return list(reversed(rows))[:limit]
+
+
+def bars(first, count):
+    return [[str(first + i * BAR_MS), "1", "2", "0.5", "1.5", "1", "1.5"] for i in range(count)]
+
+
+def starts(rows):
+    return [int(row[0]) for row in rows]
+
+
+def test_buffers_hold_the_longest_window_however_they_were_filled():
+    history = bars(0, 20)
+    session = FakeSession(history)
+    cache = KlineCache(session, max_bars=5)
+    cache.restore(SYMBOL, "1", history[-5:])
+
+    # A longer window than max_bars: fetched in full once...
+    assert starts(cache.get_historical_data(SYMBOL, "1", 8)) == starts(reversed(history[-8:]))
+    assert session.calls == [(8, None, None)]
+    # ...and kept from then on, also for bars pushed by the stream
+    cache.apply_bar(SYMBOL, "1", bars(20 * BAR_MS, 1)[0])
+    session.rows = history + bars(20 * BAR_MS, 1)
+    assert len(cache.get_cached(SYMBOL, "1", 8)) == 8
+    assert len(cache.get_historical_data(SYMBOL, "1", 8)) == 8
+    assert session.calls[1:] == [(8, 20 * BAR_MS, None)]
+
+    # A buffer rebuilt from pushed bars or restored gets the same length
+    cache.invalidate()
+    cache.restore(SYMBOL, "1", history)
+    assert len(cache.get_cached(SYMBOL, "1", 20)) == 8
+    cache.invalidate()
+    for row in history:
+        cache.apply_bar(SYMBOL, "1", row)
+    assert len(cache.get_cached(SYMBOL, "1", 20)) == 8
+
+
+def test_backfill_after_a_long_outage_stops_at_a_full_buffer():
+    session = FakeSession(bars(0, 10))
+    cache = KlineCache(session, max_bars=10)
+    cache.get_historical_data(SYMBOL, "1", 10)
+
+    # 2500 bars later: only the newest 10 fit in the buffer, so one page of 10 is enough
+    session.rows = bars(0, 2510)
+    session.calls.clear()
+    rows = cache.get_historical_data(SYMBOL, "1", 10)
+    assert session.calls == [(10, 9 * BAR_MS, None)]
+    assert starts(rows) == starts(reversed(session.rows[-10:]))
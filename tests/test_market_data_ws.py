@@ -0,0 +1,145 @@
+# test_market_data_ws.py
+
+import time
+import pytest
+from kline_cache import KlineCache
+from market_data_ws import MarketDataStream
+from ws_replay_server import WsReplayServer
+
+SYMBOL = "BTCUSDT"
+BAR_MS = 60 * 1000
+
+
+class FakeSession:
+    # The REST side of the backfill: serves `rows` (chronological) like /v5/market/kline
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_historical_data(self, symbol, interval, limit, start=None, end=None):
+        self.calls.append((limit, start, end))
+        rows = [row for row in self.rows
+                if (start is None or int(row[0]) >= start) and (end is None or int(row[0]) <= end)]
+        return list(reversed(rows))[:limit]
+
+
+def row(start, close):
+    return [str(start), str(close), str(close + 5), str(close - 5), str(close), "1.0", str(close)]
+
+
+def kline(start, close, confirm):
+    return {"topic": f"kline.1.{SYMBOL}", "type": "snapshot", "ts": start + BAR_MS,
+            "data": [{"start": start, "end": start + BAR_MS - 1, "interval": "1", "open": str(close),
+                      "close": str(close), "high": str(close + 5), "low": str(close - 5), "volume": "1.0",
+                      "turnover": str(close), "confirm": confirm, "timestamp": start + BAR_MS}]}
+
+
+def ticker(price):
+    return {"topic": f"tickers.{SYMBOL}", "type": "snapshot", "ts": 0, "data": {"symbol": SYMBOL, "lastPrice": str(price)}}
+
+
+def book(kind, update_id, bids=(), asks=()):
+    return {"topic": f"orderbook.50.{SYMBOL}", "type": kind, "ts": 0,
+            "data": {"s": SYMBOL, "b": [list(level) for level in bids], "a": [list(level) for level in asks],
+                     "u": update_id, "seq": update_id}}
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def current_bar():
+    # Start of the forming minute bar, away from its end so the test does not straddle a bar close
+    now = time.time() * 1000
+    if BAR_MS - now % BAR_MS < 5000:
+        time.sleep((BAR_MS - now % BAR_MS) / 1000 + 0.1)
+        now = time.time() * 1000
+    return int(now - now % BAR_MS)
+
+
+@pytest.fixture
+def serve():
+    started = []
+
+    def start(messages, session, **kwargs):
+        server = WsReplayServer(messages).start()
+        stream = MarketDataStream(KlineCache(session), SYMBOL, "1", 3, url=server.url, reconnect_delay=0.05, **kwargs)
+        stream.start()
+        started.append((server, stream))
+        wait_until(lambda: all(server.subscribed(topic) for topic in stream.topics))
+        return server, stream
+
+    yield start
+    for server, stream in started:
+        stream.stop()
+        server.stop()
+
+
+def test_confirm_ticks_and_backfill_after_disconnect(serve):
+    now_bar = current_bar()
+    t0, t1, t2 = now_bar - 4 * BAR_MS, now_bar - 3 * BAR_MS, now_bar - 2 * BAR_MS
+    history = [row(t0 - BAR_MS, 99.0), row(t0, 100.0)]
+    session = FakeSession(list(history))
+    messages = [
+        ticker(101.0),
+        kline(t1, 101.0, False),
+        kline(t1, 102.0, True),
+        # Pushed while disconnected
+        kline(t2, 103.0, True),
+    ]
+    server, stream = serve(messages, session)
+
+    # Forming updates change the cache but only the confirm queues an evaluation
+    server.publish(2)
+    wait_until(lambda: stream.last_price == 101.0 and stream.get_historical_data(1)[0][0] == str(t1))
+    assert stream.closed_bars.empty()
+    server.publish(1)
+    assert stream.closed_bars.get(timeout=5) == (SYMBOL, t1)
+    assert stream.get_historical_data(2) == [row(t1, 102.0), row(t0, 100.0)]
+
+    # The exchange moves on while the stream is down: t2 closes and a new bar starts forming
+    server.disconnect()
+    wait_until(lambda: not stream.connected.is_set())
+    server.skip(1)
+    session.rows = history + [row(t1, 102.0), row(t2, 103.0), row(now_bar, 104.0)]
+    wait_until(lambda: server.connections == 2 and all(server.subscribed(topic) for topic in stream.topics))
+
+    # Backfilled over REST from the newest cached bar, and the missed close is evaluated
+    assert session.calls[-1] == (1000, t1, None)
+    assert [r[0] for r in stream.get_historical_data(4)] == [str(now_bar), str(t2), str(t1), str(t0)]
+    assert stream.closed_bars.get(timeout=5) == (SYMBOL, t2)
+    assert stream.closed_bars.empty()
+    subscribes = [op for op in server.requests if op["op"] == "subscribe"]
+    assert [op["args"] for op in subscribes] == [stream.topics, stream.topics]
+
+
+def test_order_book_gap_resubscribes(serve):
+    now_bar = current_bar()
+    session = FakeSession([row(now_bar - BAR_MS, 100.0)])
+    messages = [
+        book("snapshot", 10, bids=[("99.5", "2")], asks=[("100.5", "3")]),
+        book("delta", 11, bids=[("99.6", "1")]),
+        # u 12 was lost
+        book("delta", 13, asks=[("100.4", "1")]),
+        book("snapshot", 20, bids=[("99.7", "2")], asks=[("100.3", "3")]),
+    ]
+    server, stream = serve(messages, session, order_book_depth=50)
+    topic = stream.order_book.topic
+
+    server.publish(2)
+    wait_until(lambda: stream.order_book.update_id == 11)
+    assert stream.order_book.top() == (99.6, 100.5)
+
+    server.publish(1)
+    wait_until(lambda: [op["op"] for op in server.requests if op.get("args") == [topic]][-2:] == ["unsubscribe", "subscribe"])
+    assert stream.order_book.gaps == 1
+    assert not stream.order_book.is_ready()
+
+    server.publish(1)
+    wait_until(lambda: stream.order_book.update_id == 20)
+    assert stream.order_book.is_ready()
+    assert stream.order_book.top() == (99.7, 100.3)
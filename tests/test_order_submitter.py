@@ -0,0 +1,58 @@
+# test_order_submitter.py
+
+import json
+import time
+import pytest
+import requests
+from bybit_demo_session import BybitDemoSession
+from order_submitter import FastOrderSubmitter, OrderTemplate
+
+SYMBOL = "BTCUSDT"
+ENDPOINT = FastOrderSubmitter.ENDPOINT
+
+
+class Response:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"retCode": 0, "retMsg": "OK", "result": {}}
+
+
+class CapturingTransport:
+    # Keeps the body of every POST the way requests would put it on the wire
+    def __init__(self):
+        self.bodies = []
+
+    def attempts(self, method):
+        return 1
+
+    def request(self, method, endpoint, params=None, json=None, data=None, headers=None):
+        if json is not None:
+            data = requests.Request(method, "http://exchange" + endpoint, json=json).prepare().body
+        self.bodies.append(data)
+        return Response()
+
+
+@pytest.mark.parametrize("side, current_price, stop_loss, take_profit", [
+    ("Buy", 30000.0, 29850.5, 30300.25),
+    ("Sell", 2512.37, 2530.1, 2480.0),
+    ("Buy", 0.123456789, None, None),
+    ("Sell", 65000.0, 64000.0, None),
+])
+def test_template_sends_the_same_body_as_the_session(monkeypatch, side, current_price, stop_loss, take_profit):
+    monkeypatch.setattr(time, "time", lambda: 1_700_000_000.123)
+    session = BybitDemoSession("test-key", "test-secret")
+    session.transport = CapturingTransport()
+
+    params = session._prepare_order(SYMBOL, side, 0.03, current_price, stop_loss, take_profit)
+    session.send_request("POST", ENDPOINT, params)
+
+    template = OrderTemplate("test-key", "test-secret", SYMBOL, side, 0.03, session._position_idx(side))
+    price, adjusted_stop_loss = session._limit_prices(SYMBOL, side, current_price, stop_loss)
+    session.send_prepared(ENDPOINT, lambda: template.build(price, adjusted_stop_loss, take_profit))
+
+    signed, prebuilt = session.transport.bodies
+    assert prebuilt == signed
+    assert json.loads(prebuilt)["sign"] == session._generate_signature(
+        {name: value for name, value in json.loads(signed).items() if name != "sign"})
@@ -0,0 +1,83 @@
+# test_trading_bot.py
+
+import pytest
+
+SYMBOL = "BTCUSDT"
+BAR_MS = 60 * 1000
+# Start of the bar that is forming on the exchange
+NOW_BAR = 1_700_000_040_000
+
+
+class SkewedClock:
+    # A local clock `skew` seconds off the exchange, whose time is just past the start of NOW_BAR
+    def __init__(self, skew):
+        self.skew = skew
+
+    def time(self):
+        return NOW_BAR / 1000 + 0.2 + self.skew
+
+    def monotonic(self):
+        return self.time()
+
+
+def row(start, close):
+    return [str(start), str(close), str(close + 5), str(close - 5), str(close), "1.0", str(close)]
+
+
+@pytest.fixture
+def make_bot(monkeypatch, tmp_path):
+    env = {
+        "BYBIT_API_KEY": "test", "BYBIT_API_SECRET": "test", "TRADING_SYMBOL": SYMBOL, "TRADING_SYMBOLS": "",
+        "TRADING_INTERVAL": "1", "TRADING_LIMIT": "3", "HIGHER_TIMEFRAMES": "", "KLINE_STORE_DIR": "",
+        "WARM_START_FILE": "", "CONSOLE_LOG_LEVEL": "OFF", "LOG_FILE": str(tmp_path / "trading_bot.log"),
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    from trading_bot import TradingBot
+    bots = []
+
+    def make(**kwargs):
+        bot = TradingBot(**kwargs)
+        bots.append(bot)
+        return bot
+
+    yield make
+    for bot in bots:
+        bot.log_pipeline.close()
+
+
+def test_ws_rows_follow_the_confirmed_bar_not_the_local_clock(make_bot):
+    # The local clock lags the exchange by 2 s: by wall time the bar just confirmed is still forming
+    bot = make_bot(feed="ws", clock=SkewedClock(-2.0))
+    stream = bot.market_data[SYMBOL]
+    for start in range(NOW_BAR - 4 * BAR_MS, NOW_BAR, BAR_MS):
+        bot.kline_cache.apply_bar(SYMBOL, "1", row(start, start / BAR_MS))
+    expected = [NOW_BAR - BAR_MS, NOW_BAR - 2 * BAR_MS, NOW_BAR - 3 * BAR_MS]
+
+    # Before the first confirm nothing is known to be closed
+    assert bot._closed_rows(stream.get_historical_data(bot.limit + 1), bot.limit, stream) is None
+
+    # The confirm for the previous bar arrives before the first push of the new one
+    stream.last_confirmed = NOW_BAR - BAR_MS
+    rows = stream.get_historical_data(bot.limit + 1)
+    assert [int(r[0]) for r in bot._closed_rows(rows, bot.limit, stream)] == expected
+    # Judged by the lagging clock, the bar just confirmed would count as forming and be dropped
+    assert int(bot._closed_rows(rows, bot.limit)[0][0]) == NOW_BAR - 2 * BAR_MS
+
+    bot.kline_cache.apply_bar(SYMBOL, "1", row(NOW_BAR, 1.0))
+    rows = stream.get_historical_data(bot.limit + 1)
+    assert [int(r[0]) for r in bot._closed_rows(rows, bot.limit, stream)] == expected
+
+
+def test_rest_rows_drop_the_forming_bar(make_bot):
+    bot = make_bot(feed="rest", clock=SkewedClock(0.0))
+    rows = [row(start, 1.0) for start in range(NOW_BAR, NOW_BAR - 5 * BAR_MS, -BAR_MS)]
+    closed = bot._closed_rows(rows, bot.limit)
+    assert [int(r[0]) for r in closed] == [NOW_BAR - BAR_MS, NOW_BAR - 2 * BAR_MS, NOW_BAR - 3 * BAR_MS]
+
+
+@pytest.mark.parametrize("interval", ["M", "2", ""])
+def test_intervals_without_a_fixed_bar_are_rejected(make_bot, monkeypatch, interval):
+    monkeypatch.setenv("TRADING_INTERVAL", interval)
+    with pytest.raises(ValueError, match="Trading interval must be one of"):
+        make_bot(feed="rest")
@@ -0,0 +1,43 @@
+# test_traffic_log.py
+
+import json
+import pytest
+from bybit_demo_session import BybitDemoSession
+from traffic_log import NotRecorded, ReplayRateLimiter, ReplayTransport
+
+PARAMS = {"category": "linear", "symbol": "BTCUSDT"}
+
+
+def recorded(endpoint, params, body, error=None):
+    record = {"kind": "request", "method": "GET", "endpoint": endpoint, "params": params, "t": 0.0, "m": 0.0, "ms": 1.0}
+    if error:
+        record.update(error=error, message="lost")
+    else:
+        record.update(status=200, headers={}, body=json.dumps(body))
+    return record
+
+
+def replay_session(records):
+    session = BybitDemoSession("test-key", "test-secret")
+    session.transport = ReplayTransport(records)
+    session.rate_limiter = ReplayRateLimiter()
+    return session
+
+
+def test_unrecorded_request_counts_once():
+    session = replay_session([])
+    with pytest.raises(NotRecorded):
+        session.send_request("GET", "/v5/market/tickers", dict(PARAMS))
+    assert session.transport.requests_sent == 1
+    assert len(session.transport.misses) == 1
+
+
+def test_recorded_failures_are_retried_like_the_recorded_session():
+    ticker = {"retCode": 0, "retMsg": "OK", "result": {"list": [{"lastPrice": "100.5"}]}}
+    session = replay_session([
+        recorded("/v5/market/tickers", PARAMS, None, error="ConnectionError"),
+        recorded("/v5/market/tickers", PARAMS, ticker),
+    ])
+    assert session.fetch_ticker("BTCUSDT") == {"lastPrice": "100.5"}
+    assert session.transport.retries == 1
+    assert session.transport.misses == [] and session.transport.unused() == 0
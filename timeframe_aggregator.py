@@ -0,0 +1,112 @@
+# timeframe_aggregator.py
+
+import numpy as np
+from candles import COLUMNS, Candles
+from event_scheduler import WEEK_ORIGIN_MS, interval_to_ms
+
+
+def _empty():
+    return {column: np.empty(0, dtype=np.int64 if column == "timestamp" else np.float64) for column in COLUMNS}
+
+
+def aggregate_arrays(arrays, timeframe_ms, origin_ms=0, complete_first=False):
+    # Chronological base-interval columns -> higher-timeframe columns. A leading bucket that started before
+    # the first base bar is dropped unless complete_first says the caller knows it is whole.
+    timestamps = arrays["timestamp"]
+    if len(timestamps) == 0:
+        return _empty()
+    buckets = timestamps - (timestamps - origin_ms) % timeframe_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if not complete_first and timestamps[0] != buckets[0]:
+        starts = starts[1:]
+    if len(starts) == 0:
+        return _empty()
+    first = starts[0]
+    offsets = starts - first
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    return {
+        "timestamp": buckets[starts],
+        "open": arrays["open"][starts],
+        "high": np.maximum.reduceat(arrays["high"][first:], offsets),
+        "low": np.minimum.reduceat(arrays["low"][first:], offsets),
+        "close": arrays["close"][ends],
+        "volume": np.add.reduceat(arrays["volume"][first:], offsets),
+        "turnover": np.add.reduceat(arrays["turnover"][first:], offsets),
+    }
+
+
+class TimeframeAggregator:
+    # Higher-timeframe candles built from the base-interval candles the bot already has, so 5m/15m/1h views
+    # cost no extra kline requests. Each update only re-aggregates from the newest stored (possibly still
+    # forming) bucket onwards; older higher-timeframe bars are kept even after the base window drops them.
+    def __init__(self, base_interval="1", timeframes=("5", "15", "60"), max_bars=1000):
+        self.base_ms = interval_to_ms(base_interval)
+        self.timeframes = [str(timeframe) for timeframe in timeframes]
+        self.timeframe_ms = {}
+        for timeframe in self.timeframes:
+            timeframe_ms = interval_to_ms(timeframe)
+            if timeframe_ms <= self.base_ms or timeframe_ms % self.base_ms:
+                raise ValueError(f"Timeframe {timeframe} is not a multiple of the {base_interval} base interval")
+            self.timeframe_ms[timeframe] = timeframe_ms
+        self.max_bars = max_bars
+        # (symbol, timeframe) -> chronological column arrays
+        self.bars = {}
+
+    def bars_per(self, timeframe):
+        return self.timeframe_ms[str(timeframe)] // self.base_ms
+
+    @property
+    def window_bars(self):
+        # Base bars an update needs to reach back to the start of every forming bucket
+        return 2 * max(self.bars_per(timeframe) for timeframe in self.timeframes)
+
+    def bars_needed(self, symbol, newest_ms):
+        # Base bars an update ending at newest_ms needs to continue from the stored forming buckets,
+        # e.g. after a restart restored bars that are older than the usual window
+        needed = self.window_bars
+        for timeframe in self.timeframes:
+            stored = self.bars.get((symbol, timeframe))
+            if stored is not None and len(stored["timestamp"]):
+                needed = max(needed, (newest_ms - int(stored["timestamp"][-1])) // self.base_ms + 1)
+        return needed
+
+    def restore(self, symbol, bars):
+        # bars: timeframe -> column arrays saved by a previous run
+        for timeframe, arrays in bars.items():
+            if timeframe in self.timeframe_ms:
+                self.bars[(symbol, timeframe)] = arrays
+
+    def has(self, symbol):
+        return all((symbol, timeframe) in self.bars for timeframe in self.timeframes)
+
+    def _origin(self, timeframe):
+        return WEEK_ORIGIN_MS if timeframe == "W" else 0
+
+    def update(self, symbol, base):
+        # base: Candles or chronological column arrays of the base interval, newest bar possibly forming
+        arrays = base.arrays if isinstance(base, Candles) else base
+        timestamps = arrays["timestamp"]
+        for timeframe in self.timeframes:
+            timeframe_ms = self.timeframe_ms[timeframe]
+            stored = self.bars.get((symbol, timeframe))
+            if stored is None or len(stored["timestamp"]) == 0 or timestamps[0] > stored["timestamp"][-1]:
+                # First update, or the window no longer reaches the stored forming bucket: rebuild
+                self.bars[(symbol, timeframe)] = aggregate_arrays(arrays, timeframe_ms, self._origin(timeframe))
+                continue
+            resume = stored["timestamp"][-1]
+            i = int(np.searchsorted(timestamps, resume, side="left"))
+            fresh = aggregate_arrays({column: values[i:] for column, values in arrays.items()}, timeframe_ms,
+                                     self._origin(timeframe), complete_first=True)
+            keep = len(stored["timestamp"]) - 1
+            self.bars[(symbol, timeframe)] = {
+                column: np.concatenate((stored[column][:keep], fresh[column]))[-self.max_bars:]
+                for column in COLUMNS
+            }
+
+    def get(self, symbol, timeframe, limit=None):
+        bars = self.bars.get((symbol, str(timeframe)))
+        if bars is None:
+            return None
+        if limit is not None:
+            bars = {column: values[-limit:] for column, values in bars.items()}
+        return Candles.from_arrays(bars)
@@ -1,20 +1,40 @@
 # trading_bot.py
 
-import schedule
 import time
+# Startup timing is measured from here, before the heavier imports below
+STARTED = time.perf_counter()
+
+import argparse
+import queue
+import signal
+import sys
+import threading
 import logging
-from data_fetcher import DataFetcher
 from indicators import Indicators
 from strategies import Strategies
 from risk_management import RiskManagement
 from dotenv import load_dotenv
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from bybit_demo_session import BybitDemoSession
+from kline_cache import KlineCache, closed_rows
+from kline_store import KlineStore
+from account_snapshot import AccountSnapshot
+from event_scheduler import BAR_INTERVALS, WEEK_ORIGIN_MS, BarScheduler, interval_to_ms
+from metrics import Metrics
+from event_log import events, setup_logging
+from timeframe_aggregator import TimeframeAggregator
+from order_sweeper import StaleOrderSweeper
+from indicator_cache import IndicatorCache
+from order_submitter import FastOrderSubmitter
+from warm_start import WarmStartStore
 
 class TradingBot:
-    def __init__(self):
+    # `clock` (the time module by default) is what bar times, cooldowns, order ages and snapshot freshness are
+    # judged by; exchange_simulator.py passes its simulated clock to run the bot faster than real time
+    def __init__(self, feed=None, clock=time):
         load_dotenv()
+        self.clock = clock
 
         self.api_key = os.getenv("BYBIT_API_KEY")
         self.api_secret = os.getenv("BYBIT_API_SECRET") 
@@ -22,129 +42,560 @@ class TradingBot:
         if not self.api_key or not self.api_secret:
             raise ValueError("API keys not found. Please set BYBIT_API_KEY and BYBIT_API_SECRET in your .env file.")
 
-        self.data_fetcher = BybitDemoSession(self.api_key, self.api_secret)
+        # TRADING_SYMBOLS=BTCUSDT,ETHUSDT,... scans several symbols per tick; TRADING_SYMBOL is the single-symbol default
+        self.symbols = [s.strip() for s in os.getenv("TRADING_SYMBOLS", "").split(",") if s.strip()]
+        if not self.symbols:
+            self.symbols = [os.getenv("TRADING_SYMBOL", 'BTCUSDT')]
+        self.symbol = self.symbols[0]
+        self.scan_workers = max(1, min(int(os.getenv("SCAN_WORKERS", 8)), len(self.symbols)))
+        self.executor = ThreadPoolExecutor(max_workers=self.scan_workers, thread_name_prefix="scan") if len(self.symbols) > 1 else None
+        self.request_budget = int(os.getenv("REQUEST_BUDGET_PER_TICK", 600))
+        # Strategy ticks run just after each bar close; order housekeeping runs on its own faster cadence
+        self.bar_close_delay = float(os.getenv("BAR_CLOSE_DELAY", 0.5))
+        self.housekeeping_period = float(os.getenv("HOUSEKEEPING_SECONDS", 5))
+        # job_symbol and housekeeping never touch the same symbol's snapshot at once
+        self.symbol_locks = {symbol: threading.Lock() for symbol in self.symbols}
+
+        # Stage timers and per-endpoint request metrics, exported as Prometheus text
+        self.metrics = Metrics()
+        self.metrics_summary_period = float(os.getenv("METRICS_SUMMARY_SECONDS", 60))
+        self.metrics_file = os.getenv("METRICS_FILE")
+        self.metrics_port = int(os.getenv("METRICS_PORT", 0))
+        self.last_metrics_report = time.monotonic()
+
+        # EXCHANGE_CLIENT=async runs requests on an asyncio client behind a blocking facade.
+        # BYBIT_BASE_URL can point the bot at another endpoint, e.g. a local exchange_simulator.py.
+        self.exchange_client = os.getenv("EXCHANGE_CLIENT", "sync")
+        self.base_url = os.getenv("BYBIT_BASE_URL", "https://api-demo.bybit.com")
+        if self.exchange_client == "async":
+            from async_bybit_session import AsyncBybitSession, SyncBybitSession
+            self.data_fetcher = SyncBybitSession(AsyncBybitSession(
+                self.api_key, self.api_secret, base_url=self.base_url, pool_maxsize=max(10, 4 * self.scan_workers),
+                metrics=self.metrics
+            ))
+        elif self.exchange_client == "sync":
+            self.data_fetcher = BybitDemoSession(self.api_key, self.api_secret, base_url=self.base_url,
+                                                 pool_maxsize=max(10, 4 * self.scan_workers), metrics=self.metrics)
+        else:
+            raise ValueError("Exchange client must be either 'sync' or 'async'")
+
+        # One account snapshot per symbol: positions, open orders and ticker fetched concurrently once per tick
+        self.io_executor = ThreadPoolExecutor(max_workers=3 * self.scan_workers, thread_name_prefix="io")
+        self.snapshot_ttl = float(os.getenv("SNAPSHOT_TTL", 1.0))
+        self.snapshots = {
+            symbol: AccountSnapshot(self.data_fetcher, symbol, ttl=self.snapshot_ttl, executor=self.io_executor,
+                                    clock=clock)
+            for symbol in self.symbols
+        }
+
+        # Orders resting longer than STALE_ORDER_SECONDS are cancelled in batches across all symbols
+        self.order_sweeper = StaleOrderSweeper(self.data_fetcher, max_age=float(os.getenv("STALE_ORDER_SECONDS", 180)),
+                                               metrics=self.metrics, clock=clock)
+        self.settle_coin = os.getenv("SETTLE_COIN", "USDT")
 
         self.strategy = Strategies()
         self.indicators = Indicators()
+        # Closed-bar indicator state per symbol and higher timeframe; ticks within one higher-timeframe bar only
+        # recompute its forming bar. The base interval is evaluated once per closed bar, so it would never hit.
+        self.indicator_cache = IndicatorCache(self.strategy, max_entries=int(os.getenv("INDICATOR_CACHE_SIZE", 256)),
+                                              metrics=self.metrics)
         self.risk_management = RiskManagement(
             atr_multiplier=float(os.getenv("ATR_MULTIPLIER", 1.0)),
             risk_ratio=float(os.getenv("RISK_RATIO", 1.0))
         )
-        self.symbol = os.getenv("TRADING_SYMBOL", 'BTCUSDT')
         self.quantity = float(os.getenv("TRADE_QUANTITY", 0.03))
 
         # Load trading parameters
         self.interval = os.getenv("TRADING_INTERVAL", '1')
+        if self.interval not in BAR_INTERVALS:
+            raise ValueError(f"Trading interval must be one of {', '.join(BAR_INTERVALS)} (got {self.interval!r})")
+        self.bar_seconds = interval_to_ms(self.interval) / 1000
         self.limit = int(os.getenv("TRADING_LIMIT", 100))
         self.leverage = int(os.getenv("LEVERAGE", 10))
+        # Orders go out from pre-built templates with leverage already set; an idle connection is kept open
+        self.order_submitter = FastOrderSubmitter(self.data_fetcher, self.quantity, self.leverage, metrics=self.metrics,
+                                                  warm_seconds=float(os.getenv("KEEP_WARM_SECONDS", 15)))
+
+        # Candles are kept between ticks; each tick only fetches the forming bar and newer.
+        # With KLINE_STORE_DIR set, the first tick starts from the local store instead of a full download.
+        kline_store_dir = os.getenv("KLINE_STORE_DIR")
+        self.kline_store = KlineStore(kline_store_dir) if kline_store_dir else None
+        # HIGHER_TIMEFRAMES=15,60 builds those bars from the base interval and requires their EMA trend to
+        # agree with a signal. The first tick loads HIGHER_TIMEFRAME_BARS of history for them once.
+        higher_timeframes = [tf.strip() for tf in os.getenv("HIGHER_TIMEFRAMES", "").split(",") if tf.strip()]
+        self.timeframes = None
+        self.timeframe_seed_bars = 0
+        if higher_timeframes:
+            higher_timeframe_bars = int(os.getenv("HIGHER_TIMEFRAME_BARS", 100))
+            self.timeframes = TimeframeAggregator(self.interval, higher_timeframes, max_bars=higher_timeframe_bars)
+            self.timeframe_seed_bars = higher_timeframe_bars * max(self.timeframes.bars_per(tf) for tf in higher_timeframes)
+        self.kline_cache = KlineCache(self.data_fetcher,
+                                      max_bars=max(max(self.limit, self.timeframe_seed_bars) + 1,
+                                                   int(os.getenv("KLINE_CACHE_BARS", 1000))),
+                                      store=self.kline_store, clock=clock)
+
+        # Market data feed: 'rest' polls every 10 seconds, 'ws' evaluates on bar close,
+        # 'shared' reads what supervisor.py's market-data process publishes to SHARED_MARKET_DATA
+        self.feed = feed or os.getenv("MARKET_DATA_FEED", "rest")
+        if self.feed not in ("rest", "ws", "shared"):
+            raise ValueError("Market data feed must be 'rest', 'ws' or 'shared'")
+        self.shared_market_data = None
+        self.shared_wait = float(os.getenv("SHARED_MARKET_DATA_WAIT", 2.0))
+        if self.feed == "shared":
+            from shared_market_data import SharedMarketData
+            self.shared_market_data = SharedMarketData.attach(os.getenv("SHARED_MARKET_DATA", ""))
+            if self.shared_market_data.interval_ms != interval_to_ms(self.interval):
+                raise ValueError(f"Shared market data is not published for interval {self.interval}")
+            missing = [symbol for symbol in self.symbols if symbol not in self.shared_market_data.symbols]
+            if missing:
+                raise ValueError(f"Shared market data has no candles for {', '.join(missing)}")
+        self.market_data = {}
+        self.closed_bars = queue.Queue()
+        # With the ws feed, ORDER_BOOK_DEPTH (1, 50, 200 or 500) keeps a local order book per symbol and entry
+        # limits are priced from it: ORDER_BOOK_PRICING=join rests at the best bid/ask on the order's side,
+        # 'cross' takes the other side. A book not updated for ORDER_BOOK_MAX_AGE seconds is not used.
+        # ORDER_BOOK_RECORD_DIR appends the raw book messages per symbol, for replaying through order_book.py.
+        order_book_depth = int(os.getenv("ORDER_BOOK_DEPTH", 0))
+        self.order_book_pricing = os.getenv("ORDER_BOOK_PRICING", "join")
+        if self.order_book_pricing not in ("join", "cross"):
+            raise ValueError("Order book pricing must be 'join' or 'cross'")
+        self.order_book_max_age = float(os.getenv("ORDER_BOOK_MAX_AGE", 5))
+        # The ws ticker price is used instead of a ticker request while it is at most STREAM_PRICE_MAX_AGE old
+        self.stream_price_max_age = float(os.getenv("STREAM_PRICE_MAX_AGE", 2))
+        order_book_record_dir = os.getenv("ORDER_BOOK_RECORD_DIR")
+        if order_book_record_dir:
+            os.makedirs(order_book_record_dir, exist_ok=True)
+        if self.feed == "ws":
+            # websocket-client is only imported when the stream is actually used
+            from market_data_ws import MarketDataStream
+            for symbol in self.symbols:
+                # The stream backfills the window plus the forming bar, like a REST tick reads it
+                self.market_data[symbol] = MarketDataStream(
+                    self.kline_cache, symbol, self.interval, self.limit + 1,
+                    url=os.getenv("BYBIT_WS_URL", "wss://stream.bybit.com/v5/public/linear"),
+                    closed_bars=self.closed_bars, order_book_depth=order_book_depth,
+                    record_path=os.path.join(order_book_record_dir, f"orderbook_{symbol}.jsonl")
+                    if order_book_record_dir else None
+                )
+
+        # TRAFFIC_RECORD_FILE appends every exchange request and response (gzip JSON lines) together with the start
+        # of each strategy/housekeeping task, for replaying the session offline with traffic_log.py. Only the sync
+        # client goes through HttpTransport, and a recorded session always starts cold (no warm-start restore).
+        self.traffic_recorder = None
+        traffic_record_file = os.getenv("TRAFFIC_RECORD_FILE")
+        if traffic_record_file:
+            if self.exchange_client != "sync":
+                raise ValueError("Traffic recording needs EXCHANGE_CLIENT=sync")
+            from traffic_log import RecordingTransport, TrafficRecorder
+            self.traffic_recorder = TrafficRecorder(traffic_record_file)
+            self.data_fetcher.transport = RecordingTransport(self.data_fetcher.transport, self.traffic_recorder)
+
+        # Candle buffers, higher-timeframe bars, indicator state, leverage and the clock offset are saved every
+        # WARM_START_SAVE_SECONDS and on shutdown, and restored (after checking them against the exchange) on launch.
+        # WARM_START_FILE= (empty) turns this off.
+        warm_start_file = os.getenv("WARM_START_FILE", "data/warm_start.pkl")
+        self.warm_start = WarmStartStore(warm_start_file, max_age=float(os.getenv("WARM_START_MAX_AGE", 3600))) if warm_start_file else None
+        self.warm_start_period = float(os.getenv("WARM_START_SAVE_SECONDS", 60))
+        self.last_warm_start_save = time.monotonic()
+        self.scheduler = None
+        self.first_tick_done = False
 
         # Load strategy switches
         self.enable_ema_rsi_strategy = os.getenv("ENABLE_EMA_RSI_STRATEGY", "True").lower() == "true"
 
-        # Set up logging
-        logging.basicConfig(filename='trading_bot.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        # Set up logging: JSON-lines events written by a background thread, rotated by size
+        self.log_pipeline = setup_logging(
+            path=os.getenv("LOG_FILE", "trading_bot.log"),
+            level=os.getenv("LOG_LEVEL", "INFO"),
+            console_level=os.getenv("CONSOLE_LOG_LEVEL", "INFO"),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backup_count=int(os.getenv("LOG_BACKUPS", 5))
+        )
         
     def job(self):
-        last_closed_position = self.data_fetcher.get_last_closed_position(self.symbol)
+        if self.traffic_recorder:
+            self.traffic_recorder.mark("task", task="job")
+        if self.executor is None:
+            self.job_symbol(self.symbol)
+        else:
+            self.scan(self.symbols)
+        if not self.first_tick_done:
+            self.first_tick_done = True
+            events.info("first_tick", ms_since_start=(time.perf_counter() - STARTED) * 1000)
+
+    def scan(self, symbols):
+        requests_before = self.data_fetcher.get_transport_stats()['requests']
+        start = time.perf_counter()
+        futures = {symbol: self.executor.submit(self._timed_job, symbol) for symbol in symbols}
+
+        latencies = {}
+        for symbol, future in futures.items():
+            try:
+                latencies[symbol] = future.result()
+            except Exception as e:
+                events.error("error", where="scan", symbol=symbol, error=repr(e))
+
+        elapsed = time.perf_counter() - start
+        requests_used = self.data_fetcher.get_transport_stats()['requests'] - requests_before
+        events.info("scan", symbols=len(symbols), completed=len(latencies), ms=elapsed * 1000,
+                    requests=requests_used, request_budget=self.request_budget,
+                    latency_ms={symbol: round(latency * 1000, 1) for symbol, latency in sorted(latencies.items())})
+
+        if elapsed > self.bar_seconds:
+            events.warning("scan_overrun", seconds=elapsed, bar_seconds=self.bar_seconds)
+        if requests_used > self.request_budget:
+            events.warning("request_budget_exceeded", requests=requests_used, request_budget=self.request_budget)
+
+    def _timed_job(self, symbol):
+        start = time.perf_counter()
+        self.job_symbol(symbol)
+        return time.perf_counter() - start
+
+    def job_symbol(self, symbol):
+        with self.symbol_locks[symbol]:
+            self._job_symbol(symbol)
+
+    def housekeeping(self, symbols=None):
+        # One open-orders request for every symbol and one cancel-batch per 20 stale orders,
+        # however many symbols are traded. Symbols with a running strategy tick are left to that tick.
+        locked = [symbol for symbol in symbols or self.symbols if self.symbol_locks[symbol].acquire(blocking=False)]
+        if not locked:
+            return
+        if self.traffic_recorder:
+            self.traffic_recorder.mark("task", task="housekeeping", symbols=locked)
+        try:
+            orders = self.data_fetcher.fetch_all_open_orders(self.settle_coin)
+            ours = set(locked)
+            cancelled = self.order_sweeper.sweep([order for order in orders if order['symbol'] in ours])
+            for symbol in {order['symbol'] for order in cancelled}:
+                self.snapshots[symbol].invalidate()
+        except Exception as e:
+            events.error("error", where="housekeeping", error=repr(e))
+        finally:
+            for symbol in locked:
+                self.symbol_locks[symbol].release()
+        self.order_submitter.keep_warm()
+
+    def report_metrics(self):
+        summary = self.metrics.summary_line()
+        if summary:
+            events.info("metrics", summary=summary)
+        limits = self.data_fetcher.get_rate_limit_stats()
+        events.info("rate_limits", **{key: value for key, value in limits.items() if key != "limits"})
+        events.info("indicator_cache", **self.indicator_cache.get_stats())
+        if self.metrics_file:
+            self.metrics.write_file(self.metrics_file)
+        self.last_metrics_report = time.monotonic()
+
+    def _job_symbol(self, symbol):
+        tick_start = time.perf_counter()
+        with self.metrics.timer("tick_seconds"):
+            outcome = self._evaluate_symbol(symbol, tick_start)
+        events.info("tick", symbol=symbol, outcome=outcome, ms=(time.perf_counter() - tick_start) * 1000)
+
+    def _evaluate_symbol(self, symbol, tick_start):
+        # Returns the tick outcome recorded in the "tick" event
+        snapshot = self.snapshots[symbol]
+        market_data = self.market_data.get(symbol)
+
+        with self.metrics.timer("stage_seconds", stage="fetch"):
+            # Account state is fetched in the background while candles are read below; with a live ws ticker
+            # only positions and orders are requested
+            snapshot.start_refresh(price=market_data.fresh_price(self.stream_price_max_age) if market_data else None)
+            if self.shared_market_data:
+                get_historical_data = self._read_shared(symbol)
+            else:
+                # One extra row for the forming bar, which is dropped below
+                if market_data:
+                    rows = market_data.get_historical_data(self.limit + 1)
+                else:
+                    rows = self.kline_cache.get_historical_data(symbol, self.interval, self.limit + 1)
+                get_historical_data = self._closed_rows(rows, self.limit, market_data)
+            snapshot_ok = snapshot.refresh()
+
+        if not snapshot_ok:
+            events.error("error", where="account_snapshot", symbol=symbol)
+            return "no_account_state"
+
+        last_closed_position = snapshot.get_last_closed_position()
         if last_closed_position:
             last_closed_time = int(last_closed_position['updatedTime']) / 1000
-            current_time = time.time()
+            current_time = self.clock.time()
             time_since_last_close = current_time - last_closed_time
-            print(f"Time since last closed position: {int(time_since_last_close)} seconds")
             if time_since_last_close < 120:
-                print("The last closed position was less than 3 minutes ago. A new order will not be placed.")
-                return
+                events.info("skip", symbol=symbol, reason="recently_closed", seconds_since_close=int(time_since_last_close))
+                return "cooldown"
 
-        get_historical_data = self.data_fetcher.get_historical_data(self.symbol, self.interval, self.limit)
         if get_historical_data is None:
-            print("Failed to retrieve historical data.")
-            return
+            events.error("error", where="historical_data", symbol=symbol)
+            return "no_candles"
 
-        df = self.strategy.prepare_dataframe(get_historical_data)
-
-        # Calculate indicators
-        df['EMA_9'] = self.indicators.calculate_ema(df, 9)
-        df['EMA_21'] = self.indicators.calculate_ema(df, 21)
-        df['RSI'] = self.indicators.calculate_rsi(df, 14)
-        df['MACD'], df['MACD_signal'] = self.indicators.calculate_macd(df)
-        df['Stochastic'], df['Stochastic_signal'] = self.indicators.calculate_stochastic(df)
-        df['Bollinger_upper'], df['Bollinger_middle'], df['Bollinger_lower'] = self.indicators.calculate_bollinger_bands(df)
-
-        # Get the latest indicator values
-        ema_9 = df['EMA_9'].iloc[-1]
-        ema_21 = df['EMA_21'].iloc[-1]
-        rsi = df['RSI'].iloc[-1]
-        macd = df['MACD'].iloc[-1]
-        macd_signal = df['MACD_signal'].iloc[-1]
-        stochastic = df['Stochastic'].iloc[-1]
-        stochastic_signal = df['Stochastic_signal'].iloc[-1]
-        bollinger_upper = df['Bollinger_upper'].iloc[-1]
-        bollinger_middle = df['Bollinger_middle'].iloc[-1]
-        bollinger_lower = df['Bollinger_lower'].iloc[-1]
-
-        # Print the indicator values
-        print(f"EMA 9: {ema_9:.2f}")
-        print(f"EMA 21: {ema_21:.2f}")
-        print(f"RSI: {rsi:.2f}")
-        print(f"MACD: {macd:.2f}")
-        print(f"MACD Signal: {macd_signal:.2f}")
-        print(f"Stochastic: {stochastic:.2f}")
-        print(f"Stochastic Signal: {stochastic_signal:.2f}")
-        print(f"Bollinger Upper: {bollinger_upper:.2f}")
-        print(f"Bollinger Middle: {bollinger_middle:.2f}")
-        print(f"Bollinger Lower: {bollinger_lower:.2f}")
-
-        open_positions = self.data_fetcher.get_open_positions(self.symbol)
+        with self.metrics.timer("stage_seconds", stage="prepare_dataframe"):
+            df = self.strategy.prepare_candles(get_historical_data)
+
+        # Calculate indicators, unless the shared feed already carries them for this window
+        if 'EMA_9' not in df:
+            with self.metrics.timer("stage_seconds", stage="indicators"):
+                self.strategy.calculate_indicators(df)
+
+        # Latest indicator values
+        if events.enabled(logging.INFO):
+            events.info(
+                "indicators", symbol=symbol,
+                ema_9=df['EMA_9'].iloc[-1], ema_21=df['EMA_21'].iloc[-1], rsi=df['RSI'].iloc[-1],
+                macd=df['MACD'].iloc[-1], macd_signal=df['MACD_signal'].iloc[-1],
+                stochastic=df['Stochastic'].iloc[-1], stochastic_signal=df['Stochastic_signal'].iloc[-1],
+                bollinger_upper=df['Bollinger_upper'].iloc[-1], bollinger_middle=df['Bollinger_middle'].iloc[-1],
+                bollinger_lower=df['Bollinger_lower'].iloc[-1]
+            )
+
+        open_positions = snapshot.get_open_positions()
         if open_positions:
-            print("There is already an open position. A new order will not be placed.")
-            return
+            events.info("skip", symbol=symbol, reason="open_position")
+            return "open_position"
 
-        open_orders = self.data_fetcher.get_open_orders(self.symbol)
+        open_orders = snapshot.get_open_orders()
         if open_orders:
-            print("There is an open limit order. A new order will not be placed.")
-            return
+            # Also covers the ws feed, where no housekeeping task runs
+            if self.order_sweeper.sweep(open_orders):
+                snapshot.invalidate()
+            events.info("skip", symbol=symbol, reason="open_order")
+            return "open_order"
 
-        current_price = self.data_fetcher.get_real_time_price(self.symbol)
+        current_price = snapshot.get_real_time_price()
         if current_price is None:
-            print("Failed to retrieve real-time price.")
-            return
+            events.error("error", where="real_time_price", symbol=symbol)
+            return "no_price"
 
-        print(f"Current Price: {current_price:.2f}")
+        trend_filters = self._higher_timeframe_trends(symbol, df)
+        trend = self.strategy.combine_indicators_strategy(df, trend_filters)
+        signal_time = time.perf_counter()
+        if not trend:
+            events.info("signal", symbol=symbol, trend=None, price=current_price)
+            return "no_signal"
 
-        trend = self.strategy.combine_indicators_strategy(df)
-        if trend:
+        with self.metrics.timer("stage_seconds", stage="risk"):
             stop_loss, take_profit = self.risk_management.calculate_dynamic_risk_management(df, current_price, trend)
-            print(f"Trend: {trend.upper()}")
-            print(f"Stop Loss: {stop_loss:.2f}")
-            print(f"Take Profit: {take_profit:.2f}")
-
-            side = 'Buy' if trend == 'long' else 'Sell'
-            print(f"Order side: {side}")
-
-            order_result = self.data_fetcher.place_order(
-                symbol=self.symbol,
-                side=side,
-                qty=self.quantity,
-                current_price=current_price,
-                leverage=self.leverage,
-                stop_loss=stop_loss,
-                take_profit=take_profit
-            )
+        side = 'Buy' if trend == 'long' else 'Sell'
+        events.info("signal", symbol=symbol, trend=trend, side=side, price=current_price,
+                    stop_loss=stop_loss, take_profit=take_profit)
 
-            if order_result:
-                print(f"Order successfully placed: {order_result}")
-            else:
-                print("Failed to place order.")
+        limit_price = self._book_price(market_data, side)
+
+        with self.metrics.timer("stage_seconds", stage="order"):
+            order_result = self.order_submitter.submit(symbol, side, current_price, stop_loss, take_profit, limit_price)
+        signal_to_ack = time.perf_counter() - signal_time
+        snapshot.invalidate()
+        if not order_result:
+            events.error("order", symbol=symbol, side=side, status="failed")
+            return "order_failed"
+
+        tick_to_order = time.perf_counter() - tick_start
+        self.metrics.observe("tick_to_order_seconds", tick_to_order)
+        self.metrics.observe("signal_to_ack_seconds", signal_to_ack)
+        events.info("order", symbol=symbol, side=side, status="placed", order_id=order_result.get('orderId'),
+                    qty=self.quantity, tick_to_order_ms=tick_to_order * 1000, signal_to_ack_ms=signal_to_ack * 1000)
+        return "order_placed"
+
+    def _book_price(self, market_data, side):
+        # Entry limit from the local order book, or None to fall back to the offset from the last price
+        book = market_data.order_book if market_data else None
+        if book is None:
+            return None
+        if not book.is_ready(self.order_book_max_age):
+            events.warning("order_book_unavailable", symbol=book.symbol, synced=book.synced)
+            return None
+        price = book.entry_price(side, self.order_book_pricing)
+        events.info("order_book", symbol=book.symbol, side=side, price=price, spread=book.spread(),
+                    pricing=self.order_book_pricing)
+        return price
+
+    def _now_ms(self):
+        # Exchange time once the scheduler has synced its clock
+        return self.scheduler.now_ms() if self.scheduler else self.clock.time() * 1000
+
+    def _closed_rows(self, rows, limit, market_data=None):
+        # Newest `limit` closed bars, without the forming one. With the ws feed that is everything up to the bar
+        # the stream last confirmed, whatever the local clock says; otherwise the exchange time decides.
+        if rows is None:
+            return None
+        if market_data is not None:
+            rows = market_data.closed_rows(rows)
         else:
-            print("No suitable signals for position opening.")
+            rows = closed_rows(rows, interval_to_ms(self.interval), self._now_ms())
+        return rows[:limit] if rows else None
+
+    def _read_shared(self, symbol):
+        # The market-data process publishes closed bars shortly after each bar close; wait until the bar that
+        # just closed is there
+        bar_ms = interval_to_ms(self.interval)
+        origin = WEEK_ORIGIN_MS if self.interval == 'W' else 0
+        now_ms = self._now_ms()
+        closed_start = int(now_ms - (now_ms - origin) % bar_ms) - bar_ms
+        if not self.shared_market_data.wait_for(symbol, closed_start, timeout=self.shared_wait):
+            events.warning("stale_market_data", symbol=symbol, newest=self.shared_market_data.newest_timestamp(symbol),
+                           expected=closed_start)
+        return self.shared_market_data.read(symbol, self.limit)
+
+    def _higher_timeframe_trends(self, symbol, df):
+        # Higher-timeframe bars come from candles already in the kline cache; no extra requests per tick
+        if self.timeframes is None:
+            return None
+        market_data = self.market_data.get(symbol)
+        with self.metrics.timer("stage_seconds", stage="timeframes"):
+            if self.timeframes.has(symbol):
+                needed = self.timeframes.bars_needed(symbol, int(df['timestamp'].iloc[-1]))
+                if needed <= self.limit:
+                    base = None
+                elif self.shared_market_data:
+                    base = self.shared_market_data.read(symbol, needed, indicators=False)
+                else:
+                    base = self._closed_rows(self.kline_cache.get_cached(symbol, self.interval, needed + 1), needed,
+                                             market_data)
+            elif self.shared_market_data:
+                base = self.shared_market_data.read(symbol, self.timeframe_seed_bars, indicators=False)
+            else:
+                base = self._closed_rows(self.kline_cache.get_historical_data(
+                    symbol, self.interval, self.timeframe_seed_bars + 1), self.timeframe_seed_bars, market_data)
+            self.timeframes.update(symbol, self.strategy.prepare_candles(base) if base else df)
+            trends = {}
+            for tf in self.timeframes.timeframes:
+                bars = self.timeframes.get(symbol, tf)
+                if len(bars) >= self.strategy.ema_slow:
+                    self.indicator_cache.calculate_indicators(bars, symbol, tf)
+                trends[tf] = self.strategy.trend_direction(bars)
+        events.info("timeframes", symbol=symbol, trends=trends)
+        return trends
 
     def run(self):
-        self.job()
-        schedule.every(10).seconds.do(self.job)
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        if self.metrics_port:
+            self.metrics.start_http_server(self.metrics_port)
+            events.info("startup", metrics_url=f":{self.metrics_port}/metrics")
+        if self.traffic_recorder:
+            self.traffic_recorder.mark("start", symbols=self.symbols, interval=self.interval, feed=self.feed)
+        self.scheduler = BarScheduler(server_time_fn=self.data_fetcher.get_server_time, clock=self.clock)
+        if not self.traffic_recorder:
+            self.restore_warm_start()
+        self.order_submitter.prepare(self.symbols)
+
+        try:
+            if self.feed == "ws":
+                self.run_ws()
+                return
+
+            scheduler = self.scheduler
+            tick = scheduler.add_bar_task("strategy", self.job, self.interval, delay_seconds=self.bar_close_delay)
+            scheduler.add_periodic_task("housekeeping", self.housekeeping, self.housekeeping_period)
+            scheduler.add_periodic_task("metrics", self.report_metrics, self.metrics_summary_period)
+            if self.warm_start:
+                scheduler.add_periodic_task("warm_start", self.save_warm_start, self.warm_start_period)
+            events.info("startup", feed=self.feed, symbols=self.symbols, bar_seconds=tick.period_ms / 1000,
+                        bar_close_delay=self.bar_close_delay, housekeeping_seconds=self.housekeeping_period,
+                        ms_since_start=(time.perf_counter() - STARTED) * 1000)
+            scheduler.run()
+        finally:
+            self.save_warm_start()
+            if self.traffic_recorder:
+                self.traffic_recorder.close()
+
+    def save_warm_start(self):
+        if self.warm_start is None:
+            return
+        # deque.copy() and dict() are atomic, so no tick has to be paused for the snapshot
+        state = {
+            "interval": self.interval,
+            "klines": {},
+            "timeframes": {},
+            "indicators": self.indicator_cache.export(),
+            "leverage": dict(self.data_fetcher.leverage_cache),
+            "clock_offset_ms": self.scheduler.offset_ms if self.scheduler and self.scheduler.last_sync else None,
+        }
+        for symbol in self.symbols:
+            buffer = self.kline_cache.buffers.get((symbol, self.interval))
+            if buffer:
+                state["klines"][symbol] = buffer.copy()
+        if not state["klines"]:
+            # Nothing loaded yet (e.g. the save that runs at startup); keep the previous snapshot
+            return
+        if self.timeframes is not None:
+            bars = dict(self.timeframes.bars)
+            for (symbol, timeframe), arrays in bars.items():
+                state["timeframes"].setdefault(symbol, {})[timeframe] = arrays
+        try:
+            self.warm_start.save(state)
+        except Exception as e:
+            events.error("error", where="warm_start_save", error=repr(e))
+        self.last_warm_start_save = time.monotonic()
+
+    def restore_warm_start(self):
+        state = self.warm_start.load() if self.warm_start else None
+        if not state or state.get("interval") != self.interval:
+            return
+        symbols = [symbol for symbol in self.symbols if symbol in state["klines"]]
+        for symbol in symbols:
+            self.kline_cache.restore(symbol, self.interval, state["klines"][symbol])
+        # One kline request per symbol, all at once; a buffer the exchange disagrees with is dropped
+        # together with everything derived from it
+        checks = {symbol: self.io_executor.submit(self.kline_cache.verify, symbol, self.interval) for symbol in symbols}
+        verified = set()
+        for symbol, check in checks.items():
+            try:
+                if check.result():
+                    verified.add(symbol)
+            except Exception as e:
+                self.kline_cache.invalidate(symbol, self.interval)
+                events.warning("warm_start", status="verify_failed", symbol=symbol, error=repr(e))
+        if self.timeframes is not None:
+            for symbol in verified:
+                self.timeframes.restore(symbol, state["timeframes"].get(symbol, {}))
+        self.indicator_cache.restore([(key, entry) for key, entry in state["indicators"] if key[0] in verified])
+        # Only a hint for skipping set-leverage; every position fetch overwrites it before an order is placed
+        self.data_fetcher.leverage_cache.update(
+            {symbol: leverage for symbol, leverage in state["leverage"].items() if symbol in self.symbols})
+        if state["clock_offset_ms"] is not None:
+            self.scheduler.restore_offset(state["clock_offset_ms"])
+        events.info("warm_start", status="restored", symbols=sorted(verified),
+                    rejected=sorted(set(symbols) - verified), age_seconds=int(time.time() - state["saved_at"]))
+
+    def run_ws(self):
+        for stream in self.market_data.values():
+            stream.start()
+        try:
+            while True:
+                try:
+                    closed = [self.closed_bars.get(timeout=1)]
+                except queue.Empty:
+                    self.order_submitter.keep_warm()
+                    continue
+                # Collapse bars that closed while the previous evaluation was running
+                while not self.closed_bars.empty():
+                    closed.append(self.closed_bars.get_nowait())
+                symbols = [symbol for symbol in self.symbols if any(s == symbol for s, _ in closed)]
+                events.info("bar_closed", symbols=symbols)
+                if self.executor is None:
+                    self.job_symbol(symbols[0])
+                else:
+                    self.scan(symbols)
+                if time.monotonic() - self.last_metrics_report >= self.metrics_summary_period:
+                    self.report_metrics()
+                if self.warm_start and time.monotonic() - self.last_warm_start_save >= self.warm_start_period:
+                    self.save_warm_start()
+        finally:
+            for stream in self.market_data.values():
+                stream.stop()
+
+def _exit_on_sigterm(signum, frame):
+    # Only the first one; a repeated SIGTERM must not interrupt the shutdown it started
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
 
 if __name__ == "__main__":
-    bot = TradingBot()
+    parser = argparse.ArgumentParser(description="EMA/RSI scalping bot")
+    parser.add_argument("--feed", choices=["rest", "ws", "shared"], default=None,
+                        help="market data source (default: MARKET_DATA_FEED or 'rest')")
+    args = parser.parse_args()
+
+    # SIGTERM (service stop) unwinds like Ctrl+C, so run() still saves the warm-start snapshot
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    bot = TradingBot(feed=args.feed)
     bot.run()
@@ -0,0 +1,341 @@
+# traffic_log.py
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+import requests
+from requests.structures import CaseInsensitiveDict
+from rate_limiter import RateLimiter
+
+# Request fields that change on every call (or are secret) and are neither recorded nor matched on
+VOLATILE = ("api_key", "timestamp", "sign")
+
+
+def _request_params(params=None, json_body=None, data=None):
+    if data is not None:
+        params = json.loads(data)
+    elif json_body is not None:
+        params = json_body
+    return {key: value for key, value in (params or {}).items() if key not in VOLATILE}
+
+
+def _match_key(method, endpoint, params):
+    return method, endpoint, json.dumps(params, sort_keys=True, default=str)
+
+
+class TrafficRecorder:
+    # Append-only, gzip-compressed JSON lines. Every open appends a new gzip member, so one file can hold
+    # several sessions; the stream is flushed at most every flush_seconds, and a tail cut off by a crash is
+    # skipped when reading. Records: "request" (one HttpTransport.request call, i.e. one attempt, with its
+    # response or error), "task" (a scheduled job/housekeeping run starting) and "start".
+    def __init__(self, path, flush_seconds=1.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.file = gzip.open(path, "at", compresslevel=6)
+        self.records = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            if self.file is None:
+                return
+            self.file.write(line + "\n")
+            self.records += 1
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_seconds:
+                self.file.flush()
+                self._last_flush = now
+
+    def mark(self, kind, **fields):
+        self.write({"kind": kind, "t": time.time(), "m": time.monotonic(), **fields})
+
+    def close(self):
+        with self._lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordingTransport:
+    # Wraps an HttpTransport; everything else (stats, close) goes to the wrapped transport
+    # Rate-limit headers are all the session reads besides the body
+    HEADER_PREFIX = "x-bapi-"
+
+    def __init__(self, transport, recorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+    def request(self, method, endpoint, params=None, json=None, data=None, headers=None):
+        record = {"kind": "request", "t": time.time(), "m": time.monotonic(), "method": method, "endpoint": endpoint,
+                  "params": _request_params(params, json, data)}
+        start = time.perf_counter()
+        try:
+            response = self.transport.request(method, endpoint, params=params, json=json, data=data, headers=headers)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record.update(ms=(time.perf_counter() - start) * 1000, error=type(e).__name__, message=str(e))
+            self.recorder.write(record)
+            raise
+        record.update(ms=(time.perf_counter() - start) * 1000, status=response.status_code,
+                      headers={key: value for key, value in response.headers.items()
+                               if key.lower().startswith(self.HEADER_PREFIX)},
+                      body=response.text)
+        self.recorder.write(record)
+        return response
+
+
+class ReplayResponse:
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class NotRecorded(requests.RequestException):
+    # Not a ConnectionError, so the session does not retry it: one miss per request the bot made
+    pass
+
+
+class ReplayTransport:
+    # Serves recorded responses instead of sending anything. Requests are matched on method, endpoint and
+    # parameters (without timestamp and signature); identical requests get their responses in recorded order.
+    # A request that was never recorded fails with NotRecorded and is counted in `misses`, which is where a
+    # replay shows that the bot behaved differently from the recorded session.
+    def __init__(self, records, clock=None, max_retries=3):
+        self.clock = clock
+        self.max_retries = max_retries
+        self.responses = defaultdict(deque)
+        for record in records:
+            if record.get("kind") == "request":
+                self.responses[_match_key(record["method"], record["endpoint"], record["params"])].append(record)
+        self.requests_sent = 0
+        self.retries = 0
+        self.misses = []
+        self._lock = threading.Lock()
+
+    def attempts(self, method):
+        return self.max_retries + 1 if method == "GET" else 1
+
+    def backoff(self, attempt):
+        # Recorded failures are replayed, the wait between the attempts is not
+        self.retries += 1
+
+    def request(self, method, endpoint, params=None, json=None, data=None, headers=None):
+        key = _match_key(method, endpoint, _request_params(params, json, data))
+        with self._lock:
+            self.requests_sent += 1
+            queue = self.responses.get(key)
+            record = queue.popleft() if queue else None
+            if record is None:
+                self.misses.append(key)
+        if record is None:
+            raise NotRecorded(f"No recorded response for {method} {endpoint} {key[2]}")
+        if self.clock:
+            self.clock.advance(record)
+        if "error" in record:
+            raise getattr(requests, record["error"], requests.ConnectionError)(record.get("message", ""))
+        return ReplayResponse(record["status"], record["headers"], record["body"])
+
+    def unused(self):
+        with self._lock:
+            return sum(len(queue) for queue in self.responses.values())
+
+    def get_stats(self):
+        return {
+            "requests": self.requests_sent,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "retries": self.retries,
+            "errors": len(self.misses),
+            "avg_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    def close(self):
+        pass
+
+
+class ReplayRateLimiter(RateLimiter):
+    # Grants everything at once: the recorded responses already carry whatever throttling happened
+    def acquire(self, endpoint):
+        with self._cond:
+            self.granted[self.lane(endpoint)] += 1
+        return 0.0
+
+
+def read_records(path):
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Last line of a session that was killed mid-write
+                    continue
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+class ReplayClock:
+    # time.time() and time.monotonic() pinned to the recorded start of the task being replayed, then moved on to
+    # when the served responses arrived, so cooldowns, order ages and snapshot freshness are judged as they were
+    # in the recorded session. Symbols are evaluated concurrently, so each symbol has its own clock, read by the
+    # thread evaluating it; that keeps a replay independent of thread scheduling. Only calls made through the
+    # time module are affected; threading and queue keep their own reference to the real clock.
+    def __init__(self):
+        self.base = None
+        # symbol -> (wall, monotonic); thread id -> symbol it evaluates
+        self.symbols = {}
+        self.threads = {}
+        self._time = time.time
+        self._monotonic = time.monotonic
+        self._lock = threading.Lock()
+
+    def set(self, record):
+        with self._lock:
+            self.base = (record["t"], record["m"])
+            self.symbols = {}
+
+    def bind(self, symbol):
+        with self._lock:
+            self.threads[threading.get_ident()] = symbol
+
+    def advance(self, record):
+        # To the end of the response, never backwards
+        done = record["ms"] / 1000
+        end = (record["t"] + done, record["m"] + done)
+        symbol = record["params"].get("symbol")
+        with self._lock:
+            if symbol is None:
+                self.base = max(self.base, end)
+                return
+            self.symbols[symbol] = max(self.symbols.get(symbol, self.base), end)
+
+    def _now(self):
+        with self._lock:
+            return self.symbols.get(self.threads.get(threading.get_ident()), self.base)
+
+    def time(self):
+        return self._time() if self.base is None else self._now()[0]
+
+    def monotonic(self):
+        return self._monotonic() if self.base is None else self._now()[1]
+
+    def install(self):
+        time.time = self.time
+        time.monotonic = self.monotonic
+
+    def uninstall(self):
+        time.time = self._time
+        time.monotonic = self._monotonic
+
+
+def read_sessions(path):
+    # Records grouped by session: each "start" begins a new one, anything before the first is dropped
+    sessions = []
+    for record in read_records(path):
+        if record.get("kind") == "start":
+            sessions.append([])
+        if sessions:
+            sessions[-1].append(record)
+    return sessions
+
+
+def replay(path, session=0, profile_path=None):
+    # Runs a TradingBot through the tasks of one recorded session, at full speed and without network.
+    # Strategy settings come from the environment as usual (so they can be varied); symbols and interval
+    # come from the recording.
+    sessions = read_sessions(path)
+    if not sessions:
+        raise ValueError(f"{path} has no recorded session start")
+    records = sessions[session]
+    start = records[0]
+    if start.get("feed") != "rest":
+        raise ValueError("Only sessions recorded with the 'rest' feed can be replayed")
+    os.environ.update(TRADING_SYMBOLS=",".join(start["symbols"]), TRADING_INTERVAL=str(start["interval"]),
+                      MARKET_DATA_FEED="rest", EXCHANGE_CLIENT="sync", WARM_START_FILE="", METRICS_PORT="0")
+    os.environ.pop("TRAFFIC_RECORD_FILE", None)
+    # Requests are signed but never sent
+    os.environ.setdefault("BYBIT_API_KEY", "replay")
+    os.environ.setdefault("BYBIT_API_SECRET", "replay")
+
+    clock = ReplayClock()
+    clock.install()
+    try:
+        from trading_bot import TradingBot
+        bot = TradingBot(feed="rest")
+        transport = ReplayTransport(records, clock)
+        bot.data_fetcher.transport = transport
+        bot.data_fetcher.rate_limiter = ReplayRateLimiter()
+        job_symbol = bot.job_symbol
+
+        def bound_job_symbol(symbol):
+            clock.bind(symbol)
+            try:
+                return job_symbol(symbol)
+            finally:
+                clock.bind(None)
+        bot.job_symbol = bound_job_symbol
+        tasks = [record for record in records if record.get("kind") == "task"]
+
+        profiler = None
+        if profile_path:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        clock.set(start)
+        bot.order_submitter.prepare(bot.symbols)
+        for task in tasks:
+            clock.set(task)
+            if task["task"] == "job":
+                bot.job()
+            elif task["task"] == "housekeeping":
+                bot.housekeeping(task.get("symbols"))
+        elapsed = time.perf_counter() - started
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        bot.log_pipeline.close()
+    finally:
+        clock.uninstall()
+    return {
+        "tasks": len(tasks),
+        "requests": transport.requests_sent,
+        "misses": len(transport.misses),
+        "unused": transport.unused(),
+        "seconds": elapsed,
+        "first_misses": transport.misses[:5],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a session recorded with TRAFFIC_RECORD_FILE, offline")
+    parser.add_argument("file")
+    parser.add_argument("--session", type=int, default=0, help="which session of the file (0 = first, -1 = last)")
+    parser.add_argument("--log", default="replay.log", help="event log of the replayed session")
+    parser.add_argument("--profile", default=None, help="write cProfile stats of the replay to this file")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.environ["LOG_FILE"] = args.log
+    result = replay(args.file, args.session, args.profile)
+    print(f"{result['tasks']} tasks, {result['requests']} requests in {result['seconds']:.3f} s; "
+          f"{result['misses']} not recorded, {result['unused']} recorded but not requested")
+    for key in result["first_misses"]:
+        print("  missing:", *key)
@@ -0,0 +1,42 @@
+# warm_start.py
+
+import os
+import pickle
+import time
+from event_log import events
+
+
+class WarmStartStore:
+    # Bot state kept across restarts: kline buffers, higher-timeframe bars, indicator cache entries, leverage
+    # per symbol and the exchange clock offset. One pickle written atomically (temp file + rename); load()
+    # only checks version and age, the bot validates the contents against the exchange before using them.
+    VERSION = 1
+
+    def __init__(self, path="data/warm_start.pkl", max_age=3600):
+        self.path = path
+        self.max_age = max_age
+
+    def save(self, state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump({"version": self.VERSION, "saved_at": time.time(), **state}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            events.warning("warm_start", status="unreadable", path=self.path, error=repr(e))
+            return None
+        age = time.time() - state.get("saved_at", 0)
+        if state.get("version") != self.VERSION or age > self.max_age:
+            events.info("warm_start", status="discarded", age_seconds=int(age), version=state.get("version"))
+            return None
+        return state
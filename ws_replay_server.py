@@ -0,0 +1,157 @@
+# ws_replay_server.py
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from aiohttp import WSMsgType, web
+from order_book import read_messages
+
+
+class WsReplayServer:
+    # Local stand-in for Bybit's public v5 stream. It answers subscribe, unsubscribe and ping the way the exchange
+    # does, and pushes recorded kline/tickers/orderbook messages to the clients subscribed to their topic.
+    # Messages are sent when publish() is called (tests) or at a fixed rate with play(). A message that no
+    # client is subscribed to is dropped, like a push missed while disconnected. disconnect() closes every
+    # connection, as a dropped stream would.
+    def __init__(self, messages, host="127.0.0.1", port=0):
+        self.messages = list(messages)
+        self.position = 0
+        self.host = host
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self.port = self._sock.getsockname()[1]
+        # Every operation received from a client, in order; and the number of connections accepted so far
+        self.requests = []
+        self.connections = 0
+        self.clients = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v5/public/linear"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ws-replay-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/v5/public/linear", self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        self._loop.run_until_complete(web.SockSite(self._runner, self._sock).start())
+        self._started.set()
+        self._loop.run_forever()
+
+    def _call(self, coroutine, timeout=5):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.clients[ws] = set()
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    op = json.loads(msg.data)
+                except ValueError:
+                    continue
+                self.requests.append(op)
+                await self._reply(ws, op)
+        finally:
+            self.clients.pop(ws, None)
+        return ws
+
+    async def _reply(self, ws, op):
+        name = op.get("op")
+        if name == "subscribe":
+            self.clients[ws].update(op.get("args", ()))
+        elif name == "unsubscribe":
+            self.clients[ws].difference_update(op.get("args", ()))
+        elif name != "ping":
+            await ws.send_json({"success": False, "ret_msg": f"unknown op {name}", "op": name})
+            return
+        await ws.send_json({"success": True, "ret_msg": "pong" if name == "ping" else "", "conn_id": "replay",
+                            "req_id": op.get("req_id", ""), "op": name})
+
+    def subscribed(self, topic):
+        # Number of open connections subscribed to the topic
+        return sum(topic in topics for topics in list(self.clients.values()))
+
+    def publish(self, count=1):
+        # Sends the next `count` recorded messages; returns how many client deliveries were made
+        return self._call(self._publish(count))
+
+    async def _publish(self, count):
+        delivered = 0
+        for message in self.messages[self.position:self.position + count]:
+            self.position += 1
+            topic = message.get("topic")
+            for ws, topics in list(self.clients.items()):
+                if topic in topics and not ws.closed:
+                    await ws.send_str(json.dumps(message))
+                    delivered += 1
+        return delivered
+
+    def skip(self, count=1):
+        # Drops the next `count` messages unsent, e.g. what the exchange pushed during an outage
+        self.position = min(self.position + count, len(self.messages))
+
+    def disconnect(self):
+        self._call(self._disconnect())
+
+    async def _disconnect(self):
+        for ws in list(self.clients):
+            await ws.close()
+
+    def play(self, rate=10.0):
+        # Sends the rest of the recording at `rate` messages per second, starting once a client subscribes
+        while not any(self.clients.values()):
+            time.sleep(0.05)
+        while self.position < len(self.messages):
+            self.publish()
+            time.sleep(1 / rate)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._call(self._disconnect())
+        self._call(self._runner.cleanup())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded Bybit public stream messages on a local websocket")
+    parser.add_argument("files", nargs="+", help="JSON-lines recordings (.jsonl or .jsonl.gz), replayed in order")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=10.0, help="messages per second")
+    args = parser.parse_args()
+
+    server = WsReplayServer([message for path in args.files for message in read_messages(path)], args.host, args.port)
+    server.start()
+    print(f"Replaying {len(server.messages)} messages on {server.url} (set BYBIT_WS_URL to point the bot at it)")
+    try:
+        server.play(args.rate)
+        print("All recorded messages sent.")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()